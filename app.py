@@ -8,9 +8,11 @@ import base64
 import io
 import json
 import os
-import threading
+import time
+import uuid
+from collections.abc import Callable
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
@@ -18,11 +20,20 @@ import streamlit as st
 import streamlit.components.v1 as components
 from PIL import Image
 
-from tarozon_core.compose import compose_spread_image, prepare_download_png
 from tarozon_core.decks import Deck, load_decks
 from tarozon_core.draw import draw_many, draw_one
 from tarozon_core.prompts import build_prompt_cards_with_labels
-from tarozon_core.rooms import ChatManager, RoomManager
+from tarozon_core.render_service import BoardRenderRequest, DownloadRenderRequest, RenderServiceError
+from tarozon_core.room_watch import RoomWatcherRegistry, latest_activity, poll_bounds_from_env
+from tarozon_core.rooms import (
+    MAX_MESSAGE_CHARS,
+    ChatManager,
+    RoomBackendUnavailableError,
+    RoomCodeCollisionError,
+    RoomManager,
+    RoomRateLimitedError,
+)
+from tarozon_core.scheduler import RenderDroppedError, RenderPriority, get_render_scheduler
 from tarozon_core.spreads import Spread, load_spreads
 
 try:
@@ -205,26 +216,26 @@ def _render_board_png(
     spread_mtime: int,
     codes: tuple[str | None, ...],
     angles: tuple[int, ...],
+    _priority: RenderPriority = RenderPriority.INTERACTIVE,
+    _room_code: str | None = None,
+    _room_version: int | None = None,
+    _deadline: float | None = None,
 ) -> tuple[bytes, int, int]:
-    repo_root = Path(repo_root_str)
-    decks = load_decks(repo_root)
-    spreads = load_spreads(repo_root)
-    deck = decks[deck_id]
-    spread = spreads[spread_id]
-
-    codes_by_slot = {
-        slot.key: code
-        for slot, code in zip(spread.slots, list(codes), strict=False)
-        if code
-    }
-    angles_by_slot = {slot.key: int(angles[i]) for i, slot in enumerate(spread.slots)}
-    rendered = compose_spread_image(
-        repo_root=repo_root,
-        deck=deck,
-        spread=spread,
-        codes_by_slot=codes_by_slot,
-        angles_by_slot=angles_by_slot,
-        render_back_for_missing=True,
+    # Pillow compose runs on the render worker pool, not in this script thread.
+    # Underscore args are scheduling hints only (st.cache_data does not hash them).
+    rendered = get_render_scheduler().submit(
+        BoardRenderRequest(
+            repo_root=repo_root_str,
+            deck_id=deck_id,
+            spread_id=spread_id,
+            spread_mtime=spread_mtime,
+            codes=tuple(codes),
+            angles=tuple(int(a) for a in angles),
+        ),
+        priority=_priority,
+        supersede_key=_room_code,
+        version=_room_version,
+        deadline=_deadline,
     )
     return rendered.png_bytes, rendered.width, rendered.height
 
@@ -232,16 +243,54 @@ def _render_board_png(
 @st.cache_data(show_spinner=False, max_entries=256)
 def _download_png_bytes(png_bytes: bytes, spread_id: str, deck_id: str) -> tuple[bytes, str]:
     # Mobile-share optimized download (watermark + downscale + stronger compression)
-    out_bytes, w, h = prepare_download_png(
-        png_bytes=png_bytes,
-        watermark_text="Tarozon.com",
-        max_side=1080,
-        padding=18,
-        compress_level=9,
+    rendered = get_render_scheduler().submit(
+        DownloadRenderRequest(
+            png_bytes=png_bytes,
+            watermark_text="Tarozon.com",
+            max_side=1080,
+            padding=18,
+            compress_level=9,
+        ),
+        priority=RenderPriority.DOWNLOAD,
+    )
+    size_kb = len(rendered.png_bytes) / 1024.0
+    meta = f"{rendered.width}×{rendered.height} · {size_kb:.0f}KB"
+    return rendered.png_bytes, meta
+
+
+def _board_png_for_state(
+    ds: DrawState,
+    *,
+    priority: RenderPriority = RenderPriority.INTERACTIVE,
+    room_code: str | None = None,
+    room_version: int | None = None,
+    deadline: float | None = None,
+) -> bytes:
+    """Render (or reuse the cached) board for a draw state; used by room publish and viewers."""
+    spread_path = REPO_ROOT / "data" / "spreads" / f"{ds.spread_id}.json"
+    spread_mtime = int(spread_path.stat().st_mtime) if spread_path.exists() else 0
+    png_bytes, _, _ = _render_board_png(
+        repo_root_str=str(REPO_ROOT),
+        deck_id=ds.deck_id,
+        spread_id=ds.spread_id,
+        spread_mtime=spread_mtime,
+        codes=tuple(ds.codes),
+        angles=tuple(int(a) for a in ds.angles),
+        _priority=priority,
+        _room_code=room_code,
+        _room_version=room_version,
+        _deadline=deadline,
     )
-    size_kb = len(out_bytes) / 1024.0
-    meta = f"{w}×{h} · {size_kb:.0f}KB"
-    return out_bytes, meta
+    return png_bytes
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _published_board_png(board_hash: str) -> bytes:
+    # Content-addressed, so safe to cache; raising keeps misses out of the cache
+    data = get_room_manager().get_board_png(board_hash)
+    if data is None:
+        raise LookupError(board_hash)
+    return data
 
 
 st.set_page_config(
@@ -338,24 +387,34 @@ MASTER_ONLY_DECK_IDS = ("holitzka", "thoth")
 default_deck_id = "rws" if "rws" in decks else sorted(decks.keys())[0]
 default_spread_id = "one_card" if "one_card" in spreads else sorted(spreads.keys())[0]
 
-_room_manager: RoomManager | None = None
-_chat_manager: ChatManager | None = None
-
-
+@st.cache_resource(show_spinner=False)
 def get_room_manager() -> RoomManager:
-    """솔로 모드에서는 호출하지 않음. 방 생성/입장 시에만 사용해 Supabase 클라이언트를 지연 생성."""
-    global _room_manager
-    if _room_manager is None:
-        _room_manager = RoomManager()
-    return _room_manager
+    """솔로 모드에서는 호출하지 않음. 방 생성/입장 시에만 사용해 Supabase 클라이언트를 지연 생성.
+    cache_resource라 rerun/세션 간에 공유되고, 클라이언트 자체는 tarozon_core.rooms의 풀링된 공용 클라이언트."""
+    return RoomManager()
 
 
+@st.cache_resource(show_spinner=False)
 def get_chat_manager() -> ChatManager:
-    """솔로 모드에서는 호출하지 않음. 방에 입장한 뒤 채팅 시에만 사용해 지연 생성."""
-    global _chat_manager
-    if _chat_manager is None:
-        _chat_manager = ChatManager()
-    return _chat_manager
+    """솔로 모드에서는 호출하지 않음. 방에 입장한 뒤 채팅 시에만 사용해 지연 생성(RoomManager와 같은 클라이언트 공유)."""
+    return ChatManager()
+
+
+@st.cache_resource(show_spinner=False)
+def get_room_watchers() -> RoomWatcherRegistry:
+    """프로세스 공용 방 감시자: 방마다 폴러 하나만 DB를 조회하고, 세션(뷰어 N명)은 스냅샷만 읽음."""
+    return RoomWatcherRegistry(
+        get_room_manager(),
+        get_chat_manager(),
+        poll_seconds=_LIVE_POLL_MIN_SECONDS,
+        max_poll_seconds=_LIVE_POLL_MAX_SECONDS,
+        fallback_seconds=_EVENT_FALLBACK_POLL_SECONDS,
+        # 한가한 방은 세션 갱신 간격이 최대 _LIVE_POLL_MAX_SECONDS까지 늘어나므로 그보다 넉넉히 유지
+        idle_seconds=max(60.0, 2 * _LIVE_POLL_MAX_SECONDS),
+        message_limit=_CHAT_PAGE_SIZE,
+        # 감시가 끝난 방(읽는 세션 없음)은 렌더 스케줄러의 버전 추적에서도 제거
+        on_room_closed=get_render_scheduler().forget,
+    )
 
 
 # Load state from URL (refresh-safe)
@@ -420,6 +479,7 @@ if st.session_state.get("viewer_mode") and st.session_state.get("viewer_room_cod
         st.session_state.viewer_mode = False
         st.session_state.viewer_room_code = None
         st.session_state.last_viewer_state_json = None
+        st.session_state.viewer_board = None
         st.rerun()
     else:
         obj = room.get("state_json")
@@ -443,19 +503,30 @@ spread: Spread = spreads.get(st.session_state.draw_state.spread_id, spreads[defa
 st.session_state.draw_state = _normalize_state(st.session_state.draw_state, deck_id=deck.id, spread=spread, deck=deck)
 
 def _sync_host_room_if_any() -> None:
-    """host_room_code가 없으면 Supabase 호출 없음(솔로 모드). 방이 있을 때만 DB에 비동기로 저장해 UI가 멈추지 않게 함."""
+    """host_room_code가 없으면 Supabase 호출 없음(솔로 모드). 방이 있을 때만 DB에 비동기(write-behind 큐)로 저장해 UI가 멈추지 않게 함."""
     if st.session_state.get("host_room_code"):
         rm = get_room_manager()
         if rm.is_available:
             state_dict = _draw_state_to_dict(st.session_state.draw_state)
             room_code = st.session_state.host_room_code
-            threading.Thread(
-                target=lambda: rm.update_room(room_code, state_dict),
-                daemon=True,
-            ).start()
+            # 보드 게시 모드: 호스트가 한 번 렌더해 올리면 뷰어는 해시로 받아감(캐시되어 다음 rerun에서 재사용)
+            board_png = None
+            if rm.publishes_boards:
+                try:
+                    board_png = _board_png_for_state(st.session_state.draw_state)
+                except RenderServiceError:
+                    # 렌더 지연/실패 시 이미지 없이 상태만 저장: board_hash가 비워져 뷰어는 이전 보드 대신 상태로 직접 렌더
+                    board_png = None
+            # 프로세스 공용 write-behind 큐: 방별 최신 상태만 순서대로 저장(클릭마다 스레드 생성 X)
+            rm.enqueue_update(room_code, state_dict, board_png=board_png)
 
 
 _CHAT_MESSAGE_CONTAINER_HEIGHT = 250
+_CHAT_PAGE_SIZE = 20
+_LIVE_POLL_MIN_SECONDS, _LIVE_POLL_MAX_SECONDS = poll_bounds_from_env()
+_EVENT_FALLBACK_POLL_SECONDS = 30
+_HOST_CONSOLE_PAGE_SIZE = 25
+_HOST_CONSOLE_ACTIVE_HOURS = 24
 
 
 def _render_chat_expander(room_code: str, key_prefix: str = "chat", fragment_scope: bool = False) -> None:
@@ -467,7 +538,19 @@ def _render_chat_expander(room_code: str, key_prefix: str = "chat", fragment_sco
         st.session_state.chat_nickname = str(st.session_state[nick_key]).strip() or st.session_state.chat_nickname
     with st.expander("Concierge Messages", expanded=True):
         st.text_input("Guest Name", value=st.session_state.chat_nickname, key=nick_key)
-        messages = get_chat_manager().get_messages(room_code, limit=20)
+        # 방 감시자가 프로세스 공용 캐시를 증분 동기화하므로 세션은 캐시만 읽음. 이전 기록은 버튼으로 필요할 때만 페이지 조회
+        history_key = f"{key_prefix}_history_limit"
+        history_limit = int(st.session_state.get(history_key) or _CHAT_PAGE_SIZE)
+        get_room_watchers().snapshot(room_code)
+        messages = get_chat_manager().cache.latest(room_code.strip().upper(), history_limit)
+        if len(messages) >= history_limit and get_chat_manager().has_older_messages(room_code):
+            if st.button("Earlier messages", key=f"{key_prefix}_older"):
+                get_chat_manager().load_older(room_code, _CHAT_PAGE_SIZE)
+                st.session_state[history_key] = history_limit + _CHAT_PAGE_SIZE
+                if fragment_scope:
+                    st.rerun(scope="fragment")
+                else:
+                    st.rerun()
         try:
             chat_container = st.container(height=_CHAT_MESSAGE_CONTAINER_HEIGHT, key="tarozon_chat_messages")
         except TypeError:
@@ -527,66 +610,210 @@ def _render_chat_expander(room_code: str, key_prefix: str = "chat", fragment_sco
             )
             current_nick = (st.session_state.chat_nickname or "").strip()
             for i, msg in enumerate(messages):
-                msg_user = (msg.get("user_name") or "").strip()
-                is_mine = msg_user == current_nick
-                wrapper_key = f"chat_msg_{i}_mine" if is_mine else f"chat_msg_{i}_other"
-                with st.container(key=wrapper_key):
-                    display_name = (msg.get("user_name") or "").strip()[:7] or "?"
-                    with st.chat_message(name=display_name[:1]):
-                        st.markdown(f"**{display_name}**: {msg['content']}")
-        prompt = st.chat_input("Compose your message...", key=f"{key_prefix}_input")
+                _render_chat_message(msg, i, current_nick)
+        prompt = st.chat_input("Compose your message...", key=f"{key_prefix}_input", max_chars=MAX_MESSAGE_CHARS)
         if prompt and (prompt := str(prompt).strip()):
             display_name = st.session_state.get(nick_key, st.session_state.chat_nickname) or st.session_state.chat_nickname
-            if get_chat_manager().send_message(room_code, display_name, prompt):
-                if fragment_scope:
-                    st.rerun(scope="fragment")
-                else:
-                    st.rerun()
+            sent = get_chat_manager().send_message(room_code, display_name, prompt)
+            if sent:
+                # 저장된 행이 캐시에 바로 들어가므로(로컬 에코) 재조회/rerun 없이 목록 끝에 그대로 그림
+                with chat_container:
+                    _render_chat_message(sent, len(messages), (st.session_state.chat_nickname or "").strip())
             else:
                 st.error("Failed to send message.")
 
 
-@st.fragment(run_every=timedelta(seconds=3))
-def _fragment_viewer_live(room_code: str) -> None:
+def _render_chat_message(msg: dict[str, Any], i: int, current_nick: str) -> None:
+    msg_user = (msg.get("user_name") or "").strip()
+    is_mine = msg_user == current_nick
+    wrapper_key = f"chat_msg_{i}_mine" if is_mine else f"chat_msg_{i}_other"
+    with st.container(key=wrapper_key):
+        display_name = (msg.get("user_name") or "").strip()[:7] or "?"
+        with st.chat_message(name=display_name[:1]):
+            st.markdown(f"**{display_name}**: {msg['content']}")
+
+
+def _run_live_fragment(body: Callable[[str, float], None], room_code: str) -> None:
+    """
+    body를 방의 현재 적응형 간격(run_every)으로 fragment 실행. 간격은 서버 시각(마지막 활동) 기준이라
+    같은 방의 모든 세션이 함께 느려지고, 활동이 생기면 다시 빨라짐.
+    """
+    interval = get_room_watchers().interval(room_code)
+    st.fragment(run_every=timedelta(seconds=interval))(body)(room_code, interval)
+
+
+def _rerun_if_interval_changed(room_code: str, interval: float) -> None:
+    """run_every는 fragment 등록 시 고정되므로, 간격 단계가 바뀌었을 때만 앱 전체 rerun으로 다시 등록."""
+    if get_room_watchers().interval(room_code) != interval:
+        st.rerun()
+
+
+def _fragment_viewer_live(room_code: str, interval: float) -> None:
     """Viewer 전용: 방 최신 상태로 보드 + 고정 높이 채팅만 부분 갱신."""
     if not room_code:
         return
     rm = get_room_manager()
     if not rm.is_available:
         return
-    room = rm.get_room(room_code)
+    # 시청자 하트비트는 메모리에만 기록(I/O 없음). 워커당 한 번의 일괄 upsert가 주기적으로 반영
+    if rm.presence is not None:
+        rm.presence.touch(room_code, st.session_state.setdefault("client_key", uuid.uuid4().hex))
+    # 방 감시자 스냅샷만 읽음(DB 조회 없음). 직전에 그린 보드와 버전이 같으면 상태 복원/렌더 생략하고 같은 이미지 재사용
+    shown = st.session_state.get("viewer_board")
+    if not (isinstance(shown, dict) and shown.get("room_code") == room_code):
+        shown = None
+    snap = get_room_watchers().snapshot(room_code)
+    room = snap.room if snap.found else None
     if room is None:
         st.error("Room not found.")
         return
-    obj = room.get("state_json")
-    if not isinstance(obj, dict):
-        return
-    d = obj.get("d")
-    s = obj.get("s")
-    if not isinstance(d, str) or d not in decks or not isinstance(s, str) or s not in spreads:
-        return
-    deck = decks[d]
-    spread = spreads[s]
-    ds = DrawState(deck_id=d, spread_id=s, codes=list(obj.get("c", [])), angles=list(obj.get("a", [])))
-    spread_path = REPO_ROOT / "data" / "spreads" / f"{spread.id}.json"
-    spread_mtime = int(spread_path.stat().st_mtime) if spread_path.exists() else 0
-    png_bytes, _, _ = _render_board_png(
-        repo_root_str=str(REPO_ROOT),
-        deck_id=deck.id,
-        spread_id=spread.id,
-        spread_mtime=spread_mtime,
-        codes=tuple(ds.codes),
-        angles=tuple(int(a) for a in ds.angles),
-    )
+    if shown is not None and room.get("version") == shown["version"]:
+        png_bytes = shown["png"]
+    else:
+        obj = room.get("state_json")
+        if not isinstance(obj, dict):
+            return
+        d = obj.get("d")
+        s = obj.get("s")
+        if not isinstance(d, str) or d not in decks or not isinstance(s, str) or s not in spreads:
+            return
+        ds = DrawState(deck_id=d, spread_id=s, codes=list(obj.get("c", [])), angles=list(obj.get("a", [])))
+        png_bytes: bytes | None = None
+        version = room.get("version")
+        if room.get("board_hash"):
+            try:
+                png_bytes = _published_board_png(str(room["board_hash"]))
+            except LookupError:
+                png_bytes = None
+        if png_bytes is None:
+            try:
+                # 다음 폴링 전에 시작하지 못하거나 더 새 상태가 오면 버림 → 직전 보드를 유지(버전은 그대로 두어 다음 주기에 재시도)
+                png_bytes = _board_png_for_state(
+                    ds,
+                    priority=RenderPriority.VIEWER,
+                    room_code=room_code,
+                    room_version=version,
+                    deadline=time.monotonic() + interval,
+                )
+            except RenderServiceError as e:
+                # 버려짐/시간 초과: 직전 보드 유지, 처음이면 짧은 안내만
+                if shown is None:
+                    if not isinstance(e, RenderDroppedError):
+                        st.warning("Board is taking longer than usual; retrying shortly.")
+                    return
+                png_bytes, version = shown["png"], shown["version"]
+        st.session_state.viewer_board = {"room_code": room_code, "version": version, "png": png_bytes}
+    # 같은 바이트는 Streamlit 미디어 캐시에서 같은 URL로 나가므로 브라우저가 다시 받지 않음
     with st.container(key="board_frame_viewer"):
         st.image(png_bytes, use_container_width=True)
     _render_chat_expander(room_code, "chat_viewer", fragment_scope=True)
+    _rerun_if_interval_changed(room_code, interval)
 
 
-@st.fragment(run_every=timedelta(seconds=3))
-def _fragment_host_chat(room_code: str) -> None:
+def _fragment_host_chat(room_code: str, interval: float) -> None:
     """Host 전용: 채팅만 고정 높이로 부분 갱신."""
     _render_chat_expander(room_code, "chat_main", fragment_scope=True)
+    _rerun_if_interval_changed(room_code, interval)
+
+
+def _host_viewer_count(room_code: str) -> None:
+    """Host 사이드바: 현재 시청자 수(워커별 presence 행 합산, 짧게 캐시되어 세션이 많아도 조회는 적음)."""
+    presence = get_room_manager().presence
+    if presence is not None:
+        st.caption(f"Viewers: **{presence.count(room_code)}**")
+
+
+def _ago(iso: str | None) -> str:
+    """서버 ISO 시각 → '3m ago' 형태(콘솔 표시용)."""
+    if not iso:
+        return "-"
+    try:
+        at = datetime.fromisoformat(str(iso).replace("Z", "+00:00"))
+    except ValueError:
+        return "-"
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    seconds = max(0, int((datetime.now(timezone.utc) - at).total_seconds()))
+    if seconds < 60:
+        return f"{seconds}s ago"
+    if seconds < 3600:
+        return f"{seconds // 60}m ago"
+    return f"{seconds // 3600}h ago"
+
+
+@st.fragment(run_every=timedelta(seconds=_EVENT_FALLBACK_POLL_SECONDS))
+def _fragment_host_console() -> None:
+    """
+    관리자 호스트 콘솔: 최근 활동 방 목록 한 페이지를 일괄 조회(방 목록 1회 + 메시지 수 1회, 방 개수와 무관).
+    방마다 감시자/폴링 세션을 띄우지 않고 한 화면에서 모니터링하고, 선택한 방을 호스트로 이어받음.
+    """
+    rm = get_room_manager()
+    if not rm.is_available:
+        st.caption("Room storage is not configured.")
+        return
+    cursors: list[Any] = st.session_state.setdefault("host_console_cursors", [None])
+    page = rm.list_active_rooms(
+        _HOST_CONSOLE_PAGE_SIZE,
+        active_within=timedelta(hours=_HOST_CONSOLE_ACTIVE_HOURS),
+        before=cursors[-1],
+    )
+    if page is None:
+        st.warning("Room list is unavailable right now.")
+        return
+    if not page.rooms:
+        st.caption("No active rooms.")
+    else:
+        room_codes = [r["room_code"] for r in page.rooms]
+        stats = get_chat_manager().message_stats(room_codes) or {}
+        viewers = rm.presence.counts(room_codes) if rm.presence is not None else {}
+        table = []
+        for r in page.rooms:
+            obj = r.get("state_json") if isinstance(r.get("state_json"), dict) else {}
+            codes = list(obj.get("c") or [])
+            msg = stats.get(r["room_code"], {})
+            sp = spreads.get(str(obj.get("s")))
+            table.append({
+                "Room": r["room_code"],
+                "Spread": sp.name if sp else str(obj.get("s") or "-"),
+                "Cards": f"{sum(1 for c in codes if c)}/{len(codes)}",
+                "Messages": int(msg.get("message_count") or 0),
+                "Viewers": viewers.get(r["room_code"], 0),
+                "Active": _ago(latest_activity(r.get("updated_at"), msg.get("last_message_at"))),
+            })
+        st.dataframe(table, hide_index=True, use_container_width=True)
+        pick = st.selectbox("Room", room_codes, key="host_console_pick")
+        if st.button("Host this room", key="host_console_take", use_container_width=True) and pick:
+            room = next((r for r in page.rooms if r["room_code"] == pick), None)
+            obj = room.get("state_json") if room else None
+            d = obj.get("d") if isinstance(obj, dict) else None
+            s = obj.get("s") if isinstance(obj, dict) else None
+            if isinstance(d, str) and d in decks and isinstance(s, str) and s in spreads:
+                st.session_state.host_room_code = pick
+                st.session_state.chat_nickname = "Tarozon"
+                st.session_state.draw_state = DrawState(
+                    deck_id=d, spread_id=s, codes=list(obj.get("c", [])), angles=list(obj.get("a", []))
+                )
+                _set_query_state(_encode_state(st.session_state.draw_state))
+                st.rerun()
+            else:
+                st.error("Invalid room data.")
+    # 페이지 이동은 콜백에서 커서만 바꿈 → 이어지는 fragment 실행이 바로 새 페이지를 조회
+    prev_col, next_col = st.columns(2)
+    prev_col.button(
+        "Newer",
+        key="host_console_newer",
+        disabled=len(cursors) <= 1,
+        on_click=cursors.pop,
+        use_container_width=True,
+    )
+    next_col.button(
+        "Older",
+        key="host_console_older",
+        disabled=page.next_cursor is None,
+        on_click=cursors.append,
+        args=(page.next_cursor,),
+        use_container_width=True,
+    )
 
 
 with st.sidebar:
@@ -713,9 +940,13 @@ with st.sidebar:
     st.subheader("Live Reading Exchange")
     if st.session_state.get("viewer_mode"):
         if st.button("Check-out", use_container_width=True):
+            presence = get_room_manager().presence
+            if presence is not None and st.session_state.get("viewer_room_code"):
+                presence.leave(st.session_state.viewer_room_code, st.session_state.get("client_key", ""))
             st.session_state.viewer_mode = False
             st.session_state.viewer_room_code = None
             st.session_state.last_viewer_state_json = None
+            st.session_state.viewer_board = None
             st.rerun()
     else:
         is_admin = _get_admin_param() == "tarozon1"
@@ -726,6 +957,9 @@ with st.sidebar:
             st.success(f"Room code: **{room_code}**")
             st.caption("Invitation Link (click to copy)")
             st.code(invite_url, language=None)
+            presence = get_room_manager().presence
+            if presence is not None:
+                st.fragment(run_every=timedelta(seconds=presence.interval))(_host_viewer_count)(room_code)
         if is_admin:
             if st.button("Create Room", use_container_width=True):
                 rm = get_room_manager()
@@ -733,13 +967,23 @@ with st.sidebar:
                     st.error("Supabase configuration required (SUPABASE_URL, SUPABASE_SERVICE_KEY)")
                 else:
                     state_dict = _draw_state_to_dict(st.session_state.draw_state)
-                    code = rm.create_room(state_dict)
+                    code: str | None = None
+                    try:
+                        # 세션별 방 생성 횟수 제한(토큰 버킷) 키
+                        client_key = st.session_state.setdefault("client_key", uuid.uuid4().hex)
+                        code = rm.try_create_room(state_dict, client_key=client_key)
+                    except RoomCodeCollisionError:
+                        st.error("No free room code right now. Please try again.")
+                    except RoomRateLimitedError:
+                        st.error("Too many rooms created. Please wait a moment.")
+                    except RoomBackendUnavailableError:
+                        st.error("Room service is unavailable. Please try again later.")
                     if code:
                         st.session_state.host_room_code = code
                         st.session_state.chat_nickname = "Tarozon"
                         st.rerun()
-                    else:
-                        st.error("Failed to create room.")
+            with st.expander("Host Console", expanded=False):
+                _fragment_host_console()
         else:
             st.caption("Please enter your Lobby Access Key")
         join_code_raw = st.text_input("Lobby Access Key", key="room_code_input", placeholder="ABC123")
@@ -773,6 +1017,15 @@ with st.sidebar:
                     else:
                         st.error("Invalid room data.")
 
+# 방 코드가 없으면 fragment를 호출하지 않아 주기 갱신이 꺼짐(리소스 절약). 솔로 모드에서는 Supabase/채팅 미사용.
+current_room_code = st.session_state.get("host_room_code") or st.session_state.get("viewer_room_code")
+
+# 뷰어는 메인 보드를 그리지 않음: 보드는 fragment가 방 감시자 스냅샷(게시된 이미지/버전 캐시)으로 그림.
+# 간격 변경 등으로 전체 rerun이 와도 여기서 렌더 슬롯을 쓰지 않음
+if st.session_state.get("viewer_mode") and current_room_code:
+    _run_live_fragment(_fragment_viewer_live, current_room_code)
+    st.stop()
+
 deck = decks[st.session_state.draw_state.deck_id]
 spread = spreads[st.session_state.draw_state.spread_id]
 
@@ -783,21 +1036,24 @@ if spread.layout is None:
 spread_path = REPO_ROOT / "data" / "spreads" / f"{spread.id}.json"
 spread_mtime = int(spread_path.stat().st_mtime) if spread_path.exists() else 0
 
-png_bytes, img_w, img_h = _render_board_png(
-    repo_root_str=str(REPO_ROOT),
-    deck_id=deck.id,
-    spread_id=spread.id,
-    spread_mtime=spread_mtime,
-    codes=tuple(st.session_state.draw_state.codes),
-    angles=tuple(int(a) for a in st.session_state.draw_state.angles),
-)
-
-# 방 코드가 없으면 fragment를 호출하지 않아 3초 주기 갱신이 꺼짐(리소스 절약). 솔로 모드에서는 Supabase/채팅 미사용.
-current_room_code = st.session_state.get("host_room_code") or st.session_state.get("viewer_room_code")
-
-if st.session_state.get("viewer_mode") and current_room_code:
-    _fragment_viewer_live(current_room_code)
-    st.stop()
+try:
+    png_bytes, img_w, img_h = _render_board_png(
+        repo_root_str=str(REPO_ROOT),
+        deck_id=deck.id,
+        spread_id=spread.id,
+        spread_mtime=spread_mtime,
+        codes=tuple(st.session_state.draw_state.codes),
+        angles=tuple(int(a) for a in st.session_state.draw_state.angles),
+    )
+    st.session_state.last_board = (spread.id, deck.id, png_bytes, img_w, img_h)
+except RenderServiceError:
+    # 렌더 시간 초과 등: 같은 스프레드/덱으로 마지막에 그린 보드를 보여주고(클릭 좌표 기준 유지), 없으면 안내 후 중단
+    last_board = st.session_state.get("last_board")
+    if not (last_board and last_board[:2] == (spread.id, deck.id)):
+        st.warning("The board could not be drawn right now. Please try again in a moment.")
+        st.stop()
+    png_bytes, img_w, img_h = last_board[2:]
+    st.caption("Showing the previous board while the new one is drawn.")
 
 st.subheader(f"{spread.name} · The Board")
 
@@ -863,20 +1119,24 @@ if (
     # If click didn't hit any slot, still mark processed to avoid repeated attempts
     st.session_state.last_click_unix_time[board_key] = float(click_time)
 
-download_bytes, download_meta = _download_png_bytes(png_bytes, spread.id, deck.id)
-st.caption(f"Download optimized: {download_meta}")
-st.download_button(
-    "Download Board (PNG)",
-    data=download_bytes,
-    file_name=f"{_timestamp_slug('tarozon-spread')}-{spread.id}-{deck.id}.png",
-    mime="image/png",
-    use_container_width=True,
-    key=f"download_board_{spread.id}_{deck.id}",
-)
+try:
+    download_bytes, download_meta = _download_png_bytes(png_bytes, spread.id, deck.id)
+except RenderServiceError:
+    st.caption("Download is unavailable right now.")
+else:
+    st.caption(f"Download optimized: {download_meta}")
+    st.download_button(
+        "Download Board (PNG)",
+        data=download_bytes,
+        file_name=f"{_timestamp_slug('tarozon-spread')}-{spread.id}-{deck.id}.png",
+        mime="image/png",
+        use_container_width=True,
+        key=f"download_board_{spread.id}_{deck.id}",
+    )
 
-# host_room_code 있을 때만 채팅 fragment 호출(3초 주기). 없으면 호출 안 함.
+# host_room_code 있을 때만 채팅 fragment 호출(활동에 따라 3~30초 적응형 주기). 없으면 호출 안 함.
 if current_room_code:
-    _fragment_host_chat(current_room_code)
+    _run_live_fragment(_fragment_host_chat, current_room_code)
 
 st.markdown("---")
 st.subheader("Grand Interpretation")
@@ -9,3 +9,290 @@ create table if not exists rooms (
 );
 
 create index if not exists idx_rooms_room_code on rooms(room_code);
+
+-- 호스트가 렌더한 보드 이미지 게시(TAROZON_BOARD_STORE 설정 시). 이미지의 SHA-256 해시.
+-- supabase 저장소를 쓰면 Storage에 같은 이름의 버킷(예: boards)을 만들어 두세요.
+alter table rooms add column if not exists board_hash text;
+
+-- 방 생성 원자화: 서버에서 고유 코드를 뽑아 삽입까지 한 번의 호출(1 RTT)로 처리.
+-- 코드 충돌은 함수 안에서 재시도하고, 모두 충돌하면 SQLSTATE TZ001로 실패(클라이언트가 장애와 구분).
+create or replace function create_room(p_state jsonb, p_code_length int default 6, p_max_attempts int default 32)
+returns text
+language plpgsql
+as $$
+declare
+  v_chars constant text := 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789';
+  v_code text;
+begin
+  for attempt in 1..p_max_attempts loop
+    select string_agg(substr(v_chars, 1 + floor(random() * length(v_chars))::int, 1), '')
+      into v_code
+      from generate_series(1, p_code_length);
+    insert into rooms (room_code, state_json)
+      values (v_code, p_state)
+      on conflict (room_code) do nothing;
+    if found then
+      return v_code;
+    end if;
+  end loop;
+  raise exception 'no free room code after % attempts', p_max_attempts
+    using errcode = 'TZ001';
+end;
+$$;
+
+grant execute on function create_room(jsonb, int, int) to anon, authenticated, service_role;
+
+-- 채팅 메시지(ChatManager). (room_code, created_at, id) 키셋 조회가 인덱스만으로 끝나도록 나머지 컬럼을 include.
+-- btree 항목 크기 한도 때문에 메시지/이름 길이를 제한(앱 입력창도 같은 한도).
+create table if not exists messages (
+  id bigint generated always as identity primary key,
+  room_code text not null,
+  user_name text not null check (char_length(user_name) <= 40),
+  content text not null check (char_length(content) <= 500),
+  created_at timestamptz not null default now()
+);
+
+create index if not exists idx_messages_room_created
+  on messages(room_code, created_at, id) include (user_name, content);
+
+-- 실시간 이벤트(TAROZON_ROOM_EVENTS=realtime, 기본값): rooms UPDATE·messages INSERT를 Realtime으로 전달.
+-- 게시(publication)에 없으면 채널은 SUBSCRIBED여도 변경을 받지 못해 뷰어가 30초 예비 폴링으로 떨어짐.
+-- 이미 추가된 테이블은 건너뛰므로 다시 실행해도 안전.
+do $$
+declare
+  t text;
+begin
+  if exists (select 1 from pg_publication where pubname = 'supabase_realtime') then
+    foreach t in array array['rooms', 'messages'] loop
+      if not exists (
+        select 1 from pg_publication_tables
+        where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = t
+      ) then
+        execute format('alter publication supabase_realtime add table public.%I', t);
+      end if;
+    end loop;
+  end if;
+end
+$$;
+
+-- 방 상태 이벤트 로그(TAROZON_ROOM_EVENT_LOG=1): 클릭마다 전체 state_json 대신 슬롯 단위 작은 이벤트를 seq 순으로 추가.
+-- rooms.state_json은 snapshot_seq 시점의 스냅샷, event_seq는 마지막 이벤트 번호.
+create table if not exists room_events (
+  room_code text not null,
+  seq bigint not null,
+  event jsonb not null,
+  created_at timestamptz not null default now(),
+  primary key (room_code, seq)
+);
+
+alter table rooms add column if not exists event_seq bigint not null default 0;
+alter table rooms add column if not exists snapshot_seq bigint not null default 0;
+
+-- 낙관적 동시성: 모든 rooms UPDATE마다 version이 1씩 증가(트리거). 뷰어의 변경 감지·CAS 기준값.
+alter table rooms add column if not exists version bigint not null default 0;
+alter table room_events add column if not exists version bigint;
+
+create or replace function bump_room_version()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.version := old.version + 1;
+  return new;
+end;
+$$;
+
+drop trigger if exists rooms_bump_version on rooms;
+create trigger rooms_bump_version before update on rooms
+  for each row execute function bump_room_version();
+
+-- seq 할당 + 이벤트 삽입 + rooms 갱신(updated_at, 선택적으로 스냅샷/board_hash)을 한 번의 호출로 원자 처리.
+-- p_expected_version이 있으면 버전이 같을 때만 추가하고, 다르면 현재 행을 돌려줌(ok=false).
+-- 스냅샷을 쓸 때 p_keep개보다 오래된 이벤트는 정리.
+drop function if exists append_room_events(text, jsonb, jsonb, text, boolean, int);
+create or replace function append_room_events(
+  p_room_code text,
+  p_events jsonb,
+  p_snapshot jsonb default null,
+  p_board_hash text default null,
+  p_set_board_hash boolean default false,
+  p_expected_version bigint default null,
+  p_keep int default 256
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_n int := jsonb_array_length(p_events);
+  v_row rooms%rowtype;
+begin
+  update rooms set
+    event_seq = event_seq + v_n,
+    updated_at = now(),
+    state_json = coalesce(p_snapshot, state_json),
+    snapshot_seq = case when p_snapshot is null then snapshot_seq else event_seq + v_n end,
+    board_hash = case when p_set_board_hash then p_board_hash else board_hash end
+  where room_code = p_room_code
+    and (p_expected_version is null or version = p_expected_version)
+  returning * into v_row;
+  if not found then
+    return room_version_conflict(p_room_code);
+  end if;
+  insert into room_events (room_code, seq, event, version, created_at)
+    select p_room_code, v_row.event_seq - v_n + e.ord, e.value, v_row.version, now()
+    from jsonb_array_elements(p_events) with ordinality as e(value, ord);
+  if p_snapshot is not null then
+    delete from room_events where room_code = p_room_code and seq <= v_row.event_seq - p_keep;
+  end if;
+  return jsonb_build_object(
+    'ok', true, 'seq', v_row.event_seq, 'version', v_row.version, 'updated_at', v_row.updated_at
+  );
+end;
+$$;
+
+-- 버전 불일치 시 돌려줄 현재 상태. 방이 없으면 SQLSTATE TZ002.
+create or replace function room_version_conflict(p_room_code text)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_row rooms%rowtype;
+begin
+  select * into v_row from rooms where room_code = p_room_code;
+  if not found then
+    raise exception 'room % not found', p_room_code using errcode = 'TZ002';
+  end if;
+  return jsonb_build_object(
+    'ok', false,
+    'state_json', v_row.state_json,
+    'updated_at', v_row.updated_at,
+    'version', v_row.version,
+    'board_hash', v_row.board_hash,
+    'event_seq', v_row.event_seq,
+    'snapshot_seq', v_row.snapshot_seq
+  );
+end;
+$$;
+
+-- 조건부 전체 상태 쓰기(CAS): 기대 버전과 같을 때만 state_json 교체, 아니면 현재 상태 반환. 한 번의 호출.
+create or replace function update_room_if_version(
+  p_room_code text,
+  p_state jsonb,
+  p_expected_version bigint,
+  p_board_hash text default null,
+  p_set_board_hash boolean default false
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_row rooms%rowtype;
+begin
+  update rooms set
+    state_json = p_state,
+    updated_at = now(),
+    snapshot_seq = event_seq,
+    board_hash = case when p_set_board_hash then p_board_hash else board_hash end
+  where room_code = p_room_code and version = p_expected_version
+  returning * into v_row;
+  if not found then
+    return room_version_conflict(p_room_code);
+  end if;
+  return jsonb_build_object('ok', true, 'version', v_row.version, 'updated_at', v_row.updated_at);
+end;
+$$;
+
+grant execute on function append_room_events(text, jsonb, jsonb, text, boolean, bigint, int) to anon, authenticated, service_role;
+grant execute on function update_room_if_version(text, jsonb, bigint, text, boolean) to anon, authenticated, service_role;
+
+-- 조건부 방 조회(한 번의 호출): 더 새 버전이면 행 전체, 아니면 {"version", "not_modified": true},
+-- 방이 없으면 null. 빈 응답만으로는 '변경 없음'과 '삭제됨'(보존 기간 정리)을 구분할 수 없어서.
+create or replace function fetch_room_if_newer(p_room_code text, p_since_version bigint)
+returns jsonb
+language sql
+stable
+as $$
+  select case
+           when r.version > p_since_version then to_jsonb(r)
+           else jsonb_build_object('version', r.version, 'not_modified', true)
+         end
+  from rooms r
+  where r.room_code = p_room_code;
+$$;
+
+grant execute on function fetch_room_if_newer(text, bigint) to anon, authenticated, service_role;
+
+-- 관리자 호스트 콘솔: 방 목록 한 페이지의 메시지 수를 한 번의 조회로(room_code in (...) 조건이 그룹 안으로 내려가 인덱스만 읽음).
+create or replace view room_message_stats
+with (security_invoker = true) as
+  select room_code, count(*) as message_count, max(created_at) as last_message_at
+  from messages
+  group by room_code;
+
+-- 방 목록 키셋 페이지(updated_at desc, room_code desc) 정렬을 인덱스로.
+-- 보존 기간 정리(python -m tarozon_core.retention)의 updated_at 오름차순 배치 삭제도 이 인덱스를 역방향으로 사용.
+create index if not exists idx_rooms_updated_at_code on rooms(updated_at desc, room_code desc);
+-- 같은 선두 컬럼의 예전 단일 인덱스는 쓰기마다 중복 유지되므로 제거.
+drop index if exists idx_rooms_updated_at;
+
+-- 프로세스 간 공유 레이트 리밋(TAROZON_RATE_LIMIT_SHARED=1): 토큰 버킷을 한 번의 RPC로 확인·차감.
+-- p_buckets: [{"k": 키, "rate": 초당 토큰, "burst": 용량}, ...] — 전부 통과할 때만 차감(all-or-nothing).
+create table if not exists rate_buckets (
+  bucket_key text primary key,
+  tokens double precision not null,
+  updated_at timestamptz not null default now()
+);
+
+create or replace function take_rate_tokens(p_buckets jsonb, p_cost double precision default 1)
+returns boolean
+language plpgsql
+as $$
+declare
+  v_bucket jsonb;
+  v_tokens double precision;
+  v_ok boolean := true;
+begin
+  -- 키 순서로 잠가 동시 호출 간 교착을 피함
+  for v_bucket in select value from jsonb_array_elements(p_buckets) order by value->>'k' loop
+    insert into rate_buckets (bucket_key, tokens)
+      values (v_bucket->>'k', (v_bucket->>'burst')::double precision)
+      on conflict (bucket_key) do nothing;
+    select least(
+             (v_bucket->>'burst')::double precision,
+             tokens + extract(epoch from now() - updated_at) * (v_bucket->>'rate')::double precision
+           )
+      into v_tokens
+      from rate_buckets
+      where bucket_key = v_bucket->>'k'
+      for update;
+    if v_tokens < p_cost then
+      v_ok := false;
+    end if;
+  end loop;
+  if v_ok then
+    update rate_buckets r
+      set tokens = least(
+            (e.value->>'burst')::double precision,
+            r.tokens + extract(epoch from now() - r.updated_at) * (e.value->>'rate')::double precision
+          ) - p_cost,
+          updated_at = now()
+      from jsonb_array_elements(p_buckets) e
+      where r.bucket_key = e.value->>'k';
+  end if;
+  return v_ok;
+end;
+$$;
+
+grant execute on function take_rate_tokens(jsonb, double precision) to anon, authenticated, service_role;
+
+-- 방별 시청자 수(presence): 워커(프로세스)마다 방당 한 행을 주기적으로 upsert.
+-- 읽을 때는 최근 갱신된 행(하트비트 간격의 3배 이내)만 합산하므로 멈춘 워커의 행은 저절로 빠짐.
+create table if not exists room_presence (
+  room_code text not null,
+  worker_id text not null,
+  viewers integer not null,
+  updated_at timestamptz not null default now(),
+  primary key (room_code, worker_id)
+);
+
+create index if not exists idx_room_presence_updated_at on room_presence(updated_at);
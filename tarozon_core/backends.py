@@ -0,0 +1,978 @@
+"""Storage backends for rooms and chat messages (Supabase/PostgREST or local SQLite)."""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import sqlite3
+import string
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .chat_cache import MessageCursor
+
+_SQLITE_BUSY_TIMEOUT_MS = 5000
+_ROOM_CODE_LENGTH = 6
+_ROOM_CODE_CHARS = string.ascii_uppercase + string.digits
+# Attempts inside one create call (server-side for Supabase, in-process for SQLite): no extra round trips
+_CREATE_ATTEMPTS = 32
+# SQLSTATE raised by the create_room SQL function when every attempt collided
+_CODE_EXHAUSTED_SQLSTATE = "TZ001"
+_UNIQUE_VIOLATION_SQLSTATE = "23505"
+_ROOM_NOT_FOUND_SQLSTATE = "TZ002"
+_UNDEFINED_FUNCTION_PGRST = "PGRST202"
+# Events kept before the latest snapshot when a snapshot is written (late readers can still catch up)
+_EVENT_LOG_KEEP = 256
+
+
+class RoomError(RuntimeError):
+    """Room storage operation failed."""
+
+
+class RoomCodeCollisionError(RoomError):
+    """No free room code was found (every generated code was already taken)."""
+
+
+class RoomBackendUnavailableError(RoomError):
+    """The room store could not be reached or rejected the request."""
+
+
+class RoomNotFoundError(RoomError):
+    """The room does not exist (anymore)."""
+
+
+class RoomRateLimitedError(RoomError):
+    """The caller exceeded its rate limit; nothing was sent to the store."""
+
+
+@dataclass(frozen=True)
+class RoomCursor:
+    """Keyset position in the room list: (updated_at, room_code), newest first."""
+
+    updated_at: str
+    room_code: str
+
+    @classmethod
+    def of(cls, row: dict[str, Any]) -> RoomCursor | None:
+        if not row.get("updated_at") or not row.get("room_code"):
+            return None
+        return cls(updated_at=str(row["updated_at"]), room_code=str(row["room_code"]))
+
+
+def _generate_room_code() -> str:
+    return "".join(random.choice(_ROOM_CODE_CHARS) for _ in range(_ROOM_CODE_LENGTH))
+
+
+def utc_now_iso() -> str:
+    # Fixed-width ISO timestamps compare correctly as strings (used for versions and cursors)
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _quote_filter_value(value: Any) -> str:
+    # PostgREST logic-tree values containing , . : ( ) must be double-quoted
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+class RoomBackend:
+    """
+    Storage operations behind RoomManager/ChatManager.
+
+    Methods raise on failure; the managers translate errors into their None/False results.
+    Room codes passed in are already normalized (stripped, upper-case).
+    """
+
+    name = "base"
+
+    def create_room(self, state: dict[str, Any]) -> str:
+        """
+        Allocate a unique room code and insert the room in one atomic operation; returns the code.
+
+        Raises RoomCodeCollisionError when no free code was found, RoomBackendUnavailableError
+        when the store failed.
+        """
+        raise NotImplementedError
+
+    def fetch_room(
+        self,
+        room_code: str,
+        *,
+        since_version: Any = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> dict[str, Any] | None:
+        """
+        Row with state_json, updated_at, version (plus board_hash, and event_seq/snapshot_seq with
+        the event log). None if missing. With since_version, a room whose version is not greater
+        gives {"version": current, "not_modified": True} instead of the row.
+        """
+        raise NotImplementedError
+
+    def fetch_rooms(
+        self,
+        room_codes: list[str],
+        *,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        """fetch_room rows (plus room_code) for several rooms in one query; missing rooms are left out."""
+        raise NotImplementedError
+
+    def list_rooms(
+        self,
+        *,
+        limit: int,
+        updated_after: str | None = None,
+        before: RoomCursor | None = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        """One keyset page of rooms (fetch_rooms rows), most recently updated first."""
+        raise NotImplementedError
+
+    def update_room(self, room_code: str, fields: dict[str, Any]) -> None:
+        """Unconditional update; bumps version."""
+        raise NotImplementedError
+
+    def update_room_if_version(
+        self,
+        room_code: str,
+        state: dict[str, Any],
+        expected_version: int,
+        *,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Replace state_json only if the room is still at expected_version (one atomic statement).
+
+        Returns {"ok": True, "version", "updated_at"} on success, or {"ok": False, ...current row}
+        on conflict. Raises RoomNotFoundError if the room does not exist.
+        """
+        raise NotImplementedError
+
+    def append_room_events(
+        self,
+        room_code: str,
+        events: list[dict[str, Any]],
+        *,
+        snapshot: dict[str, Any] | None = None,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+        expected_version: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Atomically append events to the room's log and bump updated_at/version.
+
+        With snapshot, state_json becomes snapshot as of the new seq (and older events are trimmed).
+        Returns {"ok": True, "seq", "version", "updated_at"}; with expected_version and a different
+        current version, appends nothing and returns {"ok": False, ...current row}.
+        Raises RoomNotFoundError if the room does not exist.
+        """
+        raise NotImplementedError
+
+    def fetch_room_events(self, room_code: str, after_seq: int, limit: int) -> list[dict[str, Any]]:
+        """Log rows (seq, event, version, created_at) with seq > after_seq, ascending."""
+        raise NotImplementedError
+
+    def fetch_rooms_events(self, after_seqs: dict[str, int]) -> list[dict[str, Any]]:
+        """Log rows (room_code, seq, event, version, created_at) after each room's seq, in one query."""
+        raise NotImplementedError
+
+    def insert_message(self, row: dict[str, Any]) -> dict[str, Any] | None:
+        """Insert a message; returns the stored row (id, created_at, ...) when the backend reports it."""
+        raise NotImplementedError
+
+    def fetch_messages(
+        self,
+        room_code: str,
+        *,
+        limit: int,
+        after: MessageCursor | None = None,
+        before: MessageCursor | None = None,
+    ) -> list[dict[str, Any]]:
+        """Keyset page on (created_at, id), oldest first; newest `limit` unless reading after a cursor."""
+        raise NotImplementedError
+
+    def message_stats(self, room_codes: list[str]) -> dict[str, dict[str, Any]]:
+        """{room_code: {"message_count", "last_message_at"}} for rooms with messages, in one query."""
+        raise NotImplementedError
+
+    def upsert_presence(self, rows: list[dict[str, Any]]) -> None:
+        """Insert or replace room_presence rows (room_code, worker_id, viewers, updated_at) in one call."""
+        raise NotImplementedError
+
+    def fetch_presence(self, room_codes: list[str], updated_after: str) -> dict[str, int]:
+        """Viewers per room summed over presence rows refreshed after the ISO timestamp (one query)."""
+        raise NotImplementedError
+
+    def expired_room_codes(self, updated_before: str, limit: int) -> list[str]:
+        """Codes of rooms last updated before the ISO timestamp, oldest first."""
+        raise NotImplementedError
+
+    def delete_rooms(self, room_codes: list[str]) -> tuple[int, int]:
+        """Delete the rooms with their messages, event log and presence; returns (rooms, messages) deleted."""
+        raise NotImplementedError
+
+
+def _room_columns(with_board_hash: bool, with_event_log: bool) -> str:
+    columns = ["state_json", "updated_at", "version"]
+    if with_board_hash:
+        columns.append("board_hash")
+    if with_event_log:
+        columns += ["event_seq", "snapshot_seq"]
+    return ", ".join(columns)
+
+
+class SupabaseRoomBackend(RoomBackend):
+    """Rooms/messages tables through the supabase-py PostgREST client."""
+
+    name = "supabase"
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+        self._has_fetch_rpc = True
+
+    @property
+    def client(self) -> Any:
+        return self._client
+
+    def create_room(self, state: dict[str, Any]) -> str:
+        # create_room() SQL function (supabase_rooms_schema.sql): code allocation + insert in one RPC
+        try:
+            r = self._client.rpc("create_room", {"p_state": state}).execute()
+        except Exception as e:
+            if _postgrest_code(e) != _UNDEFINED_FUNCTION_PGRST:
+                raise _room_error_of(e) from e
+            # Schema without the function yet: client-side codes, retrying only real collisions
+            return self._insert_with_generated_code(state)
+        code = r.data[0] if isinstance(r.data, list) and r.data else r.data
+        if not isinstance(code, str) or not code:
+            raise RoomBackendUnavailableError("create_room returned no room code")
+        return code
+
+    def _insert_with_generated_code(self, state: dict[str, Any]) -> str:
+        for _ in range(_CREATE_ATTEMPTS):
+            code = _generate_room_code()
+            try:
+                self._client.table("rooms").insert({
+                    "room_code": code,
+                    "state_json": state,
+                }).execute()
+                return code
+            except Exception as e:
+                if _postgrest_code(e) == _UNIQUE_VIOLATION_SQLSTATE:
+                    continue
+                raise _room_error_of(e) from e
+        raise RoomCodeCollisionError(f"No free room code after {_CREATE_ATTEMPTS} attempts")
+
+    def fetch_room(
+        self,
+        room_code: str,
+        *,
+        since_version: Any = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> dict[str, Any] | None:
+        columns = _room_columns(with_board_hash, with_event_log)
+        if since_version is not None and self._has_fetch_rpc:
+            # fetch_room_if_newer() SQL function: full row, a version-only answer or null in one RPC
+            try:
+                r = self._client.rpc(
+                    "fetch_room_if_newer", {"p_room_code": room_code, "p_since_version": since_version}
+                ).execute()
+            except Exception as e:
+                if _postgrest_code(e) != _UNDEFINED_FUNCTION_PGRST:
+                    raise
+                self._has_fetch_rpc = False
+            else:
+                data = r.data[0] if isinstance(r.data, list) and r.data else r.data
+                if not isinstance(data, dict) or data.get("not_modified"):
+                    return data if isinstance(data, dict) else None
+                return {c: data.get(c) for c in columns.split(", ")}
+        q = self._client.table("rooms").select(columns).eq("room_code", room_code)
+        if since_version is not None:
+            q = q.gt("version", since_version)
+        r = q.limit(1).execute()
+        if r.data:
+            return r.data[0]
+        if since_version is None:
+            return None
+        # Schema without the function: empty means missing or not newer, so ask which
+        probe = self._client.table("rooms").select("version").eq("room_code", room_code).limit(1).execute()
+        return {"version": probe.data[0]["version"], "not_modified": True} if probe.data else None
+
+    def fetch_rooms(
+        self,
+        room_codes: list[str],
+        *,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        if not room_codes:
+            return []
+        columns = "room_code, " + _room_columns(with_board_hash, with_event_log)
+        r = self._client.table("rooms").select(columns).in_("room_code", room_codes).execute()
+        return list(r.data or [])
+
+    def list_rooms(
+        self,
+        *,
+        limit: int,
+        updated_after: str | None = None,
+        before: RoomCursor | None = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        q = self._client.table("rooms").select("room_code, " + _room_columns(with_board_hash, with_event_log))
+        if updated_after is not None:
+            q = q.gt("updated_at", updated_after)
+        if before is not None:
+            ts = _quote_filter_value(before.updated_at)
+            code = _quote_filter_value(before.room_code)
+            q = q.or_(f"updated_at.lt.{ts},and(updated_at.eq.{ts},room_code.lt.{code})")
+        r = q.order("updated_at", desc=True).order("room_code", desc=True).limit(limit).execute()
+        return list(r.data or [])
+
+    def update_room(self, room_code: str, fields: dict[str, Any]) -> None:
+        # rooms_bump_version trigger increments version
+        self._client.table("rooms").update(fields).eq("room_code", room_code).execute()
+
+    def _rpc_object(self, fn: str, params: dict[str, Any]) -> dict[str, Any]:
+        try:
+            r = self._client.rpc(fn, params).execute()
+        except Exception as e:
+            if _postgrest_code(e) == _ROOM_NOT_FOUND_SQLSTATE:
+                raise RoomNotFoundError(str(e)) from e
+            raise
+        data = r.data[0] if isinstance(r.data, list) and r.data else r.data
+        if not isinstance(data, dict):
+            raise RoomBackendUnavailableError(f"{fn} returned no result")
+        return data
+
+    def update_room_if_version(
+        self,
+        room_code: str,
+        state: dict[str, Any],
+        expected_version: int,
+        *,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+    ) -> dict[str, Any]:
+        # update_room_if_version() SQL function: compare-and-set, current row on conflict, one RPC
+        return self._rpc_object("update_room_if_version", {
+            "p_room_code": room_code,
+            "p_state": state,
+            "p_expected_version": expected_version,
+            "p_board_hash": board_hash,
+            "p_set_board_hash": set_board_hash,
+        })
+
+    def append_room_events(
+        self,
+        room_code: str,
+        events: list[dict[str, Any]],
+        *,
+        snapshot: dict[str, Any] | None = None,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+        expected_version: int | None = None,
+    ) -> dict[str, Any]:
+        # append_room_events() SQL function: seq allocation, log insert and row bump in one RPC
+        return self._rpc_object("append_room_events", {
+            "p_room_code": room_code,
+            "p_events": events,
+            "p_snapshot": snapshot,
+            "p_board_hash": board_hash,
+            "p_set_board_hash": set_board_hash,
+            "p_expected_version": expected_version,
+            "p_keep": _EVENT_LOG_KEEP,
+        })
+
+    def fetch_room_events(self, room_code: str, after_seq: int, limit: int) -> list[dict[str, Any]]:
+        r = (
+            self._client.table("room_events")
+            .select("seq, event, version, created_at")
+            .eq("room_code", room_code)
+            .gt("seq", after_seq)
+            .order("seq")
+            .limit(limit)
+            .execute()
+        )
+        return list(r.data or [])
+
+    def fetch_rooms_events(self, after_seqs: dict[str, int]) -> list[dict[str, Any]]:
+        if not after_seqs:
+            return []
+        spans = ",".join(
+            f"and(room_code.eq.{_quote_filter_value(code)},seq.gt.{int(seq)})" for code, seq in after_seqs.items()
+        )
+        r = (
+            self._client.table("room_events")
+            .select("room_code, seq, event, version, created_at")
+            .or_(spans)
+            .order("room_code")
+            .order("seq")
+            .limit(len(after_seqs) * _EVENT_LOG_KEEP)
+            .execute()
+        )
+        return list(r.data or [])
+
+    def insert_message(self, row: dict[str, Any]) -> dict[str, Any] | None:
+        r = self._client.table("messages").insert(row).execute()
+        return r.data[0] if r.data else None
+
+    def fetch_messages(
+        self,
+        room_code: str,
+        *,
+        limit: int,
+        after: MessageCursor | None = None,
+        before: MessageCursor | None = None,
+    ) -> list[dict[str, Any]]:
+        q = self._client.table("messages").select("id, user_name, content, created_at").eq("room_code", room_code)
+        if after is not None:
+            ts = _quote_filter_value(after.created_at)
+            q = q.or_(f"created_at.gt.{ts},and(created_at.eq.{ts},id.gt.{_quote_filter_value(after.id)})")
+        if before is not None:
+            ts = _quote_filter_value(before.created_at)
+            q = q.or_(f"created_at.lt.{ts},and(created_at.eq.{ts},id.lt.{_quote_filter_value(before.id)})")
+        # Newest-first unless reading forward from a cursor, so "latest N" really is the latest
+        desc = after is None
+        r = q.order("created_at", desc=desc).order("id", desc=desc).limit(limit).execute()
+        rows = list(r.data or [])
+        if desc:
+            rows.reverse()
+        return rows
+
+    def message_stats(self, room_codes: list[str]) -> dict[str, dict[str, Any]]:
+        if not room_codes:
+            return {}
+        # room_message_stats view (supabase_rooms_schema.sql): grouped on the (room_code, created_at, id) index
+        r = (
+            self._client.table("room_message_stats")
+            .select("room_code, message_count, last_message_at")
+            .in_("room_code", room_codes)
+            .execute()
+        )
+        return {
+            row["room_code"]: {"message_count": row.get("message_count"), "last_message_at": row.get("last_message_at")}
+            for row in r.data or []
+        }
+
+    def upsert_presence(self, rows: list[dict[str, Any]]) -> None:
+        if not rows:
+            return
+        from postgrest.types import ReturnMethod
+
+        self._client.table("room_presence").upsert(
+            rows, on_conflict="room_code,worker_id", returning=ReturnMethod.minimal
+        ).execute()
+
+    def fetch_presence(self, room_codes: list[str], updated_after: str) -> dict[str, int]:
+        if not room_codes:
+            return {}
+        r = (
+            self._client.table("room_presence")
+            .select("room_code, viewers")
+            .in_("room_code", room_codes)
+            .gt("updated_at", updated_after)
+            .execute()
+        )
+        counts: dict[str, int] = {}
+        for row in r.data or []:
+            counts[row["room_code"]] = counts.get(row["room_code"], 0) + int(row.get("viewers") or 0)
+        return counts
+
+    def expired_room_codes(self, updated_before: str, limit: int) -> list[str]:
+        r = (
+            self._client.table("rooms")
+            .select("room_code")
+            .lt("updated_at", updated_before)
+            .order("updated_at")
+            .limit(limit)
+            .execute()
+        )
+        return [row["room_code"] for row in (r.data or [])]
+
+    def delete_rooms(self, room_codes: list[str]) -> tuple[int, int]:
+        if not room_codes:
+            return 0, 0
+        from postgrest.types import CountMethod, ReturnMethod
+
+        # Messages/events first: a crash in between leaves rooms to retry, never orphaned rows
+        m = (
+            self._client.table("messages")
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+            .in_("room_code", room_codes)
+            .execute()
+        )
+        self._client.table("room_events").delete(returning=ReturnMethod.minimal).in_("room_code", room_codes).execute()
+        self._client.table("room_presence").delete(returning=ReturnMethod.minimal).in_("room_code", room_codes).execute()
+        r = (
+            self._client.table("rooms")
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+            .in_("room_code", room_codes)
+            .execute()
+        )
+        return int(r.count or 0), int(m.count or 0)
+
+
+def _postgrest_code(exc: BaseException) -> str | None:
+    code = getattr(exc, "code", None)
+    return str(code) if code else None
+
+
+def _room_error_of(exc: BaseException) -> RoomError:
+    if _postgrest_code(exc) in (_CODE_EXHAUSTED_SQLSTATE, _UNIQUE_VIOLATION_SQLSTATE):
+        return RoomCodeCollisionError(str(exc))
+    return RoomBackendUnavailableError(str(exc) or type(exc).__name__)
+
+
+_SQLITE_SCHEMA = """
+create table if not exists rooms (
+  room_code text primary key,
+  state_json text not null,
+  board_hash text,
+  created_at text not null,
+  updated_at text not null,
+  event_seq integer not null default 0,
+  snapshot_seq integer not null default 0,
+  version integer not null default 0
+);
+create table if not exists messages (
+  id integer primary key autoincrement,
+  room_code text not null,
+  user_name text not null,
+  content text not null,
+  created_at text not null
+);
+create index if not exists idx_messages_room_created on messages(room_code, created_at, id);
+create index if not exists idx_rooms_updated_at_code on rooms(updated_at desc, room_code desc);
+drop index if exists idx_rooms_updated_at;
+create table if not exists room_events (
+  room_code text not null,
+  seq integer not null,
+  event text not null,
+  version integer,
+  created_at text not null,
+  primary key (room_code, seq)
+) without rowid;
+create table if not exists room_presence (
+  room_code text not null,
+  worker_id text not null,
+  viewers integer not null,
+  updated_at text not null,
+  primary key (room_code, worker_id)
+) without rowid;
+"""
+# Columns added after the first release of the local schema: (table, column, definition)
+_SQLITE_MIGRATIONS = (
+    ("rooms", "event_seq", "integer not null default 0"),
+    ("rooms", "snapshot_seq", "integer not null default 0"),
+    ("rooms", "version", "integer not null default 0"),
+    ("room_events", "version", "integer"),
+)
+
+
+class SQLiteRoomBackend(RoomBackend):
+    """
+    Rooms/messages in a local SQLite database (WAL mode), same semantics as the Supabase tables.
+
+    One connection per thread; WAL lets viewers read while the host writes. Suitable for
+    single-node deployments and for benchmarking room logic without a network round trip.
+
+    path ":memory:" gives one in-memory database shared by all of this backend's connections
+    (SQLite's memdb VFS, 3.36+), kept alive by an anchor connection for the backend's lifetime.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path | str) -> None:
+        self._path = str(path)
+        self._local = threading.local()
+        self._uri: str | None = None
+        self._anchor: sqlite3.Connection | None = None
+        if self._path == ":memory:":
+            # A plain :memory: connection is private, so every per-thread connection would see
+            # its own empty database. memdb is shared by name within the process and uses the
+            # normal file locking (busy_timeout works), unlike cache=shared.
+            self._uri = f"file:/tarozon-{uuid.uuid4().hex}?vfs=memdb"
+            try:
+                self._anchor = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            except sqlite3.OperationalError as e:
+                raise ValueError(
+                    f"SQLite {sqlite3.sqlite_version} has no memdb VFS for ':memory:'; use a file path"
+                ) from e
+        else:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SQLITE_SCHEMA)
+        for table, column, definition in _SQLITE_MIGRATIONS:
+            existing = {row["name"] for row in conn.execute(f"pragma table_info({table})")}
+            if column not in existing:
+                conn.execute(f"alter table {table} add column {column} {definition}")
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._uri or self._path,
+                timeout=_SQLITE_BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None,
+                uri=self._uri is not None,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            conn.execute(f"pragma busy_timeout={_SQLITE_BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _room_row(row: sqlite3.Row) -> dict[str, Any]:
+        out = dict(row)
+        out["state_json"] = json.loads(out["state_json"]) if out.get("state_json") else None
+        return out
+
+    def create_room(self, state: dict[str, Any]) -> str:
+        state_text = json.dumps(state, ensure_ascii=False)
+        try:
+            conn = self._conn()
+            for _ in range(_CREATE_ATTEMPTS):
+                code = _generate_room_code()
+                now = utc_now_iso()
+                cur = conn.execute(
+                    "insert into rooms (room_code, state_json, created_at, updated_at) values (?, ?, ?, ?)"
+                    " on conflict (room_code) do nothing",
+                    (code, state_text, now, now),
+                )
+                if cur.rowcount == 1:
+                    return code
+        except sqlite3.Error as e:
+            raise RoomBackendUnavailableError(str(e)) from e
+        raise RoomCodeCollisionError(f"No free room code after {_CREATE_ATTEMPTS} attempts")
+
+    def fetch_room(
+        self,
+        room_code: str,
+        *,
+        since_version: Any = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> dict[str, Any] | None:
+        columns = _room_columns(with_board_hash, with_event_log)
+        if since_version is None:
+            row = self._conn().execute(f"select {columns} from rooms where room_code = ? limit 1", (room_code,)).fetchone()
+            return self._room_row(row) if row is not None else None
+        # One read tells "missing" from "not newer"; state is only decoded when newer
+        row = self._conn().execute(
+            f"select {columns}, version > ? as newer from rooms where room_code = ? limit 1",
+            (since_version, room_code),
+        ).fetchone()
+        if row is None:
+            return None
+        if not row["newer"]:
+            return {"version": row["version"], "not_modified": True}
+        out = self._room_row(row)
+        out.pop("newer", None)
+        return out
+
+    def fetch_rooms(
+        self,
+        room_codes: list[str],
+        *,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        if not room_codes:
+            return []
+        marks = ", ".join("?" for _ in room_codes)
+        columns = _room_columns(with_board_hash, with_event_log)
+        rows = self._conn().execute(
+            f"select room_code, {columns} from rooms where room_code in ({marks})", room_codes
+        ).fetchall()
+        return [self._room_row(row) for row in rows]
+
+    def list_rooms(
+        self,
+        *,
+        limit: int,
+        updated_after: str | None = None,
+        before: RoomCursor | None = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        sql = f"select room_code, {_room_columns(with_board_hash, with_event_log)} from rooms where 1 = 1"
+        params: list[Any] = []
+        if updated_after is not None:
+            sql += " and updated_at > ?"
+            params.append(updated_after)
+        if before is not None:
+            sql += " and (updated_at < ? or (updated_at = ? and room_code < ?))"
+            params += [before.updated_at, before.updated_at, before.room_code]
+        sql += " order by updated_at desc, room_code desc limit ?"
+        params.append(int(limit))
+        return [self._room_row(row) for row in self._conn().execute(sql, params).fetchall()]
+
+    def update_room(self, room_code: str, fields: dict[str, Any]) -> None:
+        if not fields:
+            return
+        values = {k: (json.dumps(v, ensure_ascii=False) if k == "state_json" else v) for k, v in fields.items()}
+        assignments = ", ".join(f"{k} = ?" for k in values)
+        self._conn().execute(
+            f"update rooms set {assignments}, version = version + 1 where room_code = ?",
+            [*values.values(), room_code],
+        )
+
+    def _conflict(self, conn: sqlite3.Connection, room_code: str) -> dict[str, Any]:
+        row = conn.execute(
+            f"select {_room_columns(True, True)} from rooms where room_code = ?", (room_code,)
+        ).fetchone()
+        if row is None:
+            raise RoomNotFoundError(f"Room {room_code} not found")
+        return {"ok": False, **self._room_row(row)}
+
+    def update_room_if_version(
+        self,
+        room_code: str,
+        state: dict[str, Any],
+        expected_version: int,
+        *,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+    ) -> dict[str, Any]:
+        now = utc_now_iso()
+        conn = self._conn()
+        with conn:
+            conn.execute("begin immediate")
+            row = conn.execute(
+                "update rooms set state_json = ?, updated_at = ?, version = version + 1,"
+                " snapshot_seq = event_seq,"
+                " board_hash = case when ? then ? else board_hash end"
+                " where room_code = ? and version = ? returning version",
+                (json.dumps(state, ensure_ascii=False), now, set_board_hash, board_hash, room_code, int(expected_version)),
+            ).fetchone()
+            if row is None:
+                return self._conflict(conn, room_code)
+        return {"ok": True, "version": int(row["version"]), "updated_at": now}
+
+    def append_room_events(
+        self,
+        room_code: str,
+        events: list[dict[str, Any]],
+        *,
+        snapshot: dict[str, Any] | None = None,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+        expected_version: int | None = None,
+    ) -> dict[str, Any]:
+        now = utc_now_iso()
+        n = len(events)
+        conn = self._conn()
+        with conn:
+            conn.execute("begin immediate")
+            row = conn.execute(
+                "update rooms set event_seq = event_seq + ?, updated_at = ?, version = version + 1,"
+                " state_json = coalesce(?, state_json),"
+                " snapshot_seq = case when ? then event_seq + ? else snapshot_seq end,"
+                " board_hash = case when ? then ? else board_hash end"
+                " where room_code = ? and (? is null or version = ?) returning event_seq, version",
+                (
+                    n,
+                    now,
+                    json.dumps(snapshot, ensure_ascii=False) if snapshot is not None else None,
+                    snapshot is not None,
+                    n,
+                    set_board_hash,
+                    board_hash,
+                    room_code,
+                    expected_version,
+                    expected_version,
+                ),
+            ).fetchone()
+            if row is None:
+                return self._conflict(conn, room_code)
+            seq, version = int(row["event_seq"]), int(row["version"])
+            conn.executemany(
+                "insert into room_events (room_code, seq, event, version, created_at) values (?, ?, ?, ?, ?)",
+                [
+                    (room_code, seq - n + i + 1, json.dumps(event, ensure_ascii=False, separators=(",", ":")), version, now)
+                    for i, event in enumerate(events)
+                ],
+            )
+            if snapshot is not None:
+                conn.execute(
+                    "delete from room_events where room_code = ? and seq <= ?",
+                    (room_code, seq - _EVENT_LOG_KEEP),
+                )
+        return {"ok": True, "seq": seq, "version": version, "updated_at": now}
+
+    def fetch_room_events(self, room_code: str, after_seq: int, limit: int) -> list[dict[str, Any]]:
+        rows = self._conn().execute(
+            "select seq, event, version, created_at from room_events"
+            " where room_code = ? and seq > ? order by seq limit ?",
+            (room_code, int(after_seq), int(limit)),
+        ).fetchall()
+        return [{**dict(row), "event": json.loads(row["event"])} for row in rows]
+
+    def fetch_rooms_events(self, after_seqs: dict[str, int]) -> list[dict[str, Any]]:
+        if not after_seqs:
+            return []
+        spans = " or ".join("(room_code = ? and seq > ?)" for _ in after_seqs)
+        params: list[Any] = [v for code, seq in after_seqs.items() for v in (code, int(seq))]
+        rows = self._conn().execute(
+            "select room_code, seq, event, version, created_at from room_events"
+            f" where {spans} order by room_code, seq",
+            params,
+        ).fetchall()
+        return [{**dict(row), "event": json.loads(row["event"])} for row in rows]
+
+    def insert_message(self, row: dict[str, Any]) -> dict[str, Any] | None:
+        conn = self._conn()
+        with conn:
+            conn.execute("begin immediate")
+            # Stamped under the write lock: created_at order is commit order, so a reader's forward
+            # cursor can never move past a message that has not committed yet
+            created_at = utc_now_iso()
+            cur = conn.execute(
+                "insert into messages (room_code, user_name, content, created_at) values (?, ?, ?, ?)",
+                (row["room_code"], row["user_name"], row["content"], created_at),
+            )
+        return {**row, "id": cur.lastrowid, "created_at": created_at}
+
+    def fetch_messages(
+        self,
+        room_code: str,
+        *,
+        limit: int,
+        after: MessageCursor | None = None,
+        before: MessageCursor | None = None,
+    ) -> list[dict[str, Any]]:
+        sql = "select id, user_name, content, created_at from messages where room_code = ?"
+        params: list[Any] = [room_code]
+        if after is not None:
+            sql += " and (created_at > ? or (created_at = ? and id > ?))"
+            params += [after.created_at, after.created_at, after.id]
+        if before is not None:
+            sql += " and (created_at < ? or (created_at = ? and id < ?))"
+            params += [before.created_at, before.created_at, before.id]
+        desc = after is None
+        order = "desc" if desc else "asc"
+        sql += f" order by created_at {order}, id {order} limit ?"
+        params.append(int(limit))
+        rows = [dict(r) for r in self._conn().execute(sql, params).fetchall()]
+        if desc:
+            rows.reverse()
+        return rows
+
+    def message_stats(self, room_codes: list[str]) -> dict[str, dict[str, Any]]:
+        if not room_codes:
+            return {}
+        marks = ", ".join("?" for _ in room_codes)
+        rows = self._conn().execute(
+            "select room_code, count(*) as message_count, max(created_at) as last_message_at"
+            f" from messages where room_code in ({marks}) group by room_code",
+            room_codes,
+        ).fetchall()
+        return {
+            row["room_code"]: {"message_count": row["message_count"], "last_message_at": row["last_message_at"]}
+            for row in rows
+        }
+
+    def upsert_presence(self, rows: list[dict[str, Any]]) -> None:
+        if not rows:
+            return
+        conn = self._conn()
+        with conn:
+            conn.execute("begin immediate")
+            conn.executemany(
+                "insert into room_presence (room_code, worker_id, viewers, updated_at) values (?, ?, ?, ?)"
+                " on conflict (room_code, worker_id) do update"
+                " set viewers = excluded.viewers, updated_at = excluded.updated_at",
+                [(r["room_code"], r["worker_id"], int(r["viewers"]), r["updated_at"]) for r in rows],
+            )
+
+    def fetch_presence(self, room_codes: list[str], updated_after: str) -> dict[str, int]:
+        if not room_codes:
+            return {}
+        marks = ", ".join("?" for _ in room_codes)
+        rows = self._conn().execute(
+            "select room_code, sum(viewers) as viewers from room_presence"
+            f" where room_code in ({marks}) and updated_at > ? group by room_code",
+            [*room_codes, updated_after],
+        ).fetchall()
+        return {row["room_code"]: int(row["viewers"] or 0) for row in rows}
+
+    def expired_room_codes(self, updated_before: str, limit: int) -> list[str]:
+        rows = self._conn().execute(
+            "select room_code from rooms where updated_at < ? order by updated_at limit ?",
+            (updated_before, int(limit)),
+        ).fetchall()
+        return [row["room_code"] for row in rows]
+
+    def delete_rooms(self, room_codes: list[str]) -> tuple[int, int]:
+        if not room_codes:
+            return 0, 0
+        marks = ", ".join("?" for _ in room_codes)
+        conn = self._conn()
+        # One short write transaction per batch keeps WAL readers unblocked
+        with conn:
+            conn.execute("begin immediate")
+            messages = conn.execute(f"delete from messages where room_code in ({marks})", room_codes).rowcount
+            conn.execute(f"delete from room_events where room_code in ({marks})", room_codes)
+            conn.execute(f"delete from room_presence where room_code in ({marks})", room_codes)
+            rooms = conn.execute(f"delete from rooms where room_code in ({marks})", room_codes).rowcount
+        return rooms, messages
+
+
+_sqlite_backends: dict[str, SQLiteRoomBackend] = {}
+_sqlite_backends_lock = threading.Lock()
+# One backend per shared client, so room and chat managers share wrappers (e.g. one circuit breaker)
+_supabase_backends: dict[int, tuple[Any, SupabaseRoomBackend]] = {}
+_supabase_backends_lock = threading.Lock()
+
+
+def get_sqlite_backend(path: Path | str) -> SQLiteRoomBackend:
+    """One SQLiteRoomBackend per database path per process."""
+    key = str(path)
+    with _sqlite_backends_lock:
+        backend = _sqlite_backends.get(key)
+        if backend is None:
+            backend = SQLiteRoomBackend(key)
+            _sqlite_backends[key] = backend
+        return backend
+
+
+def room_backend_from_env(client: Any = None) -> RoomBackend | None:
+    """
+    Backend selected by TAROZON_ROOMS_BACKEND.
+
+    - "supabase" (default): needs a Supabase client; None without one.
+    - "sqlite:<path>" (or "sqlite" for ./tarozon_rooms.db): local SQLite in WAL mode.
+    """
+    raw = os.environ.get("TAROZON_ROOMS_BACKEND", "").strip()
+    kind, _, arg = raw.partition(":")
+    kind = kind.strip().lower() or "supabase"
+    if kind == "sqlite":
+        try:
+            return get_sqlite_backend(arg.strip() or "tarozon_rooms.db")
+        except Exception:
+            return None
+    if kind == "supabase" and client is not None:
+        with _supabase_backends_lock:
+            entry = _supabase_backends.get(id(client))
+            if entry is None or entry[0] is not client:
+                entry = (client, SupabaseRoomBackend(client))
+                _supabase_backends[id(client)] = entry
+            return entry[1]
+    return None
@@ -0,0 +1,108 @@
+"""Content-addressed storage for rendered room boards (published by the host, fetched by viewers)."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+def board_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BoardStore:
+    """Stores encoded board images under their SHA-256 hex digest."""
+
+    def put(self, data: bytes) -> str:
+        """Store data and return its digest. Storing the same bytes twice is a no-op."""
+        raise NotImplementedError
+
+    def get(self, digest: str) -> bytes | None:
+        """Return stored bytes for digest, or None if missing/unreachable."""
+        raise NotImplementedError
+
+
+class LocalBoardStore(BoardStore):
+    """Boards as files under root/<aa>/<digest>.png; fine for single-node deployments."""
+
+    def __init__(self, root: Path | str) -> None:
+        self._root = Path(root)
+
+    def _path(self, digest: str) -> Path:
+        return self._root / digest[:2] / f"{digest}.png"
+
+    def put(self, data: bytes) -> str:
+        digest = board_digest(data)
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so readers never see a partial file; the temp name is unique per
+            # writer, so concurrent puts of the same board (threads or processes) never share it
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+                f.write(data)
+            try:
+                os.replace(f.name, path)
+            except OSError:
+                Path(f.name).unlink(missing_ok=True)
+                raise
+        return digest
+
+    def get(self, digest: str) -> bytes | None:
+        if not _is_digest(digest):
+            return None
+        try:
+            return self._path(digest).read_bytes()
+        except OSError:
+            return None
+
+
+class SupabaseBoardStore(BoardStore):
+    """Boards as objects in a Supabase Storage bucket (boards/<digest>.png)."""
+
+    def __init__(self, client: Any, bucket: str) -> None:
+        self._client = client
+        self._bucket = bucket
+
+    def put(self, data: bytes) -> str:
+        digest = board_digest(data)
+        self._client.storage.from_(self._bucket).upload(
+            f"boards/{digest}.png",
+            data,
+            {"content-type": "image/png", "upsert": "true"},
+        )
+        return digest
+
+    def get(self, digest: str) -> bytes | None:
+        if not _is_digest(digest):
+            return None
+        try:
+            return self._client.storage.from_(self._bucket).download(f"boards/{digest}.png")
+        except Exception:
+            return None
+
+
+def _is_digest(value: str) -> bool:
+    return isinstance(value, str) and len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+def board_store_from_env(client: Any = None) -> BoardStore | None:
+    """
+    Build the store selected by TAROZON_BOARD_STORE, or None when publishing is off.
+
+    - "local:<directory>" → LocalBoardStore
+    - "supabase:<bucket>" → SupabaseBoardStore (needs a Supabase client)
+    """
+    raw = os.environ.get("TAROZON_BOARD_STORE", "").strip()
+    if not raw:
+        return None
+    kind, _, arg = raw.partition(":")
+    kind = kind.strip().lower()
+    arg = arg.strip()
+    if kind == "local" and arg:
+        return LocalBoardStore(arg)
+    if kind == "supabase" and arg and client is not None:
+        return SupabaseBoardStore(client, arg)
+    return None
@@ -0,0 +1,159 @@
+"""Per-room in-process chat message cache, merged from incremental fetches."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+_MAX_ROOMS = 256
+_MAX_MESSAGES_PER_ROOM = 1000
+
+
+@dataclass(frozen=True)
+class MessageCursor:
+    """Keyset position of a message: (created_at, id), the messages table sort order."""
+
+    created_at: str
+    id: Any
+
+    @classmethod
+    def of(cls, message: dict[str, Any]) -> MessageCursor | None:
+        created_at = message.get("created_at")
+        if not created_at or message.get("id") is None:
+            return None
+        return cls(created_at=str(created_at), id=message["id"])
+
+
+def _sort_key(message: dict[str, Any]) -> tuple[str, int, int, str]:
+    # Integer ids (both backends) compare numerically ("10" after "9"); other ids after them, as text
+    mid = message.get("id")
+    try:
+        return (str(message.get("created_at") or ""), 0, int(mid), "")
+    except (TypeError, ValueError):
+        return (str(message.get("created_at") or ""), 1, 0, str(mid or ""))
+
+
+@dataclass
+class _RoomMessages:
+    by_id: dict[Any, dict[str, Any]]
+    ordered: list[dict[str, Any]]
+    # True once a backwards page came back short: nothing older exists
+    complete_history: bool = False
+    # Newest message that came from a fetch; local echoes never move it, so syncing after it
+    # cannot skip messages others sent before our own
+    synced: dict[str, Any] | None = None
+    # Bumped whenever messages are added
+    version: int = 0
+
+
+class MessageCache:
+    """
+    Messages per room, ordered oldest first and deduplicated by id.
+
+    Bounded in rooms (LRU) and in messages per room (oldest dropped first).
+    """
+
+    def __init__(self, max_rooms: int = _MAX_ROOMS, max_messages: int = _MAX_MESSAGES_PER_ROOM) -> None:
+        self._max_rooms = max_rooms
+        self._max_messages = max_messages
+        self._lock = threading.Lock()
+        self._rooms: OrderedDict[str, _RoomMessages] = OrderedDict()
+
+    def _room(self, room_code: str) -> _RoomMessages:
+        room = self._rooms.get(room_code)
+        if room is None:
+            room = _RoomMessages(by_id={}, ordered=[])
+            self._rooms[room_code] = room
+            while len(self._rooms) > self._max_rooms:
+                self._rooms.popitem(last=False)
+        self._rooms.move_to_end(room_code)
+        return room
+
+    def merge(self, room_code: str, messages: list[dict[str, Any]], *, synced: bool = True) -> int:
+        """
+        Add messages (any order); returns how many were new.
+
+        synced=False is for local echoes (e.g. a message this process just sent): they show up in
+        latest() right away but do not advance sync_cursor(); the fetched copy is deduplicated by id.
+        """
+        added = 0
+        with self._lock:
+            room = self._room(room_code)
+            for m in messages:
+                mid = m.get("id")
+                if mid is None:
+                    continue
+                if synced and MessageCursor.of(m) and (room.synced is None or _sort_key(m) > _sort_key(room.synced)):
+                    room.synced = m
+                if mid in room.by_id:
+                    continue
+                room.by_id[mid] = m
+                added += 1
+            if added:
+                room.version += 1
+                room.ordered = sorted(room.by_id.values(), key=_sort_key)
+                if len(room.ordered) > self._max_messages:
+                    drop = room.ordered[: len(room.ordered) - self._max_messages]
+                    room.ordered = room.ordered[len(drop):]
+                    for m in drop:
+                        room.by_id.pop(m.get("id"), None)
+                    room.complete_history = False
+        return added
+
+    def mark_complete_history(self, room_code: str) -> None:
+        with self._lock:
+            self._room(room_code).complete_history = True
+
+    def has_older(self, room_code: str) -> bool:
+        with self._lock:
+            room = self._rooms.get(room_code)
+            return room is None or not room.complete_history
+
+    def is_empty(self, room_code: str) -> bool:
+        with self._lock:
+            room = self._rooms.get(room_code)
+            return room is None or not room.ordered
+
+    def newest_cursor(self, room_code: str) -> MessageCursor | None:
+        with self._lock:
+            room = self._rooms.get(room_code)
+            return MessageCursor.of(room.ordered[-1]) if room and room.ordered else None
+
+    def sync_cursor(self, room_code: str) -> MessageCursor | None:
+        """Newest fetched message: incremental syncs read after it (local echoes excluded)."""
+        with self._lock:
+            room = self._rooms.get(room_code)
+            return MessageCursor.of(room.synced) if room and room.synced else None
+
+    def version(self, room_code: str) -> int:
+        """Counter bumped whenever the room gains messages (fetched or echoed)."""
+        with self._lock:
+            room = self._rooms.get(room_code)
+            return room.version if room else 0
+
+    def oldest_cursor(self, room_code: str) -> MessageCursor | None:
+        with self._lock:
+            room = self._rooms.get(room_code)
+            return MessageCursor.of(room.ordered[0]) if room and room.ordered else None
+
+    def latest(self, room_code: str, limit: int) -> list[dict[str, Any]]:
+        """Newest `limit` cached messages, oldest first."""
+        with self._lock:
+            room = self._rooms.get(room_code)
+            if room is None or limit <= 0:
+                return []
+            return list(room.ordered[-limit:])
+
+    def count(self, room_code: str) -> int:
+        with self._lock:
+            room = self._rooms.get(room_code)
+            return len(room.ordered) if room else 0
+
+    def clear(self, room_code: str | None = None) -> None:
+        with self._lock:
+            if room_code is None:
+                self._rooms.clear()
+            else:
+                self._rooms.pop(room_code, None)
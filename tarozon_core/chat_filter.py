@@ -0,0 +1,237 @@
+"""Banned-word / spam filter for chat: one Aho-Corasick automaton over normalized text.
+
+Text and words are normalized the same way before matching:
+
+- NFKC + casefold (full-width letters, ligatures, case)
+- Hangul syllables split into compatibility jamo, compound jamo split into their parts
+  ("닭" -> ㄷㅏㄹㄱ), so "ㅅㅣㅂㅏㄹ" or "시바ㄹ" match the word "시발"
+- separators dropped (spaces, punctuation, symbols, zero-width characters), so "s.p a-m" matches "spam"
+
+A match must start and end on character boundaries of the original text, so a word's jamo
+running into the next syllable ("시바라") does not count. Matches are reported as spans of the
+original text, so masking needs no second scan.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+_HANGUL_FIRST, _HANGUL_LAST = 0xAC00, 0xD7A3
+_SEPARATOR_CATEGORIES = frozenset(
+    {"Zs", "Zl", "Zp", "Cc", "Cf", "Pc", "Pd", "Ps", "Pe", "Pi", "Pf", "Po", "Sm", "Sc", "Sk", "So"}
+)
+_COMPOUND_JAMO = {
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ",
+    "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+}
+_RELOAD_CHECK_SECONDS = 5.0
+
+
+@lru_cache(maxsize=None)
+def _compat_jamo(ch: str) -> str:
+    """Conjoining jamo (choseong/jungseong/jongseong) -> compatibility jamo, compounds split."""
+    try:
+        name = unicodedata.name(ch)
+    except ValueError:
+        return ch
+    for prefix in ("HANGUL CHOSEONG ", "HANGUL JUNGSEONG ", "HANGUL JONGSEONG "):
+        if name.startswith(prefix):
+            try:
+                ch = unicodedata.lookup("HANGUL LETTER " + name[len(prefix):])
+            except KeyError:
+                return ch
+            break
+    return _COMPOUND_JAMO.get(ch, ch)
+
+
+@lru_cache(maxsize=8192)
+def _fold_char(ch: str) -> str:
+    """Normalized form of one input character ('' for separators)."""
+    if ch.isascii():
+        return ch.lower() if ch.isalnum() else ""
+    out = []
+    for c in unicodedata.normalize("NFKC", ch).casefold():
+        if unicodedata.category(c) in _SEPARATOR_CATEGORIES:
+            continue
+        if _HANGUL_FIRST <= ord(c) <= _HANGUL_LAST:
+            out.extend(_compat_jamo(j) for j in unicodedata.normalize("NFD", c))
+        else:
+            out.append(_compat_jamo(c))
+    return "".join(out)
+
+
+def normalize(text: str) -> tuple[str, list[int]]:
+    """Normalized text and, per normalized character, the index of the original character it came from."""
+    folded = list(map(_fold_char, text))
+    return "".join(folded), [i for i, f in enumerate(folded) for _ in f]
+
+
+@dataclass(frozen=True)
+class FilterMatch:
+    """A listed word found in the text: text[start:end] (original indices)."""
+
+    word: str
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class FilterResult:
+    text: str
+    matches: tuple[FilterMatch, ...] = ()
+
+    @property
+    def blocked(self) -> bool:
+        return bool(self.matches)
+
+    def masked(self, mask: str = "*") -> str:
+        """Text with every matched span replaced by mask characters (separators inside a span included)."""
+        if not self.matches:
+            return self.text
+        chars = list(self.text)
+        for m in self.matches:
+            for i in range(m.start, m.end):
+                if not chars[i].isspace():
+                    chars[i] = mask
+        return "".join(chars)
+
+
+class _Automaton:
+    """Aho-Corasick automaton: goto/fail tables as lists of dicts, outputs merged along fail links."""
+
+    __slots__ = ("goto", "fail", "out", "words")
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self.goto: list[dict[str, int]] = [{}]
+        self.out: list[tuple[tuple[int, int], ...]] = [()]  # per state: (word index, normalized length)
+        self.words: list[str] = []
+        seen: set[str] = set()
+        for word in words:
+            key, _ = normalize(word)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            state = 0
+            for c in key:
+                nxt = self.goto[state].get(c)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][c] = nxt
+                    self.goto.append({})
+                    self.out.append(())
+                state = nxt
+            self.out[state] = ((len(self.words), len(key)),)
+            self.words.append(word)
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(c, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, text: str) -> tuple[FilterMatch, ...]:
+        if not self.words:
+            return ()
+        norm, origin = normalize(text)
+        goto, fail, out = self.goto, self.fail, self.out
+        last = len(norm) - 1
+        matches: list[FilterMatch] = []
+        state = 0
+        for j, c in enumerate(norm):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if not out[state]:
+                continue
+            # Only spans that end where an original character ends
+            if j != last and origin[j + 1] == origin[j]:
+                continue
+            for index, length in out[state]:
+                begin = j - length + 1
+                if begin == 0 or origin[begin - 1] != origin[begin]:
+                    matches.append(FilterMatch(self.words[index], origin[begin], origin[j] + 1))
+        return tuple(matches)
+
+
+class ChatFilter:
+    """
+    Thread-safe chat filter. scan() reads the current automaton without locking; reload()
+    builds a new one off to the side and swaps it in with one assignment, so concurrent
+    scans see either the old or the new list, never a half-built one.
+    """
+
+    def __init__(self, words: Iterable[str] = (), path: Path | str | None = None) -> None:
+        self._automaton = _Automaton(words)
+        self._path = Path(path) if path else None
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        if self._path is not None:
+            self.reload_file()
+
+    @property
+    def word_count(self) -> int:
+        return len(self._automaton.words)
+
+    def reload(self, words: Iterable[str]) -> int:
+        """Replace the word list atomically; returns the number of distinct words."""
+        automaton = _Automaton(words)
+        self._automaton = automaton
+        return len(automaton.words)
+
+    def reload_file(self) -> bool:
+        """Reload from the word file if it changed (one word per line, # comments). True if reloaded."""
+        if self._path is None:
+            return False
+        with self._reload_lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = self._path.stat().st_mtime
+                if mtime == self._mtime:
+                    return False
+                lines = self._path.read_text(encoding="utf-8").splitlines()
+            except OSError:
+                return False
+            self.reload(line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#"))
+            self._mtime = mtime
+            return True
+
+    def scan(self, text: str) -> FilterResult:
+        """All listed words in text (overlapping matches included)."""
+        if self._path is not None and time.monotonic() - self._checked_at >= _RELOAD_CHECK_SECONDS:
+            self.reload_file()
+        return FilterResult(text=text, matches=self._automaton.scan(text or ""))
+
+
+_shared: ChatFilter | None = None
+_shared_lock = threading.Lock()
+
+
+def chat_filter_from_env() -> ChatFilter | None:
+    """
+    Process-wide filter from TAROZON_CHAT_FILTER_WORDS (path to a word list, re-read when it
+    changes). None when unset.
+    """
+    global _shared
+    path = os.environ.get("TAROZON_CHAT_FILTER_WORDS", "").strip()
+    if not path:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = ChatFilter(path=path)
+        return _shared
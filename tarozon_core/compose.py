@@ -1,6 +1,10 @@
 from __future__ import annotations
 
 import io
+import math
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
@@ -9,7 +13,10 @@ from PIL import Image, ImageColor, ImageDraw, ImageFont
 
 from .decks import Deck
 from .images import load_card_image
-from .spreads import LayoutSpec, Spread
+from .spreads import LayoutSlot, LayoutSpec, Spread
+
+# Rendered card layers kept per process; a layer bigger than 1/8 of this is never cached
+_LAYER_CACHE_MAX_BYTES = 128 * 1024 * 1024
 
 
 @dataclass(frozen=True)
@@ -84,44 +91,161 @@ def _load_image_cached(path_str: str) -> Image.Image:
     return img.copy()
 
 
-@lru_cache(maxsize=2048)
+_layer_cache: OrderedDict[tuple[str, int, int, int], Image.Image] = OrderedDict()
+_layer_cache_bytes = 0
+_layer_cache_lock = threading.Lock()
+
+
+def _image_nbytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
 def _render_layer_cached(path_str: str, target_w: int, target_h: int, angle: int) -> Image.Image:
+    """Full card layer (resized, rotated), LRU-cached by bytes rather than entry count."""
+    global _layer_cache_bytes
+    key = (path_str, target_w, target_h, angle)
+    with _layer_cache_lock:
+        img = _layer_cache.get(key)
+        if img is not None:
+            _layer_cache.move_to_end(key)
+            return img
     img = _load_image_cached(path_str)
     img = _resize_cover(img, target_w, target_h)
     img = _rotate_rgba(img, angle)
+    size = _image_nbytes(img)
+    if size <= _LAYER_CACHE_MAX_BYTES // 8:
+        with _layer_cache_lock:
+            old = _layer_cache.pop(key, None)
+            if old is not None:
+                _layer_cache_bytes -= _image_nbytes(old)
+            _layer_cache[key] = img
+            _layer_cache_bytes += size
+            while _layer_cache_bytes > _LAYER_CACHE_MAX_BYTES and _layer_cache:
+                _, evicted = _layer_cache.popitem(last=False)
+                _layer_cache_bytes -= _image_nbytes(evicted)
     return img
 
 
-def compose_spread_image(
-    *,
-    repo_root: Path,
-    deck: Deck,
-    spread: Spread,
-    codes_by_slot: dict[str, str],
-    angles_by_slot: dict[str, int],
-    render_back_for_missing: bool = True,
-) -> RenderResult:
+def _render_layer_region(
+    path_str: str,
+    target_w: int,
+    target_h: int,
+    angle: int,
+    region: tuple[int, int, int, int],
+) -> Image.Image:
     """
-    Compose a single PNG image of the spread using Pillow.
+    Part of the layer _render_layer_cached would return, for angle a multiple of 90.
 
-    - Uses spread.layout if present (absolute, with z-order overlap).
-    - Rotation is per-slot and may be 0/180 (normal/reversed) or 90/270 (celtic cross overlay card), etc.
+    region (left, top, right, bottom) is in rotated-layer pixels. Only that part of the
+    source is resized, so a print-zoom tile never builds (or caches) the whole card.
     """
+    x0, y0, x1, y1 = region
+    a = angle % 360
+    # Rotated layer box -> unrotated card box (rotate() is counter-clockwise)
+    if a == 0:
+        box = (x0, y0, x1, y1)
+    elif a == 90:
+        box = (target_w - y1, x0, target_w - y0, x1)
+    elif a == 180:
+        box = (target_w - x1, target_h - y1, target_w - x0, target_h - y0)
+    elif a == 270:
+        box = (y0, target_h - x1, y1, target_h - x0)
+    else:
+        raise ValueError(f"Region rendering needs a multiple of 90 degrees, got {angle}")
+    src = _load_image_cached(path_str)
+    src_w, src_h = src.size
+    if src_w == 0 or src_h == 0:
+        return _render_layer_cached(path_str, target_w, target_h, angle).crop(region)
+    # Same geometry as _resize_cover: scale to cover, then centre-crop
+    scale = max(target_w / src_w, target_h / src_h)
+    new_w, new_h = int(round(src_w * scale)), int(round(src_h * scale))
+    left, top = max(0, (new_w - target_w) // 2), max(0, (new_h - target_h) // 2)
+    fx, fy = new_w / src_w, new_h / src_h
+    part = src.resize(
+        (box[2] - box[0], box[3] - box[1]),
+        Image.Resampling.LANCZOS,
+        box=((left + box[0]) / fx, (top + box[1]) / fy, (left + box[2]) / fx, (top + box[3]) / fy),
+    )
+    return _rotate_rgba(part, a)
+
+
+def _layout_dimensions(layout: LayoutSpec) -> tuple[int, int, int, int]:
+    """Return (canvas_w, canvas_h, card_w, card_h) in output pixels for the layout scale."""
+    scale = float(layout.scale or 1.0)
+    return (
+        int(round(layout.canvas.width * scale)),
+        int(round(layout.canvas.height * scale)),
+        int(round(layout.card.width * scale)),
+        int(round(layout.card.height * scale)),
+    )
+
+
+def _check_layout(spread: Spread) -> LayoutSpec:
     layout: LayoutSpec | None = spread.layout
     if layout is None:
         raise ValueError("Spread has no layout spec; cannot compose.")
 
     if layout.type != "absolute":
         raise ValueError(f"Unsupported layout type: {layout.type}")
+    return layout
+
+
+def _rotated_size(w: int, h: int, angle: int) -> tuple[int, int]:
+    a = angle % 360
+    if a in (0, 180):
+        return w, h
+    if a in (90, 270):
+        return h, w
+    rad = math.radians(a)
+    c, s = abs(math.cos(rad)), abs(math.sin(rad))
+    return int(math.ceil(w * c + h * s)), int(math.ceil(w * s + h * c))
+
+
+def _slot_intersects(
+    slot: LayoutSlot,
+    card_w: int,
+    card_h: int,
+    angle: int,
+    scale: float,
+    clip: tuple[int, int, int, int],
+) -> bool:
+    w, h = _rotated_size(card_w, card_h, angle)
+    if slot.anchor == "topleft":
+        if slot.x is None or slot.y is None:
+            return False
+        left = slot.x * scale
+        top = slot.y * scale
+    else:
+        if slot.cx is None or slot.cy is None:
+            return False
+        left = slot.cx * scale - w / 2
+        top = slot.cy * scale - h / 2
+    # 1px slack for rounding differences against the real rotated layer
+    return left - 1 < clip[2] and left + w + 1 > clip[0] and top - 1 < clip[3] and top + h + 1 > clip[1]
+
+
+def _iter_slot_layers(
+    *,
+    repo_root: Path,
+    deck: Deck,
+    layout: LayoutSpec,
+    codes_by_slot: dict[str, str],
+    angles_by_slot: dict[str, int],
+    render_back_for_missing: bool,
+    zoom: float = 1.0,
+    clip: tuple[int, int, int, int] | None = None,
+) -> Iterator[tuple[Image.Image, int, int]]:
+    """
+    Yield (layer, px, py) for every visible slot in z order.
 
-    scale = float(layout.scale or 1.0)
-    canvas_w = int(round(layout.canvas.width * scale))
-    canvas_h = int(round(layout.canvas.height * scale))
-    card_w = int(round(layout.card.width * scale))
-    card_h = int(round(layout.card.height * scale))
-
-    bg = _hex_to_rgb(layout.canvas.background)
-    canvas = Image.new("RGBA", (canvas_w, canvas_h), (*bg, 255))
+    - `zoom` is applied on top of layout.scale (1.0 = the regular board size).
+    - `clip` (left, top, right, bottom) skips slots whose bounds fall outside it,
+      before their layer is loaded or resized. For right-angle slots only the part of the
+      layer inside clip is rendered, and the yielded image is that part.
+    """
+    scale = float(layout.scale or 1.0) * zoom
+    card_w = max(1, int(round(layout.card.width * scale)))
+    card_h = max(1, int(round(layout.card.height * scale)))
 
     back_img: Image.Image | None = None
     if render_back_for_missing and deck.back_image:
@@ -138,36 +262,96 @@ def compose_spread_image(
         code = codes_by_slot.get(s.key)
 
         angle = int(angles_by_slot.get(s.key, 0))
+        if clip is not None and not _slot_intersects(s, card_w, card_h, angle, scale, clip):
+            continue
         if code:
-            img_path = repo_root / deck.image_dir / f"{code}.jpg"
-            try:
-                img = _render_layer_cached(str(img_path), card_w, card_h, angle)
-            except Exception:
-                card = deck.card_by_code(code)
-                label = f"{code}. {card.display_name}" if card else str(code)
-                img = _draw_placeholder_frame(card_w, card_h, label, angle)
+            path_str = str(repo_root / deck.image_dir / f"{code}.jpg")
+        elif back_img is not None:
+            path_str = str(repo_root / deck.back_image)  # type: ignore[operator]
         else:
-            if back_img is None:
+            continue
+
+        if clip is not None and angle % 90 == 0:
+            # Right angles: the layer size is known up front, so only the clipped part is rendered
+            origin = _layer_origin(s, scale, *_rotated_size(card_w, card_h, angle))
+            if origin is None:
+                continue
+            px, py = origin
+            lw, lh = _rotated_size(card_w, card_h, angle)
+            region = (
+                max(0, clip[0] - px),
+                max(0, clip[1] - py),
+                min(lw, clip[2] - px),
+                min(lh, clip[3] - py),
+            )
+            if region[0] >= region[2] or region[1] >= region[3]:
                 continue
             try:
-                img = _render_layer_cached(str(repo_root / deck.back_image), card_w, card_h, angle)  # type: ignore[arg-type]
-            except Exception:
+                yield _render_layer_region(path_str, card_w, card_h, angle, region), px + region[0], py + region[1]
                 continue
+            except Exception:
+                if not code:
+                    continue
+                # Missing card image: fall through to the (small) full placeholder frame
 
-        # Determine paste position
-        if s.anchor == "topleft":
-            if s.x is None or s.y is None:
-                continue
-            px = int(round(s.x * scale))
-            py = int(round(s.y * scale))
-        else:  # default: center
-            if s.cx is None or s.cy is None:
+        try:
+            img = _render_layer_cached(path_str, card_w, card_h, angle)
+        except Exception:
+            if not code:
                 continue
-            cx = float(s.cx) * scale
-            cy = float(s.cy) * scale
-            px = int(round(cx - img.size[0] / 2))
-            py = int(round(cy - img.size[1] / 2))
+            card = deck.card_by_code(code)
+            label = f"{code}. {card.display_name}" if card else str(code)
+            img = _draw_placeholder_frame(card_w, card_h, label, angle)
+
+        origin = _layer_origin(s, scale, *img.size)
+        if origin is None:
+            continue
+        yield img, origin[0], origin[1]
+
+
+def _layer_origin(slot: LayoutSlot, scale: float, layer_w: int, layer_h: int) -> tuple[int, int] | None:
+    """Paste position of a layer_w x layer_h layer for slot, or None if the slot has no position."""
+    if slot.anchor == "topleft":
+        if slot.x is None or slot.y is None:
+            return None
+        return int(round(slot.x * scale)), int(round(slot.y * scale))
+    # default: center
+    if slot.cx is None or slot.cy is None:
+        return None
+    cx = float(slot.cx) * scale
+    cy = float(slot.cy) * scale
+    return int(round(cx - layer_w / 2)), int(round(cy - layer_h / 2))
+
+
+def compose_spread_image(
+    *,
+    repo_root: Path,
+    deck: Deck,
+    spread: Spread,
+    codes_by_slot: dict[str, str],
+    angles_by_slot: dict[str, int],
+    render_back_for_missing: bool = True,
+) -> RenderResult:
+    """
+    Compose a single PNG image of the spread using Pillow.
+
+    - Uses spread.layout if present (absolute, with z-order overlap).
+    - Rotation is per-slot and may be 0/180 (normal/reversed) or 90/270 (celtic cross overlay card), etc.
+    """
+    layout = _check_layout(spread)
+    canvas_w, canvas_h, _, _ = _layout_dimensions(layout)
+
+    bg = _hex_to_rgb(layout.canvas.background)
+    canvas = Image.new("RGBA", (canvas_w, canvas_h), (*bg, 255))
 
+    for img, px, py in _iter_slot_layers(
+        repo_root=repo_root,
+        deck=deck,
+        layout=layout,
+        codes_by_slot=codes_by_slot,
+        angles_by_slot=angles_by_slot,
+        render_back_for_missing=render_back_for_missing,
+    ):
         canvas.alpha_composite(img, dest=(px, py))
 
     out = io.BytesIO()
@@ -0,0 +1,231 @@
+"""Room/chat change events: in-process hub plus an optional Supabase Realtime relay."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+_RELAY_IDLE_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class RoomEvent:
+    kind: str  # "room" (state changed) or "message" (chat message inserted)
+    room_code: str
+    payload: dict[str, Any] = field(default_factory=dict)
+
+
+class Subscription:
+    def __init__(self, close: Callable[[], None]) -> None:
+        self._close = close
+        self._closed = False
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._close()
+
+
+class RoomEventHub:
+    """
+    Fan-out of room events inside this process.
+
+    Each room keeps a per-kind sequence number, so a caller can cheaply ask "did anything
+    happen since I last looked?" without subscribing. Callbacks run on the publishing thread
+    and must not block.
+
+    Mode (TAROZON_ROOM_EVENTS):
+    - "realtime" (default): local writes plus Supabase Realtime changes for watched rooms.
+    - "local": this process performs every write (single-node), so local events are complete.
+    - "off": events are still published, but never treated as complete; callers keep polling.
+    """
+
+    def __init__(self, mode: str | None = None) -> None:
+        self._mode = (mode or os.environ.get("TAROZON_ROOM_EVENTS", "realtime")).strip().lower() or "realtime"
+        self._lock = threading.Lock()
+        self._seq: dict[tuple[str, str], int] = defaultdict(int)
+        self._subs: dict[str, dict[int, Callable[[RoomEvent], None]]] = defaultdict(dict)
+        self._next_id = 0
+        self._relay: SupabaseRealtimeRelay | None = None
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    def attach_relay(self, relay: SupabaseRealtimeRelay) -> None:
+        with self._lock:
+            if self._relay is None and self._mode == "realtime":
+                self._relay = relay
+
+    def publish(self, event: RoomEvent) -> None:
+        code = event.room_code.strip().upper()
+        with self._lock:
+            self._seq[(code, event.kind)] += 1
+            callbacks = list(self._subs.get(code, {}).values())
+        for cb in callbacks:
+            try:
+                cb(event)
+            except Exception:
+                pass
+
+    def seq(self, room_code: str, kind: str = "room") -> int:
+        with self._lock:
+            return self._seq.get((room_code.strip().upper(), kind), 0)
+
+    def watch(self, room_code: str) -> None:
+        """Mark a room as wanted; starts/keeps the realtime relay channel for it."""
+        relay = self._relay
+        if relay is not None:
+            relay.watch(room_code.strip().upper())
+
+    def is_live(self, room_code: str) -> bool:
+        """True when events for the room are complete, i.e. polling between events is unnecessary."""
+        if self._mode == "local":
+            return True
+        relay = self._relay
+        return relay is not None and relay.is_subscribed(room_code.strip().upper())
+
+    def subscribe(self, room_code: str, callback: Callable[[RoomEvent], None]) -> Subscription:
+        code = room_code.strip().upper()
+        with self._lock:
+            sub_id = self._next_id
+            self._next_id += 1
+            self._subs[code][sub_id] = callback
+        self.watch(code)
+
+        def _close() -> None:
+            with self._lock:
+                room_subs = self._subs.get(code)
+                if room_subs is not None:
+                    room_subs.pop(sub_id, None)
+                    if not room_subs:
+                        self._subs.pop(code, None)
+
+        return Subscription(_close)
+
+
+class SupabaseRealtimeRelay:
+    """
+    Forwards Supabase Realtime postgres_changes for watched rooms into a RoomEventHub.
+
+    Runs its own asyncio loop on a daemon thread (one websocket per process). Rooms not
+    watched for a while are unsubscribed. Any failure simply leaves rooms un-subscribed,
+    and callers fall back to polling.
+    """
+
+    def __init__(self, url: str, key: str, hub: RoomEventHub) -> None:
+        self._url = url.rstrip("/") + "/realtime/v1"
+        self._key = key
+        self._hub = hub
+        self._lock = threading.Lock()
+        self._last_watch: dict[str, float] = {}
+        self._channels: dict[str, Any] = {}
+        self._subscribed: set[str] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: Any = None
+
+    def is_subscribed(self, room_code: str) -> bool:
+        with self._lock:
+            return room_code in self._subscribed
+
+    def watch(self, room_code: str) -> None:
+        with self._lock:
+            is_new = room_code not in self._last_watch
+            self._last_watch[room_code] = time.monotonic()
+            loop = self._ensure_loop()
+        if is_new and loop is not None:
+            asyncio.run_coroutine_threadsafe(self._join(room_code), loop)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop | None:
+        if self._loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True, name="tarozon-realtime").start()
+            self._loop = loop
+            asyncio.run_coroutine_threadsafe(self._reap_idle(), loop)
+        return self._loop
+
+    async def _get_client(self) -> Any:
+        if self._client is None:
+            from realtime import AsyncRealtimeClient
+
+            client = AsyncRealtimeClient(self._url, token=self._key)
+            await client.connect()
+            self._client = client
+        return self._client
+
+    async def _join(self, room_code: str) -> None:
+        try:
+            client = await self._get_client()
+            channel = client.channel(f"tarozon-room-{room_code}")
+
+            def _on_room(payload: Any) -> None:
+                self._hub.publish(RoomEvent("room", room_code, _record_of(payload)))
+
+            def _on_message(payload: Any) -> None:
+                self._hub.publish(RoomEvent("message", room_code, _record_of(payload)))
+
+            def _on_state(status: Any, err: Exception | None) -> None:
+                with self._lock:
+                    if str(getattr(status, "value", status)).upper() == "SUBSCRIBED" and err is None:
+                        self._subscribed.add(room_code)
+                    else:
+                        self._subscribed.discard(room_code)
+
+            channel.on_postgres_changes(
+                "UPDATE", _on_room, table="rooms", schema="public", filter=f"room_code=eq.{room_code}"
+            )
+            channel.on_postgres_changes(
+                "INSERT", _on_message, table="messages", schema="public", filter=f"room_code=eq.{room_code}"
+            )
+            await channel.subscribe(_on_state)
+            with self._lock:
+                self._channels[room_code] = channel
+        except Exception:
+            with self._lock:
+                self._subscribed.discard(room_code)
+                # Forget the watch so the next watch() retries the join
+                self._last_watch.pop(room_code, None)
+
+    async def _reap_idle(self) -> None:
+        while True:
+            await asyncio.sleep(_RELAY_IDLE_SECONDS / 5)
+            now = time.monotonic()
+            with self._lock:
+                idle = [c for c, t in self._last_watch.items() if now - t > _RELAY_IDLE_SECONDS]
+                for code in idle:
+                    self._last_watch.pop(code, None)
+                    self._subscribed.discard(code)
+                channels = [self._channels.pop(c) for c in idle if c in self._channels]
+            for ch in channels:
+                try:
+                    await ch.unsubscribe()
+                except Exception:
+                    pass
+
+
+def _record_of(payload: Any) -> dict[str, Any]:
+    # realtime-py passes {"data": {"record": ...}} (dict) in 2.x
+    if isinstance(payload, dict):
+        data = payload.get("data", payload)
+        record = data.get("record") if isinstance(data, dict) else None
+        return record if isinstance(record, dict) else {}
+    return {}
+
+
+_hub: RoomEventHub | None = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub() -> RoomEventHub:
+    """Process-wide hub shared by RoomManager and ChatManager."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = RoomEventHub()
+        return _hub
@@ -0,0 +1,185 @@
+"""Viewer presence per room: sessions tracked in memory, one batched heartbeat per worker per interval."""
+
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from .backends import RoomBackend, utc_now_iso
+
+_DEFAULT_INTERVAL_SECONDS = 15.0
+_DEFAULT_SESSION_TTL_SECONDS = 60.0
+# Cached counts are at most this old (hosts read them on every rerun)
+_COUNT_CACHE_SECONDS = 5.0
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class PresenceTracker:
+    """
+    Counts viewer sessions per room across workers.
+
+    - touch() records a session locally (no I/O); sessions not seen for session_ttl leave.
+    - Every interval one upsert writes this worker's (room, viewers) rows, only for rooms whose
+      count changed or whose row is due for a refresh, so writes scale with workers, not viewers.
+    - count()/counts() sum the rows refreshed within ttl (3 intervals), so rows of workers that
+      stopped expire on their own.
+    """
+
+    def __init__(
+        self,
+        backend: RoomBackend,
+        *,
+        interval: float = _DEFAULT_INTERVAL_SECONDS,
+        session_ttl: float = _DEFAULT_SESSION_TTL_SECONDS,
+        worker_id: str | None = None,
+    ) -> None:
+        self._backend = backend
+        self._interval = max(1.0, float(interval))
+        self._ttl = 3 * self._interval
+        self._session_ttl = float(session_ttl)
+        self._worker_id = worker_id or _worker_id()
+        self._lock = threading.Lock()
+        self._sessions: dict[str, dict[str, float]] = {}
+        # room -> (viewers written, monotonic time written)
+        self._written: dict[str, tuple[int, float]] = {}
+        self._cache: dict[str, tuple[int, float]] = {}
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counts = {"heartbeats": 0, "rows": 0, "errors": 0, "reads": 0}
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def touch(self, room_code: str, session_key: str) -> None:
+        """Mark session_key as viewing room_code now."""
+        code = (room_code or "").strip().upper()
+        if not code or not session_key:
+            return
+        with self._lock:
+            self._sessions.setdefault(code, {})[session_key] = time.monotonic()
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="tarozon-presence")
+                self._thread.start()
+
+    def leave(self, room_code: str, session_key: str) -> None:
+        """Session left the room (written with the next heartbeat)."""
+        code = (room_code or "").strip().upper()
+        with self._lock:
+            sessions = self._sessions.get(code)
+            if sessions is not None:
+                sessions.pop(session_key, None)
+
+    def local_counts(self) -> dict[str, int]:
+        """Live sessions per room in this worker."""
+        cutoff = time.monotonic() - self._session_ttl
+        with self._lock:
+            return {code: sum(1 for t in s.values() if t >= cutoff) for code, s in self._sessions.items()}
+
+    def _due_rows(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        cutoff = now - self._session_ttl
+        rows = []
+        with self._lock:
+            for code in list(self._sessions.keys() | self._written.keys()):
+                sessions = self._sessions.get(code, {})
+                for key in [k for k, t in sessions.items() if t < cutoff]:
+                    del sessions[key]
+                if not sessions:
+                    self._sessions.pop(code, None)
+                viewers = len(sessions)
+                written = self._written.get(code)
+                # Unchanged rows are refreshed once per ttl/2, well before readers drop them
+                if written is not None and written[0] == viewers and now - written[1] < self._ttl / 2:
+                    continue
+                if written is None and viewers == 0:
+                    continue
+                rows.append({"room_code": code, "worker_id": self._worker_id, "viewers": viewers})
+        return rows
+
+    def flush(self) -> int:
+        """Write due heartbeat rows in one call. Returns how many rows were written."""
+        rows = self._due_rows()
+        if not rows:
+            return 0
+        now_iso = utc_now_iso()
+        try:
+            self._backend.upsert_presence([{**row, "updated_at": now_iso} for row in rows])
+        except Exception:
+            with self._lock:
+                self._counts["errors"] += 1
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self._counts["heartbeats"] += 1
+            self._counts["rows"] += len(rows)
+            for row in rows:
+                if row["viewers"]:
+                    self._written[row["room_code"]] = (row["viewers"], now)
+                else:
+                    self._written.pop(row["room_code"], None)
+        return len(rows)
+
+    def counts(self, room_codes: list[str]) -> dict[str, int]:
+        """Viewers per room over all workers, one query for the rooms not cached. Missing = 0."""
+        codes = sorted({c.strip().upper() for c in room_codes if c and c.strip()})
+        now = time.monotonic()
+        out: dict[str, int] = {}
+        with self._lock:
+            for code in codes:
+                cached = self._cache.get(code)
+                if cached is not None and now - cached[1] < _COUNT_CACHE_SECONDS:
+                    out[code] = cached[0]
+        missing = [c for c in codes if c not in out]
+        if missing:
+            cutoff = (datetime.now(timezone.utc) - timedelta(seconds=self._ttl)).isoformat(timespec="microseconds")
+            try:
+                fetched = self._backend.fetch_presence(missing, cutoff)
+            except Exception:
+                fetched = None
+            with self._lock:
+                self._counts["reads"] += 1
+                for code in missing:
+                    if fetched is None:
+                        out[code] = self._cache.get(code, (0, 0.0))[0]
+                    else:
+                        out[code] = int(fetched.get(code, 0))
+                        self._cache[code] = (out[code], now)
+        return out
+
+    def count(self, room_code: str) -> int:
+        return self.counts([room_code]).get((room_code or "").strip().upper(), 0)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._counts, "rooms": len(self._sessions), "worker_id": self._worker_id}
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(timeout=self._interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop heartbeats and write zero rows so this worker's viewers disappear right away."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        with self._lock:
+            self._sessions.clear()
+            self._written = {code: (-1, 0.0) for code in self._written}
+        self.flush()
@@ -0,0 +1,187 @@
+"""Token-bucket rate limiting for chat sends and room writes, per room and per nickname/session.
+
+Each named limit is a bucket spec (refill rate per second, burst capacity); buckets are created
+per key on first use. Checks are O(1) under one lock, and the key table is bounded (least
+recently used buckets are dropped, which only ever makes a limit more lenient).
+
+Optionally a shared store (take_rate_tokens() in supabase_rooms_schema.sql) enforces the same
+limits across processes; it is consulted only after the local check passed and fails open.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+_MAX_KEYS = 100_000
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    rate: float  # tokens added per second
+    burst: float  # bucket capacity
+
+
+DEFAULT_LIMITS: dict[str, BucketSpec] = {
+    # Chat: per nickname within a room, and per room overall
+    "message_user": BucketSpec(rate=1.0, burst=5),
+    "message_room": BucketSpec(rate=5.0, burst=20),
+    # Room state writes per room (the write queue retries a rejected write after a short backoff)
+    "room_write": BucketSpec(rate=10.0, burst=30),
+    # Room creation per session
+    "room_create": BucketSpec(rate=0.2, burst=3),
+}
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated: float
+
+
+class SupabaseTokenStore:
+    """Shared buckets through the take_rate_tokens() SQL function (one RPC per check)."""
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    def take(self, buckets: list[tuple[str, BucketSpec]], cost: float) -> bool:
+        payload = [{"k": key, "rate": spec.rate, "burst": spec.burst} for key, spec in buckets]
+        r = self._client.rpc("take_rate_tokens", {"p_buckets": payload, "p_cost": cost}).execute()
+        data = r.data[0] if isinstance(r.data, list) and r.data else r.data
+        return data is not False
+
+
+class RateLimiter:
+    """
+    In-process token buckets keyed by (limit name, key).
+
+    acquire() is all-or-nothing over several buckets (e.g. room and nickname), so a rejected
+    message does not use up the room's budget. Unknown limit names always pass.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, BucketSpec] | None = None,
+        *,
+        max_keys: int = _MAX_KEYS,
+        store: SupabaseTokenStore | None = None,
+    ) -> None:
+        self._limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._max_keys = max(1, int(max_keys))
+        self._store = store
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[tuple[str, str], _Bucket] = OrderedDict()
+        self._allowed: dict[str, int] = {}
+        self._rejected: dict[str, int] = {}
+        self._store_errors = 0
+
+    @property
+    def limits(self) -> dict[str, BucketSpec]:
+        return dict(self._limits)
+
+    def _bucket(self, name: str, key: str, spec: BucketSpec, now: float) -> _Bucket:
+        bucket = self._buckets.get((name, key))
+        if bucket is None:
+            bucket = _Bucket(tokens=spec.burst, updated=now)
+            self._buckets[(name, key)] = bucket
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end((name, key))
+            bucket.tokens = min(spec.burst, bucket.tokens + (now - bucket.updated) * spec.rate)
+            bucket.updated = now
+        return bucket
+
+    def acquire(self, checks: list[tuple[str, str]], cost: float = 1.0) -> bool:
+        """Take cost tokens from every (limit, key) bucket, or from none. True if allowed."""
+        checks = [(name, key) for name, key in checks if name in self._limits]
+        if not checks:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            buckets = [self._bucket(name, key, self._limits[name], now) for name, key in checks]
+            for (name, _), bucket in zip(checks, buckets):
+                if bucket.tokens < cost:
+                    self._rejected[name] = self._rejected.get(name, 0) + 1
+                    return False
+            for bucket in buckets:
+                bucket.tokens -= cost
+            for name, _ in checks:
+                self._allowed[name] = self._allowed.get(name, 0) + 1
+        if self._store is not None and not self._take_shared(checks, cost):
+            with self._lock:
+                name = checks[0][0]
+                self._rejected[name] = self._rejected.get(name, 0) + 1
+            return False
+        return True
+
+    def _take_shared(self, checks: list[tuple[str, str]], cost: float) -> bool:
+        try:
+            return self._store.take([(f"{n}:{k}", self._limits[n]) for n, k in checks], cost)  # type: ignore[union-attr]
+        except Exception:
+            with self._lock:
+                self._store_errors += 1
+            return True
+
+    def allow(self, name: str, key: str) -> bool:
+        return self.acquire([(name, key)])
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "allowed": dict(self._allowed),
+                "rejected": dict(self._rejected),
+                "keys": len(self._buckets),
+                "store_errors": self._store_errors,
+            }
+
+
+def parse_limits(spec: str, base: dict[str, BucketSpec] | None = None) -> dict[str, BucketSpec]:
+    """
+    "message_user=1:5,room_write=10:30" -> limits (rate per second : burst) over base.
+    A rate of 0 removes the limit; malformed entries are ignored.
+    """
+    limits = dict(DEFAULT_LIMITS if base is None else base)
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            r = float(rate)
+            b = float(burst) if burst.strip() else max(1.0, r)
+        except ValueError:
+            continue
+        if r <= 0:
+            limits.pop(name.strip(), None)
+        else:
+            limits[name.strip()] = BucketSpec(rate=r, burst=max(1.0, b))
+    return limits
+
+
+_shared: RateLimiter | None = None
+_shared_lock = threading.Lock()
+
+
+def rate_limiter_from_env(client: Any = None) -> RateLimiter | None:
+    """
+    Process-wide limiter configured by env:
+
+    - TAROZON_RATE_LIMIT=off disables limiting (None)
+    - TAROZON_RATE_LIMITS: overrides, e.g. "message_user=1:5,room_create=0.2:3" (rate/s:burst)
+    - TAROZON_RATE_LIMIT_SHARED=1: also enforce across processes through Supabase (needs client)
+    """
+    global _shared
+    if os.environ.get("TAROZON_RATE_LIMIT", "").strip().lower() in ("0", "off", "false", "no"):
+        return None
+    with _shared_lock:
+        if _shared is None:
+            shared = os.environ.get("TAROZON_RATE_LIMIT_SHARED", "").strip().lower() in ("1", "true", "yes", "on")
+            _shared = RateLimiter(
+                parse_limits(os.environ.get("TAROZON_RATE_LIMITS", "")),
+                store=SupabaseTokenStore(client) if shared and client is not None else None,
+            )
+        return _shared
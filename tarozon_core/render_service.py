@@ -0,0 +1,249 @@
+"""Process-pool render service so Streamlit script threads do not run Pillow work themselves."""
+
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from .compose import compose_spread_image, prepare_download_png
+from .decks import Deck, load_decks
+from .singleflight import SingleFlight
+from .spreads import Spread, load_spreads
+
+_DEFAULT_TIMEOUT_SECONDS = 20.0
+
+
+class RenderServiceError(RuntimeError):
+    """Render request could not be completed by the service."""
+
+
+class RenderTimeoutError(RenderServiceError):
+    """Render request did not finish within its timeout."""
+
+
+@dataclass(frozen=True)
+class BoardRenderRequest:
+    repo_root: str
+    deck_id: str
+    spread_id: str
+    spread_mtime: int
+    codes: tuple[str | None, ...]
+    angles: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class DownloadRenderRequest:
+    png_bytes: bytes
+    watermark_text: str = "Tarozon.com"
+    max_side: int = 1080
+    padding: int = 18
+    compress_level: int = 9
+
+
+RenderRequest = BoardRenderRequest | DownloadRenderRequest
+
+
+@dataclass(frozen=True)
+class RenderResponse:
+    png_bytes: bytes
+    width: int
+    height: int
+
+
+@lru_cache(maxsize=8)
+def _load_catalog(repo_root: str, spread_mtime: int) -> tuple[dict[str, Deck], dict[str, Spread]]:
+    # spread_mtime only busts the cache when spread JSON changes on disk
+    root = Path(repo_root)
+    return load_decks(root), load_spreads(root)
+
+
+def handle_render_request(request: RenderRequest) -> RenderResponse:
+    """Execute one request in the current process (worker entry point and inline fallback)."""
+    if isinstance(request, BoardRenderRequest):
+        decks, spreads = _load_catalog(request.repo_root, request.spread_mtime)
+        deck = decks[request.deck_id]
+        spread = spreads[request.spread_id]
+        codes_by_slot = {
+            slot.key: code
+            for slot, code in zip(spread.slots, request.codes, strict=False)
+            if code
+        }
+        angles_by_slot = {
+            slot.key: int(request.angles[i]) for i, slot in enumerate(spread.slots) if i < len(request.angles)
+        }
+        rendered = compose_spread_image(
+            repo_root=Path(request.repo_root),
+            deck=deck,
+            spread=spread,
+            codes_by_slot=codes_by_slot,
+            angles_by_slot=angles_by_slot,
+            render_back_for_missing=True,
+        )
+        return RenderResponse(png_bytes=rendered.png_bytes, width=rendered.width, height=rendered.height)
+    if isinstance(request, DownloadRenderRequest):
+        out_bytes, w, h = prepare_download_png(
+            png_bytes=request.png_bytes,
+            watermark_text=request.watermark_text,
+            max_side=request.max_side,
+            padding=request.padding,
+            compress_level=request.compress_level,
+        )
+        return RenderResponse(png_bytes=out_bytes, width=w, height=h)
+    raise TypeError(f"Unsupported render request: {type(request).__name__}")
+
+
+class RenderService:
+    """
+    Runs render requests on a pool of worker processes.
+
+    - max_workers=0 disables the pool; requests then run inline in the caller's thread.
+    - A crashed pool is replaced and the request retried once, then run inline.
+    - A request exceeding its timeout raises RenderTimeoutError and the pool is recycled: its
+      workers are killed, so a wedged worker cannot hold up later requests, and requests that
+      were still queued on the old pool are resubmitted to the new one within their own timeout.
+    - Identical requests arriving while one is in flight wait for it and share its bytes
+      (e.g. every viewer of a room rendering the host's new board at once).
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        timeout: float = _DEFAULT_TIMEOUT_SECONDS,
+        handler: Callable[[RenderRequest], RenderResponse] = handle_render_request,
+    ) -> None:
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+        self._max_workers = max(0, int(max_workers))
+        self._timeout = float(timeout)
+        # Must be a module-level function: spawn workers import it by name
+        self._handler = handler
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._flights: SingleFlight[RenderResponse] = SingleFlight()
+        self.restarts = 0
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a multi-threaded Streamlit server is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> bool:
+        """Retire executor and kill its workers; False when another caller already replaced it."""
+        with self._lock:
+            if self._executor is not executor:
+                return False
+            self._executor = None
+            self.restarts += 1
+        # No cancel_futures: other callers' futures fail with BrokenProcessPool once the workers
+        # are gone, and those callers resubmit to the new pool
+        _kill_workers(executor)
+        return True
+
+    @property
+    def coalesced(self) -> int:
+        """Number of requests served by another caller's in-flight render."""
+        return self._flights.shared
+
+    def submit(self, request: RenderRequest, timeout: float | None = None) -> RenderResponse:
+        """Run request on the pool and wait for its response; identical in-flight requests are coalesced."""
+        return self._flights.do(request, lambda: self._submit_once(request, timeout))
+
+    def _submit_once(self, request: RenderRequest, timeout: float | None) -> RenderResponse:
+        if self._max_workers == 0:
+            return self._handler(request)
+        wait = self._timeout if timeout is None else float(timeout)
+        deadline = time.monotonic() + wait
+        failures = 0
+        while failures < 2:
+            executor = self._get_executor()
+            try:
+                future: Future[RenderResponse] = executor.submit(self._handler, request)
+            except RuntimeError:
+                # Broken pool, or shut down by a concurrent recycle
+                if self._recycle(executor):
+                    failures += 1
+                continue
+            try:
+                return future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError as e:
+                if not future.cancel():
+                    # Already handed to the workers: assume one is wedged. A request still
+                    # waiting in the pool's own queue says nothing about the workers.
+                    self._recycle(executor)
+                raise RenderTimeoutError(f"Render timed out after {wait:.1f}s") from e
+            except (BrokenProcessPool, CancelledError):
+                # Our own pool crashed, or another caller's timeout recycled it under us
+                if self._recycle(executor):
+                    failures += 1
+        return self._handler(request)
+
+    def render_board(self, request: BoardRenderRequest, timeout: float | None = None) -> RenderResponse:
+        return self.submit(request, timeout=timeout)
+
+    def prepare_download(self, request: DownloadRenderRequest, timeout: float | None = None) -> RenderResponse:
+        return self.submit(request, timeout=timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _kill_workers(executor: ProcessPoolExecutor) -> None:
+    """Shut executor down without cancelling its futures, then kill its worker processes."""
+    # shutdown() drops the process table, so take it first
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False)
+    for process in processes:
+        try:
+            process.kill()
+        except Exception:
+            pass
+
+
+_service: RenderService | None = None
+_service_lock = threading.Lock()
+
+
+def get_render_service() -> RenderService:
+    """
+    Process-wide render service.
+
+    Configured by TAROZON_RENDER_WORKERS (0 = render inline) and TAROZON_RENDER_TIMEOUT (seconds).
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            workers_raw = os.environ.get("TAROZON_RENDER_WORKERS", "").strip()
+            timeout_raw = os.environ.get("TAROZON_RENDER_TIMEOUT", "").strip()
+            try:
+                workers = int(workers_raw) if workers_raw else None
+            except ValueError:
+                workers = None
+            try:
+                timeout = float(timeout_raw) if timeout_raw else _DEFAULT_TIMEOUT_SECONDS
+            except ValueError:
+                timeout = _DEFAULT_TIMEOUT_SECONDS
+            _service = RenderService(max_workers=workers, timeout=timeout)
+            atexit.register(_service.shutdown)
+        return _service
@@ -0,0 +1,389 @@
+"""Resilience layer for room/chat backends: per-call timeouts, circuit breaker, hedged reads."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, TypeVar
+
+from .backends import (
+    RoomBackend,
+    RoomBackendUnavailableError,
+    RoomCodeCollisionError,
+    RoomCursor,
+    RoomNotFoundError,
+)
+
+T = TypeVar("T")
+
+_DEFAULT_TIMEOUT_SECONDS = 2.0
+_DEFAULT_FAILURE_THRESHOLD = 5
+_DEFAULT_RESET_SECONDS = 15.0
+_DEFAULT_WORKERS = 16
+
+# Outcomes that mean the store answered correctly; they never trip the breaker
+_EXPECTED_ERRORS = (RoomCodeCollisionError, RoomNotFoundError)
+
+
+class BackendTimeoutError(RoomBackendUnavailableError):
+    """The call did not finish within its time budget."""
+
+
+class CircuitOpenError(RoomBackendUnavailableError):
+    """The circuit breaker is open; the call was rejected without contacting the store."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls pass; failure_threshold consecutive failures open the circuit.
+    open: calls are rejected until reset_seconds have passed.
+    half_open: one trial call at a time; success closes, failure re-opens.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = _DEFAULT_FAILURE_THRESHOLD,
+        reset_seconds: float = _DEFAULT_RESET_SECONDS,
+    ) -> None:
+        self._threshold = max(1, int(failure_threshold))
+        self._reset_seconds = float(reset_seconds)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self._reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self._reset_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self._threshold:
+                self._opened_at = time.monotonic()
+
+
+class ResilientRoomBackend(RoomBackend):
+    """
+    Wraps a RoomBackend so no call blocks longer than timeout.
+
+    - Reads and idempotent writes run on a bounded worker pool and are abandoned after timeout
+      (BackendTimeoutError); the caller returns while the stuck request finishes in the background.
+    - Non-idempotent writes (create_room, insert_message, append_room_events, update_room_if_version)
+      are never abandoned: one that timed out may still land, and a caller told it failed would
+      retry into a duplicate message or orphan room. They run to completion in the caller's
+      thread, bounded by the store client's own timeout, and still count towards the breaker.
+    - A circuit breaker fails fast (CircuitOpenError) during outages instead of waiting out
+      the timeout on every call.
+    - With hedge_after set, fetch_room sends a second request if the first has not answered
+      within hedge_after seconds and uses whichever answers first.
+    - stats() counts every outcome.
+    """
+
+    def __init__(
+        self,
+        inner: RoomBackend,
+        *,
+        timeout: float = _DEFAULT_TIMEOUT_SECONDS,
+        hedge_after: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        workers: int = _DEFAULT_WORKERS,
+    ) -> None:
+        self._inner = inner
+        self._timeout = float(timeout)
+        self._hedge_after = float(hedge_after) if hedge_after else None
+        self._breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="tarozon-rooms-io")
+        self._lock = threading.Lock()
+        self._counts = {
+            "calls": 0,
+            "ok": 0,
+            "expected_errors": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+        }
+
+    @property
+    def name(self) -> str:  # type: ignore[override]
+        return self._inner.name
+
+    @property
+    def inner(self) -> RoomBackend:
+        return self._inner
+
+    @property
+    def client(self) -> Any:
+        return getattr(self._inner, "client", None)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self._breaker
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._counts, "breaker": self._breaker.state}
+
+    def _record(self, error: BaseException | None) -> None:
+        if error is None:
+            self._count("ok")
+            self._breaker.record_success()
+        elif isinstance(error, _EXPECTED_ERRORS):
+            self._count("expected_errors")
+            self._breaker.record_success()
+        else:
+            self._count("timeouts" if isinstance(error, BackendTimeoutError) else "errors")
+            self._breaker.record_failure()
+
+    def _call(self, fn: Callable[..., T], *args: Any, hedge: bool = False, **kwargs: Any) -> T:
+        self._count("calls")
+        if not self._breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Room storage circuit is open")
+        start = time.monotonic()
+        deadline = start + self._timeout
+        hedge_at = start + self._hedge_after if hedge and self._hedge_after is not None else None
+        primary = self._executor.submit(fn, *args, **kwargs)
+        pending: set[Future[T]] = {primary}
+        error: BaseException | None = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=until - now, return_when=FIRST_COMPLETED)
+            for f in done:
+                exc = f.exception()
+                if exc is None:
+                    if f is not primary:
+                        self._count("hedge_wins")
+                    self._record(None)
+                    return f.result()
+                error = exc
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                if pending:
+                    self._count("hedged")
+                    pending.add(self._executor.submit(fn, *args, **kwargs))
+        if error is not None and not pending:
+            self._record(error)
+            raise error
+        timeout_error = BackendTimeoutError(f"Room storage call exceeded {self._timeout:.1f}s")
+        self._record(timeout_error)
+        raise timeout_error
+
+    def _call_to_completion(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        self._count("calls")
+        if not self._breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Room storage circuit is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    def create_room(self, state: dict[str, Any]) -> str:
+        return self._call_to_completion(self._inner.create_room, state)
+
+    def fetch_room(
+        self,
+        room_code: str,
+        *,
+        since_version: Any = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> dict[str, Any] | None:
+        return self._call(
+            self._inner.fetch_room,
+            room_code,
+            since_version=since_version,
+            with_board_hash=with_board_hash,
+            with_event_log=with_event_log,
+            hedge=True,
+        )
+
+    def fetch_rooms(
+        self,
+        room_codes: list[str],
+        *,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        return self._call(
+            self._inner.fetch_rooms,
+            room_codes,
+            with_board_hash=with_board_hash,
+            with_event_log=with_event_log,
+        )
+
+    def list_rooms(
+        self,
+        *,
+        limit: int,
+        updated_after: str | None = None,
+        before: RoomCursor | None = None,
+        with_board_hash: bool = False,
+        with_event_log: bool = False,
+    ) -> list[dict[str, Any]]:
+        return self._call(
+            self._inner.list_rooms,
+            limit=limit,
+            updated_after=updated_after,
+            before=before,
+            with_board_hash=with_board_hash,
+            with_event_log=with_event_log,
+        )
+
+    def update_room(self, room_code: str, fields: dict[str, Any]) -> None:
+        return self._call(self._inner.update_room, room_code, fields)
+
+    def update_room_if_version(
+        self,
+        room_code: str,
+        state: dict[str, Any],
+        expected_version: int,
+        *,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+    ) -> dict[str, Any]:
+        return self._call_to_completion(
+            self._inner.update_room_if_version,
+            room_code,
+            state,
+            expected_version,
+            board_hash=board_hash,
+            set_board_hash=set_board_hash,
+        )
+
+    def append_room_events(
+        self,
+        room_code: str,
+        events: list[dict[str, Any]],
+        *,
+        snapshot: dict[str, Any] | None = None,
+        board_hash: str | None = None,
+        set_board_hash: bool = False,
+        expected_version: int | None = None,
+    ) -> dict[str, Any]:
+        return self._call_to_completion(
+            self._inner.append_room_events,
+            room_code,
+            events,
+            snapshot=snapshot,
+            board_hash=board_hash,
+            set_board_hash=set_board_hash,
+            expected_version=expected_version,
+        )
+
+    def fetch_room_events(self, room_code: str, after_seq: int, limit: int) -> list[dict[str, Any]]:
+        return self._call(self._inner.fetch_room_events, room_code, after_seq, limit)
+
+    def fetch_rooms_events(self, after_seqs: dict[str, int]) -> list[dict[str, Any]]:
+        return self._call(self._inner.fetch_rooms_events, after_seqs)
+
+    def insert_message(self, row: dict[str, Any]) -> dict[str, Any] | None:
+        return self._call_to_completion(self._inner.insert_message, row)
+
+    def fetch_messages(
+        self,
+        room_code: str,
+        *,
+        limit: int,
+        after: Any = None,
+        before: Any = None,
+    ) -> list[dict[str, Any]]:
+        return self._call(self._inner.fetch_messages, room_code, limit=limit, after=after, before=before)
+
+    def message_stats(self, room_codes: list[str]) -> dict[str, dict[str, Any]]:
+        return self._call(self._inner.message_stats, room_codes)
+
+    def upsert_presence(self, rows: list[dict[str, Any]]) -> None:
+        return self._call(self._inner.upsert_presence, rows)
+
+    def fetch_presence(self, room_codes: list[str], updated_after: str) -> dict[str, int]:
+        return self._call(self._inner.fetch_presence, room_codes, updated_after)
+
+    def expired_room_codes(self, updated_before: str, limit: int) -> list[str]:
+        return self._call(self._inner.expired_room_codes, updated_before, limit)
+
+    def delete_rooms(self, room_codes: list[str]) -> tuple[int, int]:
+        return self._call(self._inner.delete_rooms, room_codes)
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.environ.get(name, "").strip()
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+_wrapped: dict[int, tuple[RoomBackend, ResilientRoomBackend]] = {}
+_wrapped_lock = threading.Lock()
+
+
+def resilient_backend_from_env(inner: RoomBackend) -> RoomBackend:
+    """
+    Shared ResilientRoomBackend for inner (one breaker per store per process), configured by env:
+
+    - TAROZON_ROOMS_TIMEOUT: per-call budget for reads and idempotent writes in seconds
+      (default 2; 0 disables the wrapper)
+    - TAROZON_ROOMS_HEDGE_AFTER: hedge get_room after this many seconds (default off)
+    - TAROZON_ROOMS_BREAKER_FAILURES / TAROZON_ROOMS_BREAKER_RESET: consecutive failures to open,
+      seconds before a trial call (defaults 5 / 15)
+    """
+    if isinstance(inner, ResilientRoomBackend):
+        return inner
+    timeout = _env_float("TAROZON_ROOMS_TIMEOUT", _DEFAULT_TIMEOUT_SECONDS)
+    if timeout <= 0:
+        return inner
+    with _wrapped_lock:
+        entry = _wrapped.get(id(inner))
+        if entry is not None and entry[0] is inner:
+            return entry[1]
+        wrapped = ResilientRoomBackend(
+            inner,
+            timeout=timeout,
+            hedge_after=_env_float("TAROZON_ROOMS_HEDGE_AFTER", 0.0) or None,
+            breaker=CircuitBreaker(
+                failure_threshold=int(_env_float("TAROZON_ROOMS_BREAKER_FAILURES", _DEFAULT_FAILURE_THRESHOLD)),
+                reset_seconds=_env_float("TAROZON_ROOMS_BREAKER_RESET", _DEFAULT_RESET_SECONDS),
+            ),
+        )
+        _wrapped[id(inner)] = (inner, wrapped)
+        return wrapped
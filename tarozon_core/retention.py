@@ -0,0 +1,103 @@
+"""Retention sweep: batch-delete expired rooms and their chat messages.
+
+Run periodically (cron, scheduled job):
+
+    python -m tarozon_core.retention --ttl-hours 72 --batch-size 200
+
+Uses the same backend selection as the app (TAROZON_ROOMS_BACKEND, SUPABASE_URL/keys).
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from .backends import RoomBackend, room_backend_from_env
+
+_DEFAULT_TTL_HOURS = 72.0
+_DEFAULT_BATCH_SIZE = 200
+
+
+@dataclass(frozen=True)
+class RetentionResult:
+    rooms: int
+    messages: int
+    batches: int
+    dry_run: bool = False
+
+
+def sweep_expired_rooms(
+    backend: RoomBackend,
+    *,
+    ttl: timedelta,
+    batch_size: int = _DEFAULT_BATCH_SIZE,
+    max_batches: int | None = None,
+    pause_seconds: float = 0.0,
+    dry_run: bool = False,
+) -> RetentionResult:
+    """
+    Delete rooms not updated within ttl, batch_size rooms (and their messages) per batch.
+
+    Small batches keep each delete short so live rooms are not slowed down; pause_seconds
+    spaces the batches further. dry_run only counts expired rooms (up to max_batches batches).
+    """
+    cutoff = (datetime.now(timezone.utc) - ttl).isoformat(timespec="microseconds")
+    batch_size = max(1, int(batch_size))
+    if dry_run:
+        codes = backend.expired_room_codes(cutoff, batch_size * (max_batches or 1))
+        return RetentionResult(rooms=len(codes), messages=0, batches=0, dry_run=True)
+    rooms = messages = batches = 0
+    while max_batches is None or batches < max_batches:
+        codes = backend.expired_room_codes(cutoff, batch_size)
+        if not codes:
+            break
+        deleted_rooms, deleted_messages = backend.delete_rooms(codes)
+        rooms += deleted_rooms
+        messages += deleted_messages
+        batches += 1
+        if len(codes) < batch_size:
+            break
+        if pause_seconds > 0:
+            time.sleep(pause_seconds)
+    return RetentionResult(rooms=rooms, messages=messages, batches=batches)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tarozon_core.retention", description=__doc__.splitlines()[0])
+    parser.add_argument("--ttl-hours", type=float, default=_DEFAULT_TTL_HOURS, help="delete rooms idle longer than this")
+    parser.add_argument("--batch-size", type=int, default=_DEFAULT_BATCH_SIZE, help="rooms deleted per batch")
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many batches")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="only count expired rooms")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+    from .rooms import get_client_provider
+
+    backend = room_backend_from_env(None) or room_backend_from_env(get_client_provider().get())
+    if backend is None:
+        parser.error("no room backend configured (SUPABASE_URL/SUPABASE_SERVICE_KEY or TAROZON_ROOMS_BACKEND)")
+    result = sweep_expired_rooms(
+        backend,
+        ttl=timedelta(hours=args.ttl_hours),
+        batch_size=args.batch_size,
+        max_batches=args.max_batches,
+        pause_seconds=args.pause,
+        dry_run=args.dry_run,
+    )
+    if result.dry_run:
+        print(f"{result.rooms} expired room(s) (dry run)")
+    else:
+        print(f"deleted {result.rooms} room(s), {result.messages} message(s) in {result.batches} batch(es)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,500 @@
+"""Room/chat load benchmark: N hosts and M viewers per room against a PostgREST endpoint.
+
+Drives the real RoomManager/ChatManager/RoomWatcherRegistry/PresenceTracker stack the way app.py
+does, at the app's cadence:
+
+- every simulated app worker has its own pooled Supabase client, watcher registry and caches;
+  viewers are spread over the workers, each room's host sits on one of them
+- sessions refresh at the room's adaptive interval (registry.interval, TAROZON_LIVE_POLL_MIN/MAX)
+  and read the watcher snapshot and message cache; viewers also touch presence
+- hosts draw a card every --host-action-seconds through the write-behind queue and chat every
+  --host-chat-seconds; viewers chat every --viewer-chat-seconds on average
+- optional admin consoles page through active rooms every 30 seconds
+
+By default a local PostgREST stand-in (tarozon_core.postgrest_stub) is started in a separate
+process, so its work does not share this process's GIL:
+
+    python -m tarozon_core.room_bench --hosts 20 --viewers 10 --workers 2 --duration 60
+    python -m tarozon_core.room_bench --hosts 50 --viewers 20 --latency-ms 25 --error-rate 0.01
+
+Reports client-side calls per backend operation (QPS, p50/p95/p99 latency, error rate) measured
+above the timeout/circuit-breaker layer, plus the stub's server-side counts when available.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+from .backends import RoomBackend, RoomCodeCollisionError, RoomNotFoundError, SupabaseRoomBackend
+from .chat_cache import MessageCache
+from .events import RoomEventHub
+from .postgrest_stub import STUB_KEY, percentile
+from .rate_limit import RateLimiter
+from .resilience import resilient_backend_from_env
+from .room_watch import RoomWatcherRegistry, poll_bounds_from_env
+from .rooms import ChatManager, RoomManager, SupabaseClientProvider
+
+# Same values as app.py
+_EVENT_FALLBACK_POLL_SECONDS = 30.0
+_CHAT_PAGE_SIZE = 20
+_HOST_CONSOLE_PAGE_SIZE = 25
+_HOST_CONSOLE_SECONDS = 30.0
+# (spread id, slots) used for simulated rooms
+_SPREADS = (("three_cards_past_present_future", 3), ("celtic_cross", 10), ("one_card", 1))
+_EXPECTED_ERRORS = (RoomNotFoundError, RoomCodeCollisionError)
+
+
+@dataclass(frozen=True)
+class BenchConfig:
+    hosts: int = 10
+    viewers: int = 10
+    workers: int = 2
+    duration: float = 60.0
+    warmup: float = 5.0
+    host_action_seconds: float = 5.0
+    host_chat_seconds: float = 15.0
+    viewer_chat_seconds: float = 120.0
+    consoles: int = 0
+    event_log: bool = False
+    poll_min: float = 3.0
+    poll_max: float = 30.0
+    threads: int = 32
+    seed: int | None = None
+
+
+class LatencyRecorder:
+    """Thread-safe call latencies and failures per operation."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: dict[str, list[float]] = {}
+        self._errors: dict[str, int] = {}
+        self._since = time.monotonic()
+
+    def record(self, op: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.setdefault(op, []).append(seconds)
+            if not ok:
+                self._errors[op] = self._errors.get(op, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._errors.clear()
+            self._since = time.monotonic()
+
+    def report(self) -> dict[str, Any]:
+        with self._lock:
+            elapsed = max(1e-9, time.monotonic() - self._since)
+            samples = {op: list(v) for op, v in self._samples.items()}
+            errors = dict(self._errors)
+        ops = {op: _summary(values, errors.get(op, 0), elapsed) for op, values in sorted(samples.items())}
+        every = [s for values in samples.values() for s in values]
+        return {"seconds": round(elapsed, 3), "ops": ops, "total": _summary(every, sum(errors.values()), elapsed)}
+
+
+def _summary(values: list[float], errors: int, elapsed: float) -> dict[str, Any]:
+    return {
+        "calls": len(values),
+        "qps": round(len(values) / elapsed, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "errors": errors,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+    }
+
+
+class TimedBackend:
+    """Delegates to a RoomBackend, recording every backend method call in a LatencyRecorder."""
+
+    def __init__(self, inner: RoomBackend, recorder: LatencyRecorder) -> None:
+        self._inner = inner
+        self._recorder = recorder
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._inner, name)
+        if name.startswith("_") or not callable(attr) or not hasattr(RoomBackend, name):
+            return attr
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.monotonic()
+            ok = False
+            try:
+                result = attr(*args, **kwargs)
+                ok = True
+                return result
+            except _EXPECTED_ERRORS:
+                ok = True
+                raise
+            finally:
+                self._recorder.record(name, time.monotonic() - start, ok)
+
+        return timed
+
+
+@dataclass
+class _Worker:
+    """One simulated app process: its own client pool, managers and watcher registry."""
+
+    provider: SupabaseClientProvider
+    backend: Any
+    rooms: RoomManager
+    chat: ChatManager
+    watchers: RoomWatcherRegistry
+    limiter: RateLimiter
+
+
+def _make_worker(url: str, key: str, config: BenchConfig, recorder: LatencyRecorder) -> _Worker:
+    provider = SupabaseClientProvider()
+    client = provider.get(url, key)
+    if client is None:
+        raise RuntimeError(f"could not create a Supabase client for {url}")
+    backend = TimedBackend(resilient_backend_from_env(SupabaseRoomBackend(client)), recorder)
+    # No Realtime against the stub: events stay local and watchers keep polling
+    hub = RoomEventHub(mode="off")
+    limiter = RateLimiter()
+    rooms = RoomManager(backend=backend, events=hub, event_log=config.event_log, rate_limiter=limiter)  # type: ignore[arg-type]
+    chat = ChatManager(backend=backend, events=hub, message_cache=MessageCache(), rate_limiter=limiter)  # type: ignore[arg-type]
+    watchers = RoomWatcherRegistry(
+        rooms,
+        chat,
+        poll_seconds=config.poll_min,
+        max_poll_seconds=config.poll_max,
+        fallback_seconds=_EVENT_FALLBACK_POLL_SECONDS,
+        idle_seconds=max(60.0, 2 * config.poll_max),
+        message_limit=_CHAT_PAGE_SIZE,
+    )
+    return _Worker(provider, backend, rooms, chat, watchers, limiter)
+
+
+@dataclass(order=True)
+class _Due:
+    at: float
+    seq: int
+    run: Callable[[], float | None] = field(compare=False)
+
+
+class _Scheduler:
+    """Runs session ticks on a thread pool; each tick returns seconds until its next run (None to stop)."""
+
+    def __init__(self, threads: int) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="tarozon-bench")
+        self._heap: list[_Due] = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._stopped = False
+        self.errors = 0
+        self.late = 0
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="tarozon-bench-scheduler")
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def add(self, delay: float, run: Callable[[], float | None]) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, _Due(time.monotonic() + delay, next(self._seq), run))
+            self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._heap or self._heap[0].at > time.monotonic()):
+                    self._cond.wait(timeout=self._heap[0].at - time.monotonic() if self._heap else None)
+                if self._stopped:
+                    return
+                due = heapq.heappop(self._heap)
+                # Ticks starting well after their slot mean the simulated sessions outran the thread pool
+                if time.monotonic() - due.at > 1.0:
+                    self.late += 1
+            self._pool.submit(self._tick, due.run)
+
+    def _tick(self, run: Callable[[], float | None]) -> None:
+        try:
+            delay = run()
+        except Exception:
+            with self._cond:
+                self.errors += 1
+            delay = 1.0
+        if delay is not None and not self._stopped:
+            self.add(delay, run)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _initial_state(index: int) -> dict[str, Any]:
+    spread, slots = _SPREADS[index % len(_SPREADS)]
+    return {"d": "rws", "s": spread, "c": [None] * slots, "a": [0] * slots}
+
+
+def _next_state(state: dict[str, Any], rng: random.Random) -> dict[str, Any]:
+    """The host's next click: draw into the first empty slot, or start over once the spread is full."""
+    codes = list(state["c"])
+    angles = list(state["a"])
+    if all(codes):
+        codes, angles = [None] * len(codes), [0] * len(codes)
+    else:
+        i = codes.index(None)
+        codes[i] = f"m{rng.randrange(78):02d}"
+        angles[i] = rng.choice((0, 180))
+    return {**state, "c": codes, "a": angles}
+
+
+def _control(url: str, path: str, method: str = "GET") -> Any:
+    """Stub control endpoint; None when the endpoint is not a stub."""
+    import httpx
+
+    try:
+        r = httpx.request(method, f"{url.rstrip('/')}/__stub__/{path}", timeout=5.0)
+        return r.json() if r.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def run_benchmark(url: str, key: str, config: BenchConfig) -> dict[str, Any]:
+    """Simulate config.hosts rooms with config.viewers viewers each; returns the report dict."""
+    rng = random.Random(config.seed)
+    recorder = LatencyRecorder()
+    workers = [_make_worker(url, key, config, recorder) for _ in range(max(1, config.workers))]
+    scheduler = _Scheduler(config.threads)
+    nick = itertools.count(1)
+
+    def jitter(seconds: float) -> float:
+        return seconds * rng.uniform(0.5, 1.5)
+
+    def host(worker: _Worker, code: str, state: dict[str, Any]) -> None:
+        current = {"state": state}
+
+        def refresh() -> float:
+            # Host chat fragment: watcher snapshot + cached messages
+            worker.watchers.snapshot(code)
+            worker.chat.cache.latest(code, _CHAT_PAGE_SIZE)
+            return worker.watchers.interval(code)
+
+        def act() -> float:
+            current["state"] = _next_state(current["state"], rng)
+            worker.rooms.enqueue_update(code, current["state"])
+            return jitter(config.host_action_seconds)
+
+        def talk() -> float:
+            worker.chat.send_message(code, "Tarozon", f"reading note {rng.randrange(10_000)}")
+            return rng.expovariate(1 / config.host_chat_seconds)
+
+        scheduler.add(rng.uniform(0, config.poll_min), refresh)
+        if config.host_action_seconds > 0:
+            scheduler.add(jitter(config.host_action_seconds), act)
+        if config.host_chat_seconds > 0:
+            scheduler.add(rng.expovariate(1 / config.host_chat_seconds), talk)
+
+    def viewer(worker: _Worker, code: str) -> None:
+        session = f"viewer-{next(nick)}"
+        joined = {"done": False}
+
+        def refresh() -> float:
+            if not joined["done"]:
+                # Check-in reads the room once
+                worker.rooms.get_room(code)
+                joined["done"] = True
+            if worker.rooms.presence is not None:
+                worker.rooms.presence.touch(code, session)
+            worker.watchers.snapshot(code)
+            worker.chat.cache.latest(code, _CHAT_PAGE_SIZE)
+            return worker.watchers.interval(code)
+
+        def talk() -> float:
+            worker.chat.send_message(code, session[:40], f"question {rng.randrange(10_000)}")
+            return rng.expovariate(1 / config.viewer_chat_seconds)
+
+        scheduler.add(rng.uniform(0, config.poll_min), refresh)
+        if config.viewer_chat_seconds > 0:
+            scheduler.add(rng.expovariate(1 / config.viewer_chat_seconds), talk)
+
+    def console(worker: _Worker) -> None:
+        def refresh() -> float:
+            page = worker.rooms.list_active_rooms(_HOST_CONSOLE_PAGE_SIZE, active_within=timedelta(hours=24))
+            if page is not None and page.rooms:
+                codes = [r["room_code"] for r in page.rooms]
+                worker.chat.message_stats(codes)
+                if worker.rooms.presence is not None:
+                    worker.rooms.presence.counts(codes)
+            return _HOST_CONSOLE_SECONDS
+
+        scheduler.add(rng.uniform(0, _HOST_CONSOLE_SECONDS), refresh)
+
+    rooms: list[str] = []
+    for i in range(config.hosts):
+        worker = workers[i % len(workers)]
+        state = _initial_state(i)
+        code = worker.rooms.create_room(state, client_key=f"bench-host-{i}")
+        if code is None:
+            continue
+        rooms.append(code)
+        host(worker, code, state)
+        for j in range(config.viewers):
+            viewer(workers[(i + j + 1) % len(workers)], code)
+    for i in range(config.consoles):
+        console(workers[i % len(workers)])
+
+    scheduler.start()
+    try:
+        time.sleep(config.warmup)
+        recorder.reset()
+        _control(url, "reset", "POST")
+        time.sleep(config.duration)
+        client = recorder.report()
+        server = _control(url, "stats")
+        # Counters below cover the whole run (setup and warmup included), not just the measured window
+        rejected: dict[str, int] = {}
+        for worker in workers:
+            for name, n in worker.limiter.stats()["rejected"].items():
+                rejected[name] = rejected.get(name, 0) + n
+        resilience = [getattr(worker.backend, "stats", lambda: None)() for worker in workers]
+    finally:
+        scheduler.stop()
+        for worker in workers:
+            worker.watchers.close()
+            worker.rooms.write_queue.close(timeout=5)
+            if worker.rooms.presence is not None:
+                worker.rooms.presence.close()
+            worker.provider.close()
+
+    return {
+        "config": asdict(config),
+        "rooms": len(rooms),
+        "sessions": len(rooms) * (config.viewers + 1),
+        "client": client,
+        "server": server,
+        "rate_limited": rejected,
+        "resilience": [s for s in resilience if s],
+        "tick_errors": scheduler.errors,
+        "late_ticks": scheduler.late,
+    }
+
+
+def _print_report(report: dict[str, Any]) -> None:
+    c = report["config"]
+    client = report["client"]
+    print(
+        f"{report['rooms']} room(s) x {c['viewers']} viewer(s) + host, {c['workers']} worker(s), "
+        f"{client['seconds']:.0f}s measured after {c['warmup']:.0f}s warmup"
+    )
+    header = f"{'operation':<24}{'calls':>8}{'qps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'err %':>8}"
+    print(header)
+    print("-" * len(header))
+    for op, s in [*client["ops"].items(), ("total", client["total"])]:
+        print(
+            f"{op:<24}{s['calls']:>8}{s['qps']:>9.2f}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}"
+            f"{s['p99_ms']:>9.1f}{s['errors']:>8}{s['error_rate'] * 100:>7.2f}%"
+        )
+    server = report.get("server")
+    if server:
+        print(f"\nserver: {server['requests']} requests, {server['qps']:.2f} qps, status {server['status']}")
+        for route, s in server["routes"].items():
+            print(f"  {route:<34}{s['count']:>8}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['errors']:>8}")
+    print(f"\nwhole run, rate limited: {report['rate_limited'] or 'none'}")
+    for i, stats in enumerate(report["resilience"]):
+        print(f"whole run, worker {i} backend: {stats}")
+    if report["tick_errors"] or report["late_ticks"]:
+        print(f"session ticks: {report['tick_errors']} error(s), {report['late_ticks']} started over 1s late")
+
+
+def _start_stub(args: argparse.Namespace) -> tuple[subprocess.Popen[str], str]:
+    db = Path(tempfile.mkdtemp(prefix="tarozon-bench-")) / "stub.db"
+    cmd = [
+        sys.executable, "-m", "tarozon_core.postgrest_stub", "--port", "0", "--db", str(db),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), "--error-status", str(args.error_status),
+        "--stall-rate", str(args.stall_rate), "--stall-ms", str(args.stall_ms), "--match", args.match,
+    ]
+    proc = subprocess.Popen(cmd, cwd=Path(__file__).resolve().parent.parent, stdout=subprocess.PIPE, text=True)
+    url = (proc.stdout.readline() if proc.stdout else "").strip()
+    if not url.startswith("http"):
+        proc.kill()
+        raise RuntimeError("postgrest stub did not start")
+    return proc, url
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tarozon_core.room_bench", description=__doc__.splitlines()[0])
+    poll_min, poll_max = poll_bounds_from_env()
+    defaults = BenchConfig(poll_min=poll_min, poll_max=poll_max)
+    parser.add_argument("--hosts", type=int, default=defaults.hosts, help="rooms, one host each")
+    parser.add_argument("--viewers", type=int, default=defaults.viewers, help="viewers per room")
+    parser.add_argument("--workers", type=int, default=defaults.workers, help="simulated app processes")
+    parser.add_argument("--duration", type=float, default=defaults.duration, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=defaults.warmup, help="seconds before measuring")
+    parser.add_argument("--host-action-seconds", type=float, default=defaults.host_action_seconds)
+    parser.add_argument("--host-chat-seconds", type=float, default=defaults.host_chat_seconds)
+    parser.add_argument("--viewer-chat-seconds", type=float, default=defaults.viewer_chat_seconds)
+    parser.add_argument("--consoles", type=int, default=defaults.consoles, help="admin host consoles")
+    parser.add_argument("--event-log", action="store_true", help="room writes append to room_events")
+    parser.add_argument("--poll-min", type=float, default=defaults.poll_min)
+    parser.add_argument("--poll-max", type=float, default=defaults.poll_max)
+    parser.add_argument("--threads", type=int, default=defaults.threads, help="session tick threads")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--url", default=None, help="existing endpoint (default: start a local stub)")
+    parser.add_argument("--key", default=STUB_KEY)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stub: added latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="stub: latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stub: injected error fraction")
+    parser.add_argument("--error-status", type=int, default=503, help="stub: injected error status")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="stub: stalled request fraction")
+    parser.add_argument("--stall-ms", type=float, default=5000.0, help="stub: stall length")
+    parser.add_argument("--match", default="", help="stub: inject faults only on matching routes")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    config = BenchConfig(
+        hosts=args.hosts,
+        viewers=args.viewers,
+        workers=args.workers,
+        duration=args.duration,
+        warmup=args.warmup,
+        host_action_seconds=args.host_action_seconds,
+        host_chat_seconds=args.host_chat_seconds,
+        viewer_chat_seconds=args.viewer_chat_seconds,
+        consoles=args.consoles,
+        event_log=args.event_log,
+        poll_min=args.poll_min,
+        poll_max=args.poll_max,
+        threads=args.threads,
+        seed=args.seed,
+    )
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = _start_stub(args)
+    try:
+        report = run_benchmark(url, args.key, config)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
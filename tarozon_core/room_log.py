@@ -0,0 +1,89 @@
+"""Room state as an append-only event log: diff/apply helpers for compact slot-level events.
+
+Room state is the draw-state dict {"d": deck_id, "s": spread_id, "c": codes, "a": angles}.
+Events are small JSON objects:
+
+- {"t": "slot", "k": 3, "c": "m01"}      slot 3 now shows card m01 (None = cleared)
+- {"t": "slot", "k": 3, "a": 180}        slot 3 rotated/flipped
+- {"t": "state", "v": {...}}             whole state replaced (deck/spread change, first write)
+- {"t": "board", "h": "<sha256>"}        published board image for the state so far
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class RoomLogEntry:
+    seq: int
+    event: dict[str, Any]
+    version: int | None = None
+    created_at: str | None = None
+
+
+def diff_states(old: dict[str, Any] | None, new: dict[str, Any]) -> list[dict[str, Any]]:
+    """Events turning old into new: per-slot events when only cards/angles changed, else one state event."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [{"t": "state", "v": copy.deepcopy(new)}]
+    old_c, old_a = list(old.get("c") or []), list(old.get("a") or [])
+    new_c, new_a = list(new.get("c") or []), list(new.get("a") or [])
+    if (
+        old.get("d") != new.get("d")
+        or old.get("s") != new.get("s")
+        or len(old_c) != len(new_c)
+        or len(old_a) != len(new_a)
+        or set(old) != set(new)
+    ):
+        return [{"t": "state", "v": copy.deepcopy(new)}]
+    events: list[dict[str, Any]] = []
+    for k in range(max(len(new_c), len(new_a))):
+        event: dict[str, Any] = {}
+        if k < len(new_c) and old_c[k] != new_c[k]:
+            event["c"] = new_c[k]
+        if k < len(new_a) and old_a[k] != new_a[k]:
+            event["a"] = new_a[k]
+        if event:
+            events.append({"t": "slot", "k": k, **event})
+    return events
+
+
+def apply_events(state: dict[str, Any] | None, events: list[dict[str, Any]]) -> dict[str, Any] | None:
+    """New state after events (input is not modified). Unknown event types are ignored."""
+    out = copy.deepcopy(state) if isinstance(state, dict) else None
+    for event in events:
+        kind = event.get("t")
+        if kind == "state":
+            out = copy.deepcopy(event.get("v"))
+        elif kind == "slot" and isinstance(out, dict):
+            k = int(event.get("k", -1))
+            for field in ("c", "a"):
+                if field in event and k >= 0:
+                    values = list(out.get(field) or [])
+                    if k >= len(values):
+                        values.extend([None] * (k + 1 - len(values)))
+                    values[k] = event[field]
+                    out[field] = values
+    return out
+
+
+def changed_slots(events: list[dict[str, Any]]) -> set[int] | None:
+    """Slot indices touched by events; None when the whole state changed (redraw everything)."""
+    slots: set[int] = set()
+    for event in events:
+        kind = event.get("t")
+        if kind == "state":
+            return None
+        if kind == "slot":
+            slots.add(int(event.get("k", -1)))
+    return slots
+
+
+def board_hash_of(events: list[dict[str, Any]], default: str | None = None) -> str | None:
+    """Latest board hash announced by events (None = cleared); default when no board event."""
+    for event in reversed(events):
+        if event.get("t") == "board":
+            return event.get("h")
+    return default
@@ -0,0 +1,365 @@
+"""Per-process room watchers: one poller per active room, sessions read its snapshot."""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from .events import RoomEvent, Subscription
+from .rooms import ROOM_NOT_FOUND, ROOM_NOT_MODIFIED, ChatManager, RoomManager, _env_number
+
+_DEFAULT_POLL_SECONDS = 3.0
+_DEFAULT_MAX_POLL_SECONDS = 30.0
+_DEFAULT_ACTIVE_WINDOW_SECONDS = 30.0
+_DEFAULT_FALLBACK_POLL_SECONDS = 30.0
+_DEFAULT_IDLE_SECONDS = 60.0
+_DEFAULT_MESSAGE_LIMIT = 20
+
+
+@dataclass(frozen=True)
+class RoomSnapshot:
+    """Latest known room state plus a counter bumped whenever room or chat changed."""
+
+    room_code: str
+    room: dict[str, Any] | None
+    seq: int
+    fetched_at: float
+    message_count: int = 0
+    found: bool = True
+    # Server timestamp of the latest room write or chat message (the adaptive polling hint)
+    last_activity: str | None = None
+
+
+def _epoch(value: Any) -> float | None:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def latest_activity(*timestamps: Any) -> str | None:
+    """Most recent of the given ISO timestamps (unparseable/None ignored)."""
+    best: tuple[float, str] | None = None
+    for value in timestamps:
+        at = _epoch(value)
+        if at is not None and (best is None or at > best[0]):
+            best = (at, str(value))
+    return best[1] if best else None
+
+
+def adaptive_poll_interval(
+    last_activity: Any,
+    *,
+    min_seconds: float = _DEFAULT_POLL_SECONDS,
+    max_seconds: float = _DEFAULT_MAX_POLL_SECONDS,
+    active_window: float = _DEFAULT_ACTIVE_WINDOW_SECONDS,
+    now: float | None = None,
+) -> float:
+    """
+    Poll interval for a room last active at last_activity (server ISO timestamp).
+
+    min_seconds within active_window of the last activity, then doubled each time the idle
+    time doubles, capped at max_seconds. The hint is a server timestamp, so every session and
+    process watching the room backs off in step. Unknown activity polls at min_seconds.
+    """
+    max_seconds = max(min_seconds, max_seconds)
+    at = _epoch(last_activity)
+    if at is None:
+        return min_seconds
+    idle = (time.time() if now is None else now) - at
+    if idle < active_window or active_window <= 0:
+        return min_seconds
+    level = int(math.log2(idle / active_window)) + 1
+    return min(max_seconds, min_seconds * 2**level)
+
+
+def poll_bounds_from_env() -> tuple[float, float]:
+    """(min, max) live poll seconds from TAROZON_LIVE_POLL_MIN / TAROZON_LIVE_POLL_MAX (defaults 3 / 30)."""
+    low = max(0.5, _env_number("TAROZON_LIVE_POLL_MIN", _DEFAULT_POLL_SECONDS))
+    return low, max(low, _env_number("TAROZON_LIVE_POLL_MAX", _DEFAULT_MAX_POLL_SECONDS))
+
+
+class RoomWatcher:
+    """
+    Background poller for one room.
+
+    Polls get_room_since and sync_messages (the process-wide message cache) every
+    poll_seconds right after activity, backing off to max_poll_seconds as the room stays idle
+    (adaptive_poll_interval). When the event hub is live for the room it only polls on events, plus a
+    fallback poll every fallback_seconds. Stops itself after idle_seconds without readers.
+    """
+
+    def __init__(
+        self,
+        room_code: str,
+        rooms: RoomManager,
+        chat: ChatManager | None,
+        *,
+        poll_seconds: float,
+        fallback_seconds: float,
+        idle_seconds: float,
+        message_limit: int,
+        max_poll_seconds: float | None = None,
+        active_window: float = _DEFAULT_ACTIVE_WINDOW_SECONDS,
+        on_stop: Callable[[RoomWatcher], None] | None = None,
+    ) -> None:
+        self._code = room_code
+        self._rooms = rooms
+        self._chat = chat if chat is not None and chat.is_available else None
+        self._poll_seconds = float(poll_seconds)
+        self._max_poll_seconds = float(max_poll_seconds) if max_poll_seconds else self._poll_seconds
+        self._active_window = float(active_window)
+        self._fallback_seconds = float(fallback_seconds)
+        self._idle_seconds = float(idle_seconds)
+        self._message_limit = int(message_limit)
+        self._on_stop = on_stop
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._callbacks: dict[int, Callable[[RoomSnapshot], None]] = {}
+        self._next_id = 0
+        self._last_read = time.monotonic()
+        self._event_seen: tuple[int, int] | None = None
+        self._messages_seen = 0
+        self._snapshot = RoomSnapshot(room_code=room_code, room=None, seq=0, fetched_at=0.0, found=False)
+        self._subscription: Subscription | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def room_code(self) -> str:
+        return self._code
+
+    @property
+    def is_running(self) -> bool:
+        return not self._stopped.is_set()
+
+    def start(self) -> None:
+        """Subscribe, poll once and start the thread; concurrent callers wait for the first poll. Idempotent."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._subscription = self._rooms.events.subscribe(self._code, self._on_event)
+            try:
+                self.poll()
+            except Exception:
+                pass
+            self._thread = threading.Thread(target=self._run, daemon=True, name=f"tarozon-room-watch-{self._code}")
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        if self._subscription is not None:
+            self._subscription.close()
+        if self._on_stop is not None:
+            self._on_stop(self)
+
+    def snapshot(self) -> RoomSnapshot:
+        with self._lock:
+            self._last_read = time.monotonic()
+            return self._snapshot
+
+    def interval(self) -> float:
+        """Current poll interval in seconds, from the snapshot's last activity."""
+        return adaptive_poll_interval(
+            self._snapshot.last_activity,
+            min_seconds=self._poll_seconds,
+            max_seconds=self._max_poll_seconds,
+            active_window=self._active_window,
+        )
+
+    def subscribe(self, callback: Callable[[RoomSnapshot], None]) -> Subscription:
+        """Call callback(snapshot) on the watcher thread whenever the snapshot changes."""
+        with self._lock:
+            sub_id = self._next_id
+            self._next_id += 1
+            self._callbacks[sub_id] = callback
+
+        def _close() -> None:
+            with self._lock:
+                self._callbacks.pop(sub_id, None)
+
+        return Subscription(_close)
+
+    def _on_event(self, event: RoomEvent) -> None:
+        self._wake.set()
+
+    def _event_seqs(self) -> tuple[int, int]:
+        hub = self._rooms.events
+        return hub.seq(self._code, "room"), hub.seq(self._code, "message")
+
+    def poll(self) -> RoomSnapshot:
+        """Fetch now (serialized with the background poll) and return the resulting snapshot."""
+        with self._poll_lock:
+            seqs = self._event_seqs()
+            prev = self._snapshot
+            # Event-log rooms read only the events after the last seq; others a conditional row fetch
+            room = self._rooms.get_room_since(self._code, prev.room)
+            changed = False
+            if room is ROOM_NOT_MODIFIED or (room is None and prev.found):
+                # None after a successful fetch is most likely a transient error: keep the last state
+                room, found = prev.room, True
+            elif room is ROOM_NOT_FOUND:
+                # Deleted (e.g. by the retention sweep): stop showing the last board
+                room, found = None, False
+                changed = prev.found
+            else:
+                found = room is not None
+                changed = room != prev.room or found != prev.found
+            message_count = prev.message_count
+            newest = None
+            if self._chat is not None and found:
+                self._chat.sync_messages(self._code, limit=self._message_limit)
+                newest = self._chat.cache.newest_cursor(self._code)
+                # Cache version, not this poll's fetch: also counts local echoes merged by send_message
+                version = self._chat.cache.version(self._code)
+                if version != self._messages_seen:
+                    self._messages_seen = version
+                    changed = True
+                message_count = self._chat.cache.count(self._code)
+            self._event_seen = seqs
+            snap = RoomSnapshot(
+                room_code=self._code,
+                room=room,  # type: ignore[arg-type]
+                seq=prev.seq + 1 if changed else prev.seq,
+                fetched_at=time.monotonic(),
+                message_count=message_count,
+                found=found,
+                last_activity=latest_activity(
+                    room.get("updated_at") if isinstance(room, dict) else None,
+                    newest.created_at if newest else None,
+                ),
+            )
+            with self._lock:
+                self._snapshot = snap
+                callbacks = list(self._callbacks.values()) if changed else []
+        for cb in callbacks:
+            try:
+                cb(snap)
+            except Exception:
+                pass
+        return snap
+
+    def _due(self) -> bool:
+        hub = self._rooms.events
+        if not hub.is_live(self._code):
+            # Backed-off interval, checked on poll_seconds ticks (half a tick of slack for poll time)
+            elapsed = time.monotonic() - self._snapshot.fetched_at
+            return elapsed + self._poll_seconds / 2 >= self.interval()
+        if self._event_seqs() != self._event_seen:
+            return True
+        return time.monotonic() - self._snapshot.fetched_at >= self._fallback_seconds
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(timeout=self._poll_seconds)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            with self._lock:
+                idle = time.monotonic() - self._last_read > self._idle_seconds
+            if idle:
+                self.stop()
+                return
+            if self._due():
+                try:
+                    self.poll()
+                except Exception:
+                    pass
+
+
+@dataclass
+class RoomWatcherRegistry:
+    """
+    Process-wide room watchers keyed by room code.
+
+    Database load per room is one poller regardless of how many sessions view it; sessions
+    call snapshot() (no I/O once the watcher exists) and compare seq to detect changes.
+    With max_poll_seconds set, idle rooms are polled less often (see adaptive_poll_interval);
+    interval() gives sessions the same cadence for their own refresh timers.
+    on_room_closed(room_code) runs when a room's watcher stops (no readers left in this process).
+    """
+
+    rooms: RoomManager
+    chat: ChatManager | None = None
+    poll_seconds: float = _DEFAULT_POLL_SECONDS
+    fallback_seconds: float = _DEFAULT_FALLBACK_POLL_SECONDS
+    idle_seconds: float = _DEFAULT_IDLE_SECONDS
+    message_limit: int = _DEFAULT_MESSAGE_LIMIT
+    max_poll_seconds: float | None = None
+    active_window: float = _DEFAULT_ACTIVE_WINDOW_SECONDS
+    on_room_closed: Callable[[str], None] | None = None
+    _watchers: dict[str, RoomWatcher] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _forget(self, watcher: RoomWatcher) -> None:
+        with self._lock:
+            if self._watchers.get(watcher.room_code) is not watcher:
+                return
+            del self._watchers[watcher.room_code]
+        if self.on_room_closed is not None:
+            try:
+                self.on_room_closed(watcher.room_code)
+            except Exception:
+                pass
+
+    def watcher(self, room_code: str) -> RoomWatcher:
+        """Running watcher for the room, started (with one synchronous poll) on first use."""
+        code = room_code.strip().upper()
+        with self._lock:
+            w = self._watchers.get(code)
+            if w is None or not w.is_running:
+                w = RoomWatcher(
+                    code,
+                    self.rooms,
+                    self.chat,
+                    poll_seconds=self.poll_seconds,
+                    fallback_seconds=self.fallback_seconds,
+                    idle_seconds=self.idle_seconds,
+                    message_limit=self.message_limit,
+                    max_poll_seconds=self.max_poll_seconds,
+                    active_window=self.active_window,
+                    on_stop=self._forget,
+                )
+                self._watchers[code] = w
+        # Outside the registry lock: other rooms are not blocked by this room's first fetch
+        w.start()
+        return w
+
+    def snapshot(self, room_code: str) -> RoomSnapshot:
+        return self.watcher(room_code).snapshot()
+
+    def interval(self, room_code: str) -> float:
+        """Adaptive poll interval (seconds) for the room, shared by every session watching it."""
+        return self.watcher(room_code).interval()
+
+    def refresh(self, room_code: str) -> RoomSnapshot:
+        """Poll right away, e.g. after this session wrote to the room."""
+        return self.watcher(room_code).poll()
+
+    def subscribe(self, room_code: str, callback: Callable[[RoomSnapshot], None]) -> Subscription:
+        return self.watcher(room_code).subscribe(callback)
+
+    def active_rooms(self) -> list[str]:
+        with self._lock:
+            return sorted(self._watchers)
+
+    def close(self) -> None:
+        with self._lock:
+            watchers = list(self._watchers.values())
+        for w in watchers:
+            w.stop()
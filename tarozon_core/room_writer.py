@@ -0,0 +1,165 @@
+"""Write-behind queue for room state: latest-state coalescing, per-room ordering, retry with backoff."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+WriteFn = Callable[[str, dict[str, Any], "bytes | None"], bool]
+
+
+@dataclass
+class _PendingWrite:
+    state: dict[str, Any]
+    board_png: bytes | None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    not_before: float = 0.0
+
+
+class RoomWriteQueue:
+    """
+    Non-blocking room writes for host clicks.
+
+    - Each room holds at most one pending state; enqueueing again replaces it (coalescing),
+      so a burst of clicks becomes one write of the newest state.
+    - A room is written by at most one worker at a time, and a state is never written after a
+      newer one for the same room, so writes cannot land out of order.
+    - A failed write is retried with exponential backoff unless a newer state superseded it.
+    - A fixed number of worker threads serves all rooms.
+    """
+
+    def __init__(
+        self,
+        write: WriteFn,
+        workers: int = 2,
+        max_attempts: int = 5,
+        base_backoff: float = 0.2,
+        max_backoff: float = 5.0,
+    ) -> None:
+        self._write = write
+        self._workers = max(1, int(workers))
+        self._max_attempts = max(1, int(max_attempts))
+        self._base_backoff = float(base_backoff)
+        self._max_backoff = float(max_backoff)
+        self._cond = threading.Condition()
+        self._pending: dict[str, _PendingWrite] = {}
+        self._ready: deque[str] = deque()
+        self._in_flight: set[str] = set()
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+        self._counts = {"enqueued": 0, "coalesced": 0, "written": 0, "retries": 0, "failed": 0, "superseded": 0}
+
+    def enqueue(self, room_code: str, state: dict[str, Any], board_png: bytes | None = None) -> None:
+        code = room_code.strip().upper()
+        if not code:
+            return
+        with self._cond:
+            if self._closed:
+                return
+            self._counts["enqueued"] += 1
+            if code in self._pending:
+                self._counts["coalesced"] += 1
+            else:
+                if code not in self._in_flight:
+                    self._ready.append(code)
+            self._pending[code] = _PendingWrite(state=state, board_png=board_png)
+            self._start_workers()
+            self._cond.notify()
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self._workers:
+            t = threading.Thread(target=self._run, daemon=True, name=f"tarozon-room-writer-{len(self._threads)}")
+            self._threads.append(t)
+            t.start()
+
+    def _take(self) -> tuple[str, _PendingWrite] | None:
+        """Next room whose pending write is due; waits as needed. None once closed and drained."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait: float | None = None
+                for _ in range(len(self._ready)):
+                    code = self._ready.popleft()
+                    item = self._pending.get(code)
+                    if item is None:
+                        continue
+                    if item.not_before > now:
+                        self._ready.append(code)
+                        delay = item.not_before - now
+                        wait = delay if wait is None else min(wait, delay)
+                        continue
+                    del self._pending[code]
+                    self._in_flight.add(code)
+                    return code, item
+                if self._closed and not self._pending:
+                    return None
+                self._cond.wait(timeout=wait)
+
+    def _run(self) -> None:
+        while True:
+            taken = self._take()
+            if taken is None:
+                return
+            code, item = taken
+            try:
+                ok = bool(self._write(code, item.state, item.board_png))
+            except Exception:
+                ok = False
+            with self._cond:
+                self._in_flight.discard(code)
+                if ok:
+                    self._counts["written"] += 1
+                elif code in self._pending:
+                    # A newer state arrived while writing; it replaces the failed one
+                    self._counts["superseded"] += 1
+                else:
+                    item.attempts += 1
+                    if item.attempts < self._max_attempts:
+                        self._counts["retries"] += 1
+                        backoff = min(self._max_backoff, self._base_backoff * (2 ** (item.attempts - 1)))
+                        item.not_before = time.monotonic() + backoff
+                        self._pending[code] = item
+                    else:
+                        self._counts["failed"] += 1
+                if code in self._pending and code not in self._ready:
+                    self._ready.append(code)
+                self._cond.notify_all()
+
+    def depth(self) -> int:
+        """Rooms with a pending or in-flight write."""
+        with self._cond:
+            return len(self._pending.keys() | self._in_flight)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            oldest = min((p.enqueued_at for p in self._pending.values()), default=None)
+            return {
+                **self._counts,
+                "pending": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "oldest_pending_seconds": (time.monotonic() - oldest) if oldest is not None else 0.0,
+            }
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until nothing is pending or in flight. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+            return True
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop accepting writes and let workers drain what is pending."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in list(self._threads):
+            t.join(timeout=timeout)
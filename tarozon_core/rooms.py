@@ -1,140 +1,990 @@
-"""Supabase rooms table manager for real-time reading exchange."""
+"""Rooms/messages managers for real-time reading exchange (Supabase or a local backend)."""
 
 from __future__ import annotations
 
+import copy
 import os
-import random
-import string
-from datetime import datetime, timezone
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
-_ROOM_CODE_LENGTH = 6
-_MAX_CREATE_ATTEMPTS = 10
+from .backends import (
+    RoomBackend,
+    RoomBackendUnavailableError,
+    RoomCodeCollisionError,
+    RoomCursor,
+    RoomError,
+    RoomNotFoundError,
+    RoomRateLimitedError,
+    SupabaseRoomBackend,
+    room_backend_from_env,
+    utc_now_iso,
+)
+from .board_store import BoardStore, board_store_from_env
+from .chat_cache import MessageCache, MessageCursor
+from .chat_filter import ChatFilter, chat_filter_from_env
+from .events import RoomEvent, RoomEventHub, Subscription, SupabaseRealtimeRelay, get_event_hub
+from .presence import PresenceTracker
+from .rate_limit import RateLimiter, rate_limiter_from_env
+from .resilience import resilient_backend_from_env
+from .room_log import RoomLogEntry, apply_events, board_hash_of, changed_slots, diff_states
+from .room_writer import RoomWriteQueue
 
+# The Room*Error types are re-exported: app code catches what the managers raise from here
+__all__ = [
+    "MAX_MESSAGE_CHARS",
+    "MAX_USER_NAME_CHARS",
+    "ROOM_NOT_FOUND",
+    "ROOM_NOT_MODIFIED",
+    "ChatManager",
+    "RoomBackendUnavailableError",
+    "RoomCodeCollisionError",
+    "RoomError",
+    "RoomManager",
+    "RoomNotFoundError",
+    "RoomPage",
+    "RoomRateLimitedError",
+    "RoomUpdateResult",
+    "SupabaseClientProvider",
+    "get_client_provider",
+]
 
-def _generate_room_code() -> str:
-    chars = string.ascii_uppercase + string.digits
-    return "".join(random.choice(chars) for _ in range(_ROOM_CODE_LENGTH))
+_DEFAULT_POOL_SIZE = 20
+_DEFAULT_TIMEOUT_SECONDS = 10.0
+_SYNC_PAGE_SIZE = 100
+# Incremental chat syncs re-read this far behind the cursor: Postgres stamps created_at at transaction
+# start, so a message can commit after a later-stamped one a reader already passed
+_SYNC_OVERLAP = timedelta(seconds=2)
+_EVENT_PAGE_SIZE = 500
+_ROOM_PAGE_SIZE = 25
+# Event-log mode: write a full snapshot into rooms.state_json every this many events
+_SNAPSHOT_EVERY = 32
+# Same limits as the messages table checks (supabase_rooms_schema.sql)
+MAX_MESSAGE_CHARS = 500
+MAX_USER_NAME_CHARS = 40
 
 
-class RoomManager:
-    """Manages rooms table in Supabase for sharing draw state."""
+def _resolve_credentials(url: str | None, key: str | None) -> tuple[str, str]:
+    resolved_url = url or os.environ.get("SUPABASE_URL", "").strip()
+    resolved_key = key or os.environ.get("SUPABASE_SERVICE_KEY", "").strip() or os.environ.get("SUPABASE_ANON_KEY", "").strip()
+    return resolved_url, resolved_key
+
+
+def _env_flag(name: str) -> bool | None:
+    raw = os.environ.get(name, "").strip().lower()
+    if raw in ("1", "true", "yes", "on"):
+        return True
+    if raw in ("0", "false", "no", "off"):
+        return False
+    return None
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.environ.get(name, "").strip()
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+class SupabaseClientProvider:
+    """
+    Process-wide Supabase clients sharing one pooled keep-alive HTTP session.
+
+    One client is built per (url, key) and reused by every manager, so room/chat calls skip
+    client construction and TLS handshakes. httpx clients are thread-safe, which covers the
+    background threads app.py starts for room writes.
+    """
+
+    def __init__(self, pool_size: int | None = None, timeout: float | None = None) -> None:
+        self._pool_size = max(1, int(pool_size if pool_size is not None else _env_number("TAROZON_SUPABASE_POOL_SIZE", _DEFAULT_POOL_SIZE)))
+        self._timeout = float(timeout if timeout is not None else _env_number("TAROZON_SUPABASE_TIMEOUT", _DEFAULT_TIMEOUT_SECONDS))
+        self._lock = threading.Lock()
+        self._clients: dict[tuple[str, str], Any] = {}
+        self._http: Any = None
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout
 
-    def __init__(self, url: str | None = None, key: str | None = None) -> None:
-        self._url = url or os.environ.get("SUPABASE_URL", "").strip()
-        self._key = key or os.environ.get("SUPABASE_SERVICE_KEY", "").strip() or os.environ.get("SUPABASE_ANON_KEY", "").strip()
-        self._client = None
-        if self._url and self._key:
+    def _http_client(self) -> Any:
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.Client(
+                limits=httpx.Limits(max_connections=self._pool_size, max_keepalive_connections=self._pool_size),
+                timeout=httpx.Timeout(self._timeout),
+            )
+        return self._http
+
+    def get(self, url: str | None = None, key: str | None = None) -> Any | None:
+        """Return the shared client for url/key (env defaults), or None if unconfigured/unavailable."""
+        url, key = _resolve_credentials(url, key)
+        if not (url and key):
+            return None
+        with self._lock:
+            client = self._clients.get((url, key))
+            if client is not None:
+                return client
+            try:
+                from supabase import ClientOptions, create_client
+
+                try:
+                    options = ClientOptions(
+                        postgrest_client_timeout=self._timeout,
+                        storage_client_timeout=int(self._timeout),
+                        httpx_client=self._http_client(),
+                    )
+                except TypeError:
+                    # Older supabase-py without httpx_client: still share the client itself
+                    options = ClientOptions(postgrest_client_timeout=self._timeout)
+                client = create_client(url, key, options=options)
+            except Exception:
+                return None
+            self._clients[(url, key)] = client
+            return client
+
+    def close(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            http, self._http = self._http, None
+        if http is not None:
             try:
-                from supabase import create_client
-                self._client = create_client(self._url, self._key)
+                http.close()
             except Exception:
-                self._client = None
+                pass
+
+
+_client_provider: SupabaseClientProvider | None = None
+_client_provider_lock = threading.Lock()
+
+
+def get_client_provider() -> SupabaseClientProvider:
+    """Process-wide provider; pool size/timeout from TAROZON_SUPABASE_POOL_SIZE / TAROZON_SUPABASE_TIMEOUT."""
+    global _client_provider
+    with _client_provider_lock:
+        if _client_provider is None:
+            _client_provider = SupabaseClientProvider()
+        return _client_provider
+
+
+class _NotModified:
+    """Result of get_room_if_changed when the room has no newer version."""
+
+    def __repr__(self) -> str:
+        return "ROOM_NOT_MODIFIED"
+
+
+ROOM_NOT_MODIFIED = _NotModified()
+
+
+class _NotFound:
+    """Result of get_room_if_changed when the room no longer exists (deleted or expired)."""
+
+    def __repr__(self) -> str:
+        return "ROOM_NOT_FOUND"
+
+
+ROOM_NOT_FOUND = _NotFound()
+
+
+@dataclass(frozen=True)
+class RoomUpdateResult:
+    """
+    Outcome of update_room_if_version.
+
+    ok: written; version is the new version.
+    not ok with room: version conflict; room is the current room (state_json, version, ...).
+    not ok without room: room missing or storage failed.
+    """
+
+    ok: bool
+    version: int | None = None
+    room: dict[str, Any] | None = None
+
+
+@dataclass(frozen=True)
+class RoomPage:
+    """One page of list_active_rooms: room dicts (with room_code), newest first; next_cursor None on the last page."""
+
+    rooms: list[dict[str, Any]]
+    next_cursor: RoomCursor | None = None
+
+
+@dataclass(frozen=True)
+class _LogHead:
+    """Last state this process appended for a room (event-log mode)."""
+
+    seq: int
+    version: int
+    state: dict[str, Any]
+    since_snapshot: int
+
+
+def _init_backend(backend: RoomBackend | None, client: Any, url: str, key: str) -> tuple[RoomBackend | None, Any]:
+    """
+    Explicit backend, else an explicit client, else TAROZON_ROOMS_BACKEND (shared Supabase client by
+    default). Backends chosen from the environment get the timeout/circuit-breaker layer.
+    """
+    if backend is not None:
+        return backend, getattr(backend, "client", None)
+    if client is not None:
+        return SupabaseRoomBackend(client), client
+    env_backend = room_backend_from_env(None)
+    if env_backend is None:
+        client = get_client_provider().get(url, key)
+        env_backend = room_backend_from_env(client)
+    if env_backend is None:
+        return None, client
+    return resilient_backend_from_env(env_backend), client
+
+
+def _init_events(events: RoomEventHub | None, backend: RoomBackend | None, url: str, key: str) -> RoomEventHub:
+    hub = events or get_event_hub()
+    # Realtime only sees writes to Supabase; local backends rely on in-process events
+    if backend is not None and backend.name == "supabase" and url and key:
+        hub.attach_relay(SupabaseRealtimeRelay(url, key, hub))
+    return hub
+
+
+def _init_limiter(limiter: RateLimiter | None, backend: RoomBackend | None) -> RateLimiter | None:
+    if limiter is not None:
+        return limiter
+    return rate_limiter_from_env(getattr(backend, "client", None) if backend is not None else None)
+
+
+class RoomManager:
+    """
+    Manages the rooms table for sharing draw state.
+
+    Storage is a RoomBackend: Supabase by default, or local SQLite via TAROZON_ROOMS_BACKEND.
+
+    With a board store (TAROZON_BOARD_STORE or board_store=), the host publishes the rendered
+    board on update_room and the row carries its content hash, so viewers fetch bytes instead
+    of composing the board themselves.
+
+    With the event log (TAROZON_ROOM_EVENT_LOG; on by default for SQLite), update_room appends
+    slot-level events (see room_log) instead of rewriting state_json, with a snapshot every
+    _SNAPSHOT_EVERY events. Readers catch up from their last seq with get_room_since.
+
+    Writes are rate limited (rate_limit, TAROZON_RATE_LIMITS): room_write per room and
+    room_create per client_key.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        key: str | None = None,
+        board_store: BoardStore | None = None,
+        client: Any = None,
+        events: RoomEventHub | None = None,
+        backend: RoomBackend | None = None,
+        event_log: bool | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        self._url, self._key = _resolve_credentials(url, key)
+        self._backend, client = _init_backend(backend, client, self._url, self._key)
+        self._limiter = _init_limiter(rate_limiter, self._backend)
+        self._board_store = board_store if board_store is not None else board_store_from_env(client)
+        self._events = _init_events(events, self._backend, self._url, self._key)
+        self._write_queue: RoomWriteQueue | None = None
+        self._write_queue_lock = threading.Lock()
+        self._presence: PresenceTracker | None = None
+        if event_log is None:
+            event_log = _env_flag("TAROZON_ROOM_EVENT_LOG")
+        if event_log is None:
+            # Local schema always has room_events; Supabase needs the schema update first
+            event_log = getattr(self._backend, "name", "") == "sqlite"
+        self._event_log = bool(event_log) and self._backend is not None
+        self._log_heads: dict[str, _LogHead] = {}
+        self._log_lock = threading.Lock()
 
     @property
     def is_available(self) -> bool:
-        return self._client is not None
+        return self._backend is not None
+
+    @property
+    def backend(self) -> RoomBackend | None:
+        return self._backend
+
+    @property
+    def events(self) -> RoomEventHub:
+        return self._events
+
+    @property
+    def uses_event_log(self) -> bool:
+        """True when room writes append to the room_events log (rooms.event_seq/snapshot_seq required)."""
+        return self._event_log
+
+    @property
+    def write_queue(self) -> RoomWriteQueue:
+        """Write-behind queue feeding update_room (workers from TAROZON_ROOM_WRITE_WORKERS, default 2)."""
+        with self._write_queue_lock:
+            if self._write_queue is None:
+                workers = int(_env_number("TAROZON_ROOM_WRITE_WORKERS", 2))
+                self._write_queue = RoomWriteQueue(
+                    lambda code, state, board_png: self.update_room(code, state, board_png=board_png),
+                    workers=workers,
+                )
+            return self._write_queue
+
+    @property
+    def presence(self) -> PresenceTracker | None:
+        """
+        Viewer counts per room (None without a backend). Heartbeat every TAROZON_PRESENCE_INTERVAL
+        seconds (default 15); sessions not seen for TAROZON_PRESENCE_SESSION_TTL (default 60) leave.
+        """
+        if not self._backend:
+            return None
+        with self._write_queue_lock:
+            if self._presence is None:
+                self._presence = PresenceTracker(
+                    self._backend,
+                    interval=_env_number("TAROZON_PRESENCE_INTERVAL", 15),
+                    session_ttl=_env_number("TAROZON_PRESENCE_SESSION_TTL", 60),
+                )
+            return self._presence
+
+    def enqueue_update(self, room_code: str, state: dict[str, Any], board_png: bytes | None = None) -> bool:
+        """Queue update_room without blocking; rapid updates coalesce to the latest state per room."""
+        if not self._backend or not (room_code and room_code.strip()):
+            return False
+        self.write_queue.enqueue(room_code, state, board_png)
+        return True
+
+    def subscribe(self, room_code: str, callback: Callable[[RoomEvent], None]) -> Subscription:
+        """Call callback(event) whenever the room's state changes (local write or realtime push)."""
+        return self._events.subscribe(room_code, lambda e: callback(e) if e.kind == "room" else None)
 
-    def create_room(self, state: dict[str, Any]) -> str | None:
+    @property
+    def publishes_boards(self) -> bool:
+        """True when update_room publishes board images (rooms.board_hash column required)."""
+        return self._backend is not None and self._board_store is not None
+
+    @property
+    def rate_limiter(self) -> RateLimiter | None:
+        return self._limiter
+
+    def _allow(self, name: str, key: str) -> bool:
+        return self._limiter is None or self._limiter.allow(name, key)
+
+    def try_create_room(self, state: dict[str, Any], client_key: str | None = None) -> str:
+        """
+        Create a room with current state_json in one atomic backend call. Returns the 6-char room_code.
+
+        Raises RoomCodeCollisionError when no free code was found, RoomRateLimitedError when
+        client_key (e.g. the session id) created too many rooms, and RoomBackendUnavailableError
+        when the store is unreachable (or not configured).
+        """
+        if not self._backend:
+            raise RoomBackendUnavailableError("Room storage is not configured")
+        if not self._allow("room_create", client_key or "*"):
+            raise RoomRateLimitedError("Too many rooms created; try again shortly")
+        try:
+            return self._backend.create_room(state)
+        except RoomError:
+            raise
+        except Exception as e:
+            raise RoomBackendUnavailableError(str(e) or type(e).__name__) from e
+
+    def create_room(self, state: dict[str, Any], client_key: str | None = None) -> str | None:
         """Create a room with current state_json. Returns 6-char room_code or None on failure."""
-        if not self._client:
+        try:
+            return self.try_create_room(state, client_key=client_key)
+        except RoomError:
             return None
-        for _ in range(_MAX_CREATE_ATTEMPTS):
-            code = _generate_room_code()
-            try:
-                self._client.table("rooms").insert({
-                    "room_code": code,
-                    "state_json": state,
-                }).execute()
-                return code
-            except Exception:
-                continue
-        return None
+
+    def _room_from_row(
+        self,
+        code: str,
+        row: dict[str, Any],
+        entries: list[RoomLogEntry] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Room dict from a rooms row; in event-log mode replays events after the snapshot (may raise).
+
+        entries: the room's log after snapshot_seq when already fetched (batched reads).
+        """
+        room = {
+            "state_json": row.get("state_json"),
+            "updated_at": row.get("updated_at"),
+            "board_hash": row.get("board_hash"),
+            # rooms.version: +1 per write; pass back to get_room_if_changed / update_room_if_version
+            "version": row.get("version"),
+        }
+        if self._event_log:
+            seq = int(row.get("event_seq") or 0)
+            snapshot_seq = int(row.get("snapshot_seq") or 0)
+            if seq > snapshot_seq:
+                if entries is None:
+                    entries = self._fetch_log(code, snapshot_seq, seq - snapshot_seq)
+                events = [e.event for e in entries if snapshot_seq < e.seq <= seq]
+                room["state_json"] = apply_events(room["state_json"], events)
+            room["seq"] = seq
+        return room
+
+    @staticmethod
+    def _log_entry(row: dict[str, Any]) -> RoomLogEntry:
+        return RoomLogEntry(
+            seq=int(row["seq"]), event=row["event"], version=row.get("version"), created_at=row.get("created_at")
+        )
+
+    def _fetch_log(self, code: str, after_seq: int, limit: int) -> list[RoomLogEntry]:
+        rows = self._backend.fetch_room_events(code, after_seq, limit)  # type: ignore[union-attr]
+        return [self._log_entry(r) for r in rows]
+
+    def _rooms_from_rows(self, rows: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """Room dicts keyed by code; event-log replay for all rows comes from one batched log read."""
+        logs: dict[str, list[RoomLogEntry]] = {}
+        if self._event_log:
+            pending = {
+                row["room_code"]: int(row.get("snapshot_seq") or 0)
+                for row in rows
+                if int(row.get("event_seq") or 0) > int(row.get("snapshot_seq") or 0)
+            }
+            logs = {code: [] for code in pending}
+            if pending:
+                for r in self._backend.fetch_rooms_events(pending):  # type: ignore[union-attr]
+                    logs.setdefault(r["room_code"], []).append(self._log_entry(r))
+        rooms: dict[str, dict[str, Any]] = {}
+        for row in rows:
+            code = row["room_code"]
+            rooms[code] = {"room_code": code, **self._room_from_row(code, row, logs.get(code, []))}
+        return rooms
+
+    def get_rooms(self, room_codes: list[str]) -> dict[str, dict[str, Any]] | None:
+        """
+        Fetch several rooms at once (get_room dicts plus room_code), keyed by code; missing rooms are
+        left out. One rooms query (plus one log query in event-log mode) however many codes. None on error.
+        """
+        if not self._backend:
+            return None
+        codes = sorted({c.strip().upper() for c in room_codes if c and c.strip()})
+        if not codes:
+            return {}
+        try:
+            rows = self._backend.fetch_rooms(
+                codes, with_board_hash=self.publishes_boards, with_event_log=self._event_log
+            )
+            return self._rooms_from_rows(rows)
+        except Exception:
+            return None
+
+    def list_active_rooms(
+        self,
+        limit: int = _ROOM_PAGE_SIZE,
+        *,
+        active_within: timedelta | None = None,
+        before: RoomCursor | None = None,
+    ) -> RoomPage | None:
+        """
+        Rooms ordered by updated_at, most recent first, one keyset page per call (pass the previous
+        page's next_cursor as before). active_within limits the list to rooms updated that recently.
+        None on error.
+        """
+        if not self._backend:
+            return None
+        limit = max(1, int(limit))
+        updated_after = None
+        if active_within is not None:
+            updated_after = (datetime.now(timezone.utc) - active_within).isoformat(timespec="microseconds")
+        try:
+            rows = self._backend.list_rooms(
+                limit=limit,
+                updated_after=updated_after,
+                before=before,
+                with_board_hash=self.publishes_boards,
+                with_event_log=self._event_log,
+            )
+            rooms = self._rooms_from_rows(rows)
+        except Exception:
+            return None
+        ordered = [rooms[row["room_code"]] for row in rows]
+        next_cursor = RoomCursor.of(rows[-1]) if len(rows) >= limit else None
+        return RoomPage(rooms=ordered, next_cursor=next_cursor)
+
+    def _fetch_room_row(self, code: str, since_version: Any = None) -> dict[str, Any] | None:
+        return self._backend.fetch_room(  # type: ignore[union-attr]
+            code,
+            since_version=since_version,
+            with_board_hash=self.publishes_boards,
+            with_event_log=self._event_log,
+        )
 
     def get_room(self, room_code: str) -> dict[str, Any] | None:
-        """Fetch room by room_code. Returns dict with state_json, updated_at, etc. or None."""
-        if not self._client or not (room_code and room_code.strip()):
+        """
+        Fetch room by room_code. Returns dict with state_json, updated_at, board_hash (if publishing),
+        version (and seq in event-log mode) or None.
+        """
+        if not self._backend or not (room_code and room_code.strip()):
             return None
         code = room_code.strip().upper()
         try:
-            r = self._client.table("rooms").select("state_json, updated_at").eq("room_code", code).limit(1).execute()
-            if r.data and len(r.data) > 0:
-                row = r.data[0]
-                return {
-                    "state_json": row.get("state_json"),
-                    "updated_at": row.get("updated_at"),
-                }
+            row = self._fetch_room_row(code)
+            return self._room_from_row(code, row) if row is not None else None
         except Exception:
-            pass
-        return None
+            return None
+
+    def get_room_if_changed(
+        self, room_code: str, since_version: Any
+    ) -> dict[str, Any] | _NotModified | _NotFound | None:
+        """
+        Like get_room, but returns ROOM_NOT_MODIFIED when nothing is newer than since_version.
 
-    def update_room(self, room_code: str, state: dict[str, Any]) -> bool:
-        """Update room's state_json and updated_at. Returns True on success."""
-        if not self._client or not (room_code and room_code.strip()):
+        The version filter runs server-side, so an unchanged room costs one version-only response.
+        since_version=None always fetches (as get_room). Otherwise ROOM_NOT_FOUND means the room
+        is gone (e.g. removed by the retention sweep) and None means the backend is unavailable.
+        """
+        if since_version is None:
+            return self.get_room(room_code)
+        if not self._backend or not (room_code and room_code.strip()):
+            return None
+        code = room_code.strip().upper()
+        try:
+            row = self._fetch_room_row(code, since_version)
+        except Exception:
+            return None
+        if row is None:
+            return ROOM_NOT_FOUND
+        if row.get("not_modified"):
+            return ROOM_NOT_MODIFIED
+        return self._room_from_row(code, row)
+
+    def get_room_events(self, room_code: str, after_seq: int, limit: int = _EVENT_PAGE_SIZE) -> list[RoomLogEntry] | None:
+        """Event-log entries with seq > after_seq, ascending. [] without the event log; None on error."""
+        if not self._event_log or not (room_code and room_code.strip()):
+            return []
+        try:
+            return self._fetch_log(room_code.strip().upper(), int(after_seq), limit)
+        except Exception:
+            return None
+
+    def get_room_since(
+        self, room_code: str, previous: dict[str, Any] | None
+    ) -> dict[str, Any] | _NotModified | _NotFound | None:
+        """
+        Bring a previously fetched room dict up to date.
+
+        In event-log mode this reads only the events after previous["seq"] and applies them;
+        the result carries "changed_slots" (slot indices, or None for a full change) so a
+        renderer can redraw just those slots. Otherwise (or on a gap in the log) it falls back
+        to get_room_if_changed. Returns ROOM_NOT_MODIFIED when nothing happened and
+        ROOM_NOT_FOUND once the room has been deleted.
+        """
+        if not previous:
+            return self.get_room(room_code)
+        if not self._event_log or previous.get("seq") is None:
+            return self.get_room_if_changed(room_code, previous.get("version"))
+        after = int(previous["seq"])
+        entries = self.get_room_events(room_code, after)
+        if entries is None:
+            return None
+        if not entries:
+            # No new events also when the room was deleted with its log: confirm it still exists
+            return self.get_room_if_changed(room_code, previous.get("version"))
+        if entries[0].seq != after + 1 or len(entries) >= _EVENT_PAGE_SIZE:
+            # Trimmed past our position, or too far behind: a fresh read is cheaper
+            return self.get_room(room_code)
+        events = [e.event for e in entries]
+        last = entries[-1]
+        return {
+            **previous,
+            "state_json": apply_events(previous.get("state_json"), events),
+            "board_hash": board_hash_of(events, previous.get("board_hash")),
+            "updated_at": last.created_at or previous.get("updated_at"),
+            "version": last.version if last.version is not None else previous.get("version"),
+            "seq": last.seq,
+            "changed_slots": changed_slots(events),
+        }
+
+    def update_room(self, room_code: str, state: dict[str, Any], board_png: bytes | None = None) -> bool:
+        """
+        Update room's state_json and updated_at (last writer wins; version still increments). Returns True on success.
+
+        When boards are published, board_png is stored first and its hash written with the state;
+        if there is no image or the upload fails board_hash is cleared so viewers render locally.
+        """
+        if not self._backend or not (room_code and room_code.strip()):
             return False
         code = room_code.strip().upper()
+        if not self._allow("room_write", code):
+            return False
+        if self._event_log:
+            return self._append_room_update(code, state, board_png).ok
+        row: dict[str, Any] = {
+            "state_json": state,
+            "updated_at": utc_now_iso(),
+        }
+        board_kwargs = self._publish_board(board_png)
+        if board_kwargs:
+            row["board_hash"] = board_kwargs["board_hash"]
         try:
-            self._client.table("rooms").update({
-                "state_json": state,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-            }).eq("room_code", code).execute()
-            return True
+            self._backend.update_room(code, row)  # type: ignore[union-attr]
         except Exception:
             return False
+        self._events.publish(RoomEvent("room", code, row))
+        return True
 
+    def update_room_if_version(
+        self,
+        room_code: str,
+        state: dict[str, Any],
+        expected_version: int,
+        board_png: bytes | None = None,
+    ) -> RoomUpdateResult:
+        """
+        Compare-and-set: write state only if the room is still at expected_version (room["version"]).
 
-class ChatManager:
-    """Manages messages table in Supabase for real-time chat in a room."""
+        The check and write are one atomic backend call; on conflict the same call returns the
+        current room, so the caller can merge and retry without another read.
+        """
+        if not self._backend or not (room_code and room_code.strip()):
+            return RoomUpdateResult(ok=False)
+        code = room_code.strip().upper()
+        if not self._allow("room_write", code):
+            return RoomUpdateResult(ok=False)
+        if self._event_log:
+            return self._append_room_update(code, state, board_png, expected_version=int(expected_version))
+        board_kwargs = self._publish_board(board_png)
+        try:
+            result = self._backend.update_room_if_version(code, state, int(expected_version), **board_kwargs)
+        except Exception:
+            return RoomUpdateResult(ok=False)
+        if not result.get("ok"):
+            return self._conflict_result(code, result)
+        version = result.get("version")
+        self._events.publish(RoomEvent("room", code, {"state_json": state, "version": version}))
+        return RoomUpdateResult(ok=True, version=version)
+
+    def _conflict_result(self, code: str, row: dict[str, Any]) -> RoomUpdateResult:
+        try:
+            room = self._room_from_row(code, row)
+        except Exception:
+            room = None
+        return RoomUpdateResult(ok=False, version=row.get("version"), room=room)
+
+    def _publish_board(self, board_png: bytes | None) -> dict[str, Any]:
+        """
+        Store board_png (when publishing) and return board_hash kwargs for the backend write.
 
-    def __init__(self, url: str | None = None, key: str | None = None) -> None:
-        self._url = url or os.environ.get("SUPABASE_URL", "").strip()
-        self._key = key or os.environ.get("SUPABASE_SERVICE_KEY", "").strip() or os.environ.get("SUPABASE_ANON_KEY", "").strip()
-        self._client = None
-        if self._url and self._key:
+        Without an image (render failed or timed out) the hash is cleared, so viewers never pair
+        the previous board with the new state.
+        """
+        if not self.publishes_boards:
+            return {}
+        board_hash = None
+        if board_png is not None:
             try:
-                from supabase import create_client
-                self._client = create_client(self._url, self._key)
+                board_hash = self._board_store.put(board_png)  # type: ignore[union-attr]
             except Exception:
-                self._client = None
+                board_hash = None
+        return {"board_hash": board_hash, "set_board_hash": True}
+
+    def _append_room_update(
+        self,
+        code: str,
+        state: dict[str, Any],
+        board_png: bytes | None,
+        expected_version: int | None = None,
+    ) -> RoomUpdateResult:
+        # The write queue runs one write per room at a time, so the head cannot race itself
+        with self._log_lock:
+            head = self._log_heads.get(code)
+        if head is not None and expected_version is not None and head.version != expected_version:
+            # Our last write is not the base the caller expects: diff from scratch
+            head = None
+        board_kwargs = self._publish_board(board_png)
+        result, events, snapshot, since_snapshot = self._send_room_update(
+            code, head, state, board_kwargs, expected_version
+        )
+        if head is not None and expected_version is None and not (result and result.get("ok")):
+            # The delta was against our own last write and someone else wrote since (or the outcome
+            # is unknown): a snapshot is correct either way and keeps last-writer-wins semantics
+            result, events, snapshot, since_snapshot = self._send_room_update(code, None, state, board_kwargs, None)
+        if not (result and result.get("ok")):
+            with self._log_lock:
+                # Unknown outcome or someone else wrote: next write sends the full state again
+                self._log_heads.pop(code, None)
+            return self._conflict_result(code, result) if result else RoomUpdateResult(ok=False)
+        seq, version = int(result["seq"]), int(result["version"])
+        with self._log_lock:
+            self._log_heads[code] = _LogHead(
+                seq=seq,
+                version=version,
+                state=copy.deepcopy(state),
+                since_snapshot=0 if snapshot is not None else since_snapshot,
+            )
+        self._events.publish(RoomEvent("room", code, {"seq": seq, "version": version, "events": events}))
+        return RoomUpdateResult(ok=True, version=version)
+
+    def _send_room_update(
+        self,
+        code: str,
+        head: _LogHead | None,
+        state: dict[str, Any],
+        board_kwargs: dict[str, Any],
+        expected_version: int | None,
+    ) -> tuple[dict[str, Any] | None, list[dict[str, Any]], dict[str, Any] | None, int]:
+        """One append: a delta against head (version-checked against it) or, without head, a snapshot."""
+        events = diff_states(head.state if head else None, state)
+        since_snapshot = (head.since_snapshot if head else 0) + len(events)
+        full = head is None or any(e.get("t") == "state" for e in events)
+        snapshot = state if full or since_snapshot >= _SNAPSHOT_EVERY else None
+        if board_kwargs:
+            events = [*events, {"t": "board", "h": board_kwargs["board_hash"]}]
+        # A delta is only meaningful on top of the version it was diffed from
+        check = head.version if head is not None else expected_version
+        try:
+            result = self._backend.append_room_events(  # type: ignore[union-attr]
+                code, events, snapshot=snapshot, expected_version=check, **board_kwargs
+            )
+        except Exception:
+            result = None
+        return result, events, snapshot, since_snapshot
+
+    def get_board_png(self, board_hash: str | None) -> bytes | None:
+        """Fetch a published board image by content hash. Returns None if unavailable."""
+        if not board_hash or self._board_store is None:
+            return None
+        try:
+            return self._board_store.get(board_hash)
+        except Exception:
+            return None
+
+
+def _new_message_row(room_code: str, user_name: str, content: str) -> dict[str, Any]:
+    return {
+        "room_code": room_code.strip().upper(),
+        "user_name": ((user_name or "알 수 없음").strip() or "알 수 없음")[:MAX_USER_NAME_CHARS],
+        "content": content.strip()[:MAX_MESSAGE_CHARS],
+    }
+
+
+def _overlap_cursor(cursor: MessageCursor) -> MessageCursor:
+    """cursor moved back by _SYNC_OVERLAP (unchanged if created_at does not parse)."""
+    try:
+        at = datetime.fromisoformat(cursor.created_at.replace("Z", "+00:00"))
+    except ValueError:
+        return cursor
+    return MessageCursor(created_at=(at - _SYNC_OVERLAP).isoformat(timespec="microseconds"), id=cursor.id)
+
+
+def _filter_blocks_from_env(filter_action: str | None) -> bool:
+    action = filter_action or os.environ.get("TAROZON_CHAT_FILTER_ACTION", "")
+    return action.strip().lower() == "block"
+
+
+def _moderate_row(row: dict[str, Any], content_filter: ChatFilter | None, blocks: bool) -> dict[str, Any] | None:
+    if content_filter is None:
+        return row
+    name = content_filter.scan(row["user_name"])
+    content = content_filter.scan(row["content"])
+    if not (name.blocked or content.blocked):
+        return row
+    if blocks:
+        return None
+    return {**row, "user_name": name.masked(), "content": content.masked()}
+
+
+_shared_message_cache = MessageCache()
+
+
+class ChatManager:
+    """Manages the messages table for real-time chat in a room (same backend selection as RoomManager)."""
+
+    def __init__(
+        self,
+        url: str | None = None,
+        key: str | None = None,
+        client: Any = None,
+        events: RoomEventHub | None = None,
+        message_cache: MessageCache | None = None,
+        backend: RoomBackend | None = None,
+        content_filter: ChatFilter | None = None,
+        filter_action: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        self._url, self._key = _resolve_credentials(url, key)
+        self._backend, _ = _init_backend(backend, client, self._url, self._key)
+        self._limiter = _init_limiter(rate_limiter, self._backend)
+        self._events = _init_events(events, self._backend, self._url, self._key)
+        self._cache = message_cache if message_cache is not None else _shared_message_cache
+        # Banned words (TAROZON_CHAT_FILTER_WORDS): masked with * by default, or the message rejected
+        # with TAROZON_CHAT_FILTER_ACTION=block
+        self._filter = content_filter if content_filter is not None else chat_filter_from_env()
+        self._filter_blocks = _filter_blocks_from_env(filter_action)
 
     @property
     def is_available(self) -> bool:
-        return self._client is not None
+        return self._backend is not None
 
-    def send_message(self, room_code: str, user_name: str, content: str) -> bool:
-        """Insert a message into the messages table. Returns True on success."""
-        if not self._client or not (room_code and room_code.strip()) or not content or not content.strip():
-            return False
-        code = room_code.strip().upper()
+    @property
+    def backend(self) -> RoomBackend | None:
+        return self._backend
+
+    @property
+    def events(self) -> RoomEventHub:
+        return self._events
+
+    @property
+    def cache(self) -> MessageCache:
+        return self._cache
+
+    @property
+    def content_filter(self) -> ChatFilter | None:
+        return self._filter
+
+    def _moderate(self, row: dict[str, Any]) -> dict[str, Any] | None:
+        """Row with banned words masked in user_name/content; None when blocking and a word matched."""
+        return _moderate_row(row, self._filter, self._filter_blocks)
+
+    def subscribe(self, room_code: str, callback: Callable[[RoomEvent], None]) -> Subscription:
+        """Call callback(event) for every new message in the room (local send or realtime push)."""
+        return self._events.subscribe(room_code, lambda e: callback(e) if e.kind == "message" else None)
+
+    def send_message(self, room_code: str, user_name: str, content: str) -> dict[str, Any] | None:
+        """
+        Insert a message into the messages table. Returns the stored message (id, user_name,
+        content, created_at) or None on failure (or when rate limited / rejected by the content filter).
+
+        The stored row is added to the message cache right away (local echo), so the sender sees
+        it without a refetch; the next sync skips it by id.
+        """
+        if not self._backend or not (room_code and room_code.strip()) or not content or not content.strip():
+            return None
+        row = _new_message_row(room_code, user_name, content)
+        code = row["room_code"]
+        # Per nickname within the room and per room overall: one check, all-or-nothing
+        if self._limiter is not None and not self._limiter.acquire(
+            [("message_user", f"{code}:{row['user_name']}"), ("message_room", code)]
+        ):
+            return None
+        row = self._moderate(row)
+        if row is None:
+            return None
         try:
-            self._client.table("messages").insert({
-                "room_code": code,
-                "user_name": (user_name or "알 수 없음").strip() or "알 수 없음",
-                "content": content.strip(),
-            }).execute()
-            return True
+            stored = self._backend.insert_message(row)  # type: ignore[union-attr]
         except Exception:
-            return False
+            return None
+        message = self._message_from_row({**row, **(stored or {})})
+        if message["id"] is not None and message["created_at"]:
+            self._cache.merge(code, [message], synced=False)
+        self._events.publish(RoomEvent("message", code, message))
+        return message
+
+    @staticmethod
+    def _message_from_row(row: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "id": row.get("id"),
+            "user_name": row.get("user_name", ""),
+            "content": row.get("content", ""),
+            "created_at": row.get("created_at", ""),
+        }
+
+    def _fetch_messages(
+        self,
+        code: str,
+        *,
+        limit: int,
+        after: MessageCursor | None = None,
+        before: MessageCursor | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """Keyset page on (created_at, id), returned oldest first. None on error."""
+        try:
+            rows = self._backend.fetch_messages(code, limit=limit, after=after, before=before)  # type: ignore[union-attr]
+        except Exception:
+            return None
+        return [self._message_from_row(row) for row in rows]
 
     def get_messages(self, room_code: str, limit: int = 20) -> list[dict[str, Any]]:
-        """Fetch recent messages for the room, oldest first. Returns list of dicts with user_name, content, created_at."""
-        if not self._client or not (room_code and room_code.strip()):
+        """Fetch the newest `limit` messages for the room, oldest first. Dicts with id, user_name, content, created_at."""
+        if not self._backend or not (room_code and room_code.strip()):
+            return []
+        return self._fetch_messages(room_code.strip().upper(), limit=limit) or []
+
+    def get_messages_after(self, room_code: str, cursor: MessageCursor, limit: int = 100) -> list[dict[str, Any]]:
+        """Messages strictly after cursor, oldest first (forward keyset page)."""
+        if not self._backend or not (room_code and room_code.strip()):
+            return []
+        return self._fetch_messages(room_code.strip().upper(), limit=limit, after=cursor) or []
+
+    def get_messages_before(self, room_code: str, cursor: MessageCursor, limit: int = 20) -> list[dict[str, Any]]:
+        """Up to `limit` messages strictly before cursor, oldest first (backward keyset page)."""
+        if not self._backend or not (room_code and room_code.strip()):
+            return []
+        return self._fetch_messages(room_code.strip().upper(), limit=limit, before=cursor) or []
+
+    def sync_messages(self, room_code: str, limit: int = 20) -> list[dict[str, Any]]:
+        """
+        Bring the room's cached messages up to date and return the newest `limit`, oldest first.
+
+        The first call loads the latest page; later calls only fetch messages after the newest
+        fetched one (sync_cursor), re-reading a short overlap window deduplicated by id, so an idle
+        room costs an empty query. The cache is shared process-wide.
+        """
+        if not self._backend or not (room_code and room_code.strip()):
             return []
         code = room_code.strip().upper()
+        cursor = self._cache.sync_cursor(code)
+        if cursor is None:
+            rows = self._fetch_messages(code, limit=max(limit, 1))
+            if rows is not None:
+                self._cache.merge(code, rows)
+                if len(rows) < max(limit, 1):
+                    self._cache.mark_complete_history(code)
+        else:
+            cursor = _overlap_cursor(cursor)
+            while True:
+                rows = self._fetch_messages(code, limit=_SYNC_PAGE_SIZE, after=cursor)
+                if not rows:
+                    break
+                self._cache.merge(code, rows)
+                if len(rows) < _SYNC_PAGE_SIZE:
+                    break
+                cursor = MessageCursor.of(rows[-1])
+                if cursor is None:
+                    break
+        return self._cache.latest(code, limit)
+
+    def load_older(self, room_code: str, count: int = 20) -> int:
+        """Page `count` older messages into the cache (keyset on the oldest cached). Returns how many were added."""
+        if not self._backend or not (room_code and room_code.strip()):
+            return 0
+        code = room_code.strip().upper()
+        cursor = self._cache.oldest_cursor(code)
+        if cursor is None:
+            self.sync_messages(code, limit=count)
+            return self._cache.count(code)
+        rows = self._fetch_messages(code, limit=count, before=cursor)
+        if rows is None:
+            return 0
+        if len(rows) < count:
+            self._cache.mark_complete_history(code)
+        return self._cache.merge(code, rows)
+
+    def message_stats(self, room_codes: list[str]) -> dict[str, dict[str, Any]] | None:
+        """
+        Message counts per room in one query: {room_code: {"message_count", "last_message_at"}}.
+        Rooms without messages get a zero count. None on error.
+        """
+        if not self._backend:
+            return None
+        codes = sorted({c.strip().upper() for c in room_codes if c and c.strip()})
+        if not codes:
+            return {}
         try:
-            r = (
-                self._client.table("messages")
-                .select("user_name, content, created_at")
-                .eq("room_code", code)
-                .order("created_at")
-                .limit(limit)
-                .execute()
-            )
-            if not r.data:
-                return []
-            return [
-                {"user_name": row.get("user_name", ""), "content": row.get("content", ""), "created_at": row.get("created_at", "")}
-                for row in r.data
-            ]
+            stats = self._backend.message_stats(codes)
         except Exception:
-            return []
+            return None
+        empty = {"message_count": 0, "last_message_at": None}
+        return {code: stats.get(code, empty) for code in codes}
+
+    def has_older_messages(self, room_code: str) -> bool:
+        """False once paging backwards reached the first message of the room."""
+        return self._cache.has_older((room_code or "").strip().upper())
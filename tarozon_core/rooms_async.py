@@ -0,0 +1,397 @@
+"""asyncio room/chat managers speaking PostgREST directly over one pooled httpx.AsyncClient."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any
+
+from .backends import (
+    _CREATE_ATTEMPTS,
+    _EVENT_LOG_KEEP,
+    _UNDEFINED_FUNCTION_PGRST,
+    _UNIQUE_VIOLATION_SQLSTATE,
+    RoomBackendUnavailableError,
+    RoomCodeCollisionError,
+    RoomError,
+    _generate_room_code,
+    _quote_filter_value,
+    _room_error_of,
+)
+from .chat_cache import MessageCursor
+from .chat_filter import ChatFilter, chat_filter_from_env
+from .rate_limit import RateLimiter
+from .room_log import apply_events, diff_states
+from .rooms import (
+    _DEFAULT_POOL_SIZE,
+    _DEFAULT_TIMEOUT_SECONDS,
+    ROOM_NOT_FOUND,
+    ROOM_NOT_MODIFIED,
+    _env_flag,
+    _filter_blocks_from_env,
+    _init_limiter,
+    _moderate_row,
+    _new_message_row,
+    _NotFound,
+    _NotModified,
+    _resolve_credentials,
+)
+
+_DEFAULT_MAX_CONCURRENCY = 32
+
+
+async def _acquire(limiter: RateLimiter | None, checks: list[tuple[str, str]]) -> bool:
+    if limiter is None:
+        return True
+    # A shared limiter may check its buckets over the network (TAROZON_RATE_LIMIT_SHARED)
+    return await asyncio.to_thread(limiter.acquire, checks)
+
+
+class _PostgrestError(Exception):
+    """Error response from PostgREST; code is the SQLSTATE or PGRST code from the body."""
+
+    def __init__(self, status: int, body: Any) -> None:
+        self.status = status
+        self.code = body.get("code") if isinstance(body, dict) else None
+        message = body.get("message") if isinstance(body, dict) else None
+        super().__init__(message or f"HTTP {status}")
+
+
+class AsyncPostgrestSession:
+    """
+    Shared HTTP session for the async managers.
+
+    - One keep-alive connection pool (pool_size) for all rooms.
+    - At most max_concurrency requests in flight; further callers wait their turn.
+    - Every request is bounded by timeout; cancelling the awaiting task aborts the request.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        key: str | None = None,
+        *,
+        pool_size: int = _DEFAULT_POOL_SIZE,
+        max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+        timeout: float = _DEFAULT_TIMEOUT_SECONDS,
+    ) -> None:
+        self._url, self._key = _resolve_credentials(url, key)
+        self._timeout = float(timeout)
+        self._pool_size = pool_size
+        self._semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+        self._http: Any = None
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self._url and self._key)
+
+    def _client(self) -> Any:
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                base_url=self._url.rstrip("/") + "/rest/v1",
+                headers={
+                    "apikey": self._key,
+                    "Authorization": f"Bearer {self._key}",
+                    "Content-Type": "application/json",
+                    "Accept": "application/json",
+                },
+                limits=httpx.Limits(max_connections=self._pool_size, max_keepalive_connections=self._pool_size),
+                timeout=httpx.Timeout(self._timeout),
+            )
+        return self._http
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, str] | None = None,
+        json: Any = None,
+        prefer: str | None = None,
+    ) -> Any:
+        """Send one PostgREST request and return the decoded JSON body (None for empty bodies)."""
+        headers = {"Prefer": prefer} if prefer else None
+        async with self._semaphore:
+            resp = await asyncio.wait_for(
+                self._client().request(method, path, params=params, json=json, headers=headers),
+                timeout=self._timeout,
+            )
+        if resp.is_error:
+            try:
+                body = resp.json()
+            except ValueError:
+                body = None
+            raise _PostgrestError(resp.status_code, body)
+        return resp.json() if resp.content else None
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            http, self._http = self._http, None
+            await http.aclose()
+
+
+class AsyncRoomManager:
+    """
+    Async counterpart of RoomManager (rooms table); same return conventions and room_write limit.
+
+    With the event log (event_log=, else TAROZON_ROOM_EVENT_LOG) reads replay room_events after
+    the row's snapshot, so state written as deltas by RoomManager is current here too.
+    """
+
+    def __init__(
+        self,
+        session: AsyncPostgrestSession | None = None,
+        rate_limiter: RateLimiter | None = None,
+        event_log: bool | None = None,
+    ) -> None:
+        self._session = session or AsyncPostgrestSession()
+        self._limiter = _init_limiter(rate_limiter, None)
+        self._has_fetch_rpc = True
+        self._event_log = bool(event_log if event_log is not None else _env_flag("TAROZON_ROOM_EVENT_LOG"))
+
+    @property
+    def is_available(self) -> bool:
+        return self._session.is_configured
+
+    async def try_create_room(self, state: dict[str, Any]) -> str:
+        """Create a room via the create_room SQL function (one round trip); raises like RoomManager.try_create_room."""
+        if not self.is_available:
+            raise RoomBackendUnavailableError("Room storage is not configured")
+        try:
+            code = await self._session.request("POST", "/rpc/create_room", json={"p_state": state})
+        except Exception as e:
+            if getattr(e, "code", None) != _UNDEFINED_FUNCTION_PGRST:
+                raise _room_error_of(e) from e
+            return await self._insert_with_generated_code(state)
+        if not isinstance(code, str) or not code:
+            raise RoomBackendUnavailableError("create_room returned no room code")
+        return code
+
+    async def _insert_with_generated_code(self, state: dict[str, Any]) -> str:
+        for _ in range(_CREATE_ATTEMPTS):
+            code = _generate_room_code()
+            try:
+                await self._session.request(
+                    "POST", "/rooms", json={"room_code": code, "state_json": state}, prefer="return=minimal"
+                )
+                return code
+            except Exception as e:
+                if getattr(e, "code", None) == _UNIQUE_VIOLATION_SQLSTATE:
+                    continue
+                raise _room_error_of(e) from e
+        raise RoomCodeCollisionError(f"No free room code after {_CREATE_ATTEMPTS} attempts")
+
+    async def create_room(self, state: dict[str, Any]) -> str | None:
+        """Create a room with current state_json. Returns 6-char room_code or None on failure."""
+        try:
+            return await self.try_create_room(state)
+        except RoomError:
+            return None
+
+    async def get_room(self, room_code: str) -> dict[str, Any] | None:
+        """Fetch room by room_code. Returns dict with state_json, updated_at, version or None."""
+        return await self._fetch_room(room_code, None)
+
+    async def get_room_if_changed(
+        self, room_code: str, since_version: Any
+    ) -> dict[str, Any] | _NotModified | _NotFound | None:
+        """Like get_room, but ROOM_NOT_MODIFIED when nothing is newer and ROOM_NOT_FOUND once deleted."""
+        if since_version is None:
+            return await self.get_room(room_code)
+        return await self._fetch_room(room_code, since_version)
+
+    async def _fetch_room(self, room_code: str, since_version: Any) -> dict[str, Any] | _NotModified | _NotFound | None:
+        if not self.is_available or not (room_code and room_code.strip()):
+            return None
+        code = room_code.strip().upper()
+        try:
+            if since_version is not None and self._has_fetch_rpc:
+                try:
+                    row = await self._session.request(
+                        "POST",
+                        "/rpc/fetch_room_if_newer",
+                        json={"p_room_code": code, "p_since_version": since_version},
+                    )
+                except Exception as e:
+                    if getattr(e, "code", None) != _UNDEFINED_FUNCTION_PGRST:
+                        raise
+                    self._has_fetch_rpc = False
+                else:
+                    if not isinstance(row, dict):
+                        return ROOM_NOT_FOUND
+                    return ROOM_NOT_MODIFIED if row.get("not_modified") else await self._room_of(code, row)
+            columns = "state_json,updated_at,version" + (",event_seq,snapshot_seq" if self._event_log else "")
+            params = {"select": columns, "room_code": f"eq.{code}", "limit": "1"}
+            if since_version is not None:
+                params["version"] = f"gt.{since_version}"
+            rows = await self._session.request("GET", "/rooms", params=params)
+            if rows:
+                return await self._room_of(code, rows[0])
+            if since_version is None:
+                return None
+            # Schema without fetch_room_if_newer: empty means missing or not newer, so ask which
+            probe = await self._session.request(
+                "GET", "/rooms", params={"select": "version", "room_code": f"eq.{code}", "limit": "1"}
+            )
+        except Exception:
+            return None
+        return ROOM_NOT_MODIFIED if probe else ROOM_NOT_FOUND
+
+    async def _room_of(self, code: str, row: dict[str, Any]) -> dict[str, Any]:
+        """Room dict from a rooms row; in event-log mode replays the events after the snapshot (may raise)."""
+        state = row.get("state_json")
+        seq = int(row.get("event_seq") or 0)
+        snapshot_seq = int(row.get("snapshot_seq") or 0)
+        if self._event_log and seq > snapshot_seq:
+            entries = await self._session.request(
+                "GET",
+                "/room_events",
+                params={
+                    "select": "seq,event",
+                    "room_code": f"eq.{code}",
+                    "seq": f"gt.{snapshot_seq}",
+                    "order": "seq",
+                    "limit": str(seq - snapshot_seq),
+                },
+            )
+            state = apply_events(state, [e["event"] for e in entries or [] if int(e["seq"]) <= seq])
+        return {
+            "state_json": state,
+            "updated_at": row.get("updated_at"),
+            "version": row.get("version"),
+        }
+
+    async def update_room(self, room_code: str, state: dict[str, Any]) -> bool:
+        """
+        Update room's state_json and updated_at. Returns True on success (False when rate limited).
+
+        Written as an event-log snapshot (append_room_events) so readers catching up from a seq
+        see the new state; falls back to a plain PATCH when the schema has no event log.
+        """
+        if not self.is_available or not (room_code and room_code.strip()):
+            return False
+        code = room_code.strip().upper()
+        if not await _acquire(self._limiter, [("room_write", code)]):
+            return False
+        try:
+            result = await self._session.request(
+                "POST",
+                "/rpc/append_room_events",
+                json={
+                    "p_room_code": code,
+                    "p_events": diff_states(None, state),
+                    "p_snapshot": state,
+                    "p_keep": _EVENT_LOG_KEEP,
+                },
+            )
+            return isinstance(result, dict) and bool(result.get("ok"))
+        except Exception as e:
+            if getattr(e, "code", None) != _UNDEFINED_FUNCTION_PGRST:
+                return False
+        try:
+            await self._session.request(
+                "PATCH",
+                "/rooms",
+                params={"room_code": f"eq.{code}"},
+                json={"state_json": state, "updated_at": datetime.now(timezone.utc).isoformat()},
+                prefer="return=minimal",
+            )
+            return True
+        except Exception:
+            return False
+
+
+class AsyncChatManager:
+    """Async counterpart of ChatManager (messages table); same return conventions, content filter and limits."""
+
+    def __init__(
+        self,
+        session: AsyncPostgrestSession | None = None,
+        content_filter: ChatFilter | None = None,
+        filter_action: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        self._session = session or AsyncPostgrestSession()
+        self._limiter = _init_limiter(rate_limiter, None)
+        self._filter = content_filter if content_filter is not None else chat_filter_from_env()
+        self._filter_blocks = _filter_blocks_from_env(filter_action)
+
+    @property
+    def is_available(self) -> bool:
+        return self._session.is_configured
+
+    async def send_message(self, room_code: str, user_name: str, content: str) -> dict[str, Any] | None:
+        """
+        Insert a message into the messages table. Returns the stored message or None on failure
+        (or when rate limited / rejected by the content filter).
+        """
+        if not self.is_available or not (room_code and room_code.strip()) or not content or not content.strip():
+            return None
+        row = _new_message_row(room_code, user_name, content)
+        code = row["room_code"]
+        if not await _acquire(self._limiter, [("message_user", f"{code}:{row['user_name']}"), ("message_room", code)]):
+            return None
+        row = _moderate_row(row, self._filter, self._filter_blocks)
+        if row is None:
+            return None
+        try:
+            stored = await self._session.request("POST", "/messages", json=row, prefer="return=representation")
+        except Exception:
+            return None
+        stored = stored[0] if isinstance(stored, list) and stored else {}
+        return {
+            "id": stored.get("id"),
+            "user_name": stored.get("user_name", row["user_name"]),
+            "content": stored.get("content", row["content"]),
+            "created_at": stored.get("created_at", ""),
+        }
+
+    async def _fetch_messages(
+        self,
+        room_code: str,
+        *,
+        limit: int,
+        after: MessageCursor | None = None,
+        before: MessageCursor | None = None,
+    ) -> list[dict[str, Any]]:
+        if not self.is_available or not (room_code and room_code.strip()):
+            return []
+        desc = after is None
+        params = {
+            "select": "id,user_name,content,created_at",
+            "room_code": f"eq.{room_code.strip().upper()}",
+            "order": "created_at.desc,id.desc" if desc else "created_at.asc,id.asc",
+            "limit": str(limit),
+        }
+        cursor, op = (after, "gt") if after is not None else (before, "lt")
+        if cursor is not None:
+            ts = _quote_filter_value(cursor.created_at)
+            params["or"] = f"(created_at.{op}.{ts},and(created_at.eq.{ts},id.{op}.{_quote_filter_value(cursor.id)}))"
+        try:
+            rows = await self._session.request("GET", "/messages", params=params) or []
+        except Exception:
+            return []
+        out = [
+            {
+                "id": row.get("id"),
+                "user_name": row.get("user_name", ""),
+                "content": row.get("content", ""),
+                "created_at": row.get("created_at", ""),
+            }
+            for row in rows
+        ]
+        if desc:
+            out.reverse()
+        return out
+
+    async def get_messages(self, room_code: str, limit: int = 20) -> list[dict[str, Any]]:
+        """Newest `limit` messages, oldest first."""
+        return await self._fetch_messages(room_code, limit=limit)
+
+    async def get_messages_after(self, room_code: str, cursor: MessageCursor, limit: int = 100) -> list[dict[str, Any]]:
+        return await self._fetch_messages(room_code, limit=limit, after=cursor)
+
+    async def get_messages_before(self, room_code: str, cursor: MessageCursor, limit: int = 20) -> list[dict[str, Any]]:
+        return await self._fetch_messages(room_code, limit=limit, before=cursor)
@@ -0,0 +1,217 @@
+"""Priority-aware admission in front of the render service."""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from .render_service import RenderRequest, RenderResponse, RenderService, RenderServiceError, get_render_service
+from .singleflight import SingleFlight
+
+_MAX_SUPERSEDE_KEYS = 4096
+
+
+class RenderPriority(IntEnum):
+    """Lower value runs first."""
+
+    INTERACTIVE = 0  # host clicks / own board
+    VIEWER = 1  # room viewer refreshes
+    DOWNLOAD = 2  # share/download renders
+    WARMUP = 3  # cache warming and other background work
+
+
+class RenderDroppedError(RenderServiceError):
+    """Request was dropped before running: superseded by a newer version or past its deadline."""
+
+
+@dataclass
+class _Pending:
+    priority: RenderPriority
+    seq: int
+    supersede_key: str | None
+    version: Any
+    deadline: float | None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def _default_limits(slots: int) -> dict[RenderPriority, int]:
+    # Viewers and background work never take the last slot, so a host click can always start
+    return {
+        RenderPriority.INTERACTIVE: slots,
+        RenderPriority.VIEWER: max(1, slots - 1),
+        RenderPriority.DOWNLOAD: max(1, slots // 2),
+        RenderPriority.WARMUP: 1,
+    }
+
+
+class RenderScheduler:
+    """
+    Admits render requests to the service by priority class.
+
+    - At most `slots` requests run at once, and each class has its own concurrency limit.
+    - Waiting requests start strictly in (priority, arrival) order among classes that have room.
+    - A request with supersede_key/version is dropped (RenderDroppedError) once a newer version
+      for the same key has been submitted, e.g. a viewer refresh for an old room state.
+    - A request still queued at its deadline (time.monotonic()) is dropped as well.
+    - Identical requests of the same priority that arrive while one is waiting or running share
+      it (one admission slot, one render), e.g. every viewer of a room at a new version.
+    - Version tracking is per key and bounded (least recently submitted keys are forgotten first);
+      forget() drops a key when its room closes.
+    """
+
+    def __init__(
+        self,
+        service: RenderService | None = None,
+        slots: int | None = None,
+        limits: dict[RenderPriority, int] | None = None,
+    ) -> None:
+        self._service = service or get_render_service()
+        self._slots = max(1, int(slots if slots is not None else self._service.max_workers or 1))
+        self._limits = {**_default_limits(self._slots), **(limits or {})}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: list[_Pending] = []
+        self._running: dict[RenderPriority, int] = {p: 0 for p in RenderPriority}
+        self._latest: OrderedDict[str, Any] = OrderedDict()
+        self._flights: SingleFlight[RenderResponse] = SingleFlight()
+        self._counts: dict[str, dict[RenderPriority, int]] = {
+            name: {p: 0 for p in RenderPriority} for name in ("submitted", "coalesced", "completed", "dropped", "failed")
+        }
+
+    def _is_stale(self, item: _Pending) -> bool:
+        if item.supersede_key is not None and item.version is not None:
+            latest = self._latest.get(item.supersede_key)
+            if latest is not None and latest > item.version:
+                return True
+        return item.deadline is not None and time.monotonic() >= item.deadline
+
+    def _can_start(self, item: _Pending) -> bool:
+        if sum(self._running.values()) >= self._slots:
+            return False
+        for other in sorted(self._waiting, key=lambda w: (w.priority, w.seq)):
+            if self._running[other.priority] < self._limits[other.priority]:
+                # First waiting request whose class has room goes next
+                return other is item
+        return False
+
+    def submit(
+        self,
+        request: RenderRequest,
+        *,
+        priority: RenderPriority = RenderPriority.INTERACTIVE,
+        supersede_key: str | None = None,
+        version: Any = None,
+        deadline: float | None = None,
+        timeout: float | None = None,
+    ) -> RenderResponse:
+        """Wait for admission, then run request on the service. Raises RenderDroppedError if dropped."""
+        priority = RenderPriority(priority)
+        with self._cond:
+            self._counts["submitted"][priority] += 1
+            if supersede_key is not None and version is not None:
+                self._note_version(supersede_key, version)
+        led = False
+
+        def lead() -> RenderResponse:
+            nonlocal led
+            led = True
+            return self._admit_and_run(request, priority, supersede_key, version, deadline, timeout)
+
+        # Coalesce before admission: followers share the leader's slot, result and drop
+        try:
+            return self._flights.do((priority, request), lead)
+        finally:
+            if not led:
+                with self._cond:
+                    self._counts["coalesced"][priority] += 1
+
+    def _note_version(self, supersede_key: str, version: Any) -> None:
+        latest = self._latest.get(supersede_key)
+        if latest is None or version > latest:
+            self._latest[supersede_key] = version
+            # Wake superseded waiters so they drop now instead of at their turn
+            self._cond.notify_all()
+        self._latest.move_to_end(supersede_key)
+        while len(self._latest) > _MAX_SUPERSEDE_KEYS:
+            self._latest.popitem(last=False)
+
+    def _admit_and_run(
+        self,
+        request: RenderRequest,
+        priority: RenderPriority,
+        supersede_key: str | None,
+        version: Any,
+        deadline: float | None,
+        timeout: float | None,
+    ) -> RenderResponse:
+        item = _Pending(
+            priority=priority,
+            seq=next(self._seq),
+            supersede_key=supersede_key,
+            version=version,
+            deadline=deadline,
+        )
+        with self._cond:
+            self._waiting.append(item)
+            try:
+                while True:
+                    if self._is_stale(item):
+                        self._counts["dropped"][item.priority] += 1
+                        raise RenderDroppedError("Render request superseded or past its deadline")
+                    if self._can_start(item):
+                        break
+                    wait = None if item.deadline is None else max(0.0, item.deadline - time.monotonic())
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting.remove(item)
+                # Removing a waiter may unblock the next one even if this one dropped
+                self._cond.notify_all()
+            self._running[item.priority] += 1
+
+        try:
+            response = self._service.submit(request, timeout=timeout)
+        except Exception:
+            with self._cond:
+                self._counts["failed"][item.priority] += 1
+            raise
+        finally:
+            with self._cond:
+                self._running[item.priority] -= 1
+                self._cond.notify_all()
+        with self._cond:
+            self._counts["completed"][item.priority] += 1
+        return response
+
+    def forget(self, supersede_key: str) -> None:
+        """Drop version tracking for a key (e.g. a closed room)."""
+        with self._cond:
+            self._latest.pop(supersede_key, None)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per-class counters plus current waiting/running depth."""
+        with self._cond:
+            out: dict[str, dict[str, int]] = {}
+            for p in RenderPriority:
+                name = p.name.lower()
+                out[name] = {k: v[p] for k, v in self._counts.items()}
+                out[name]["waiting"] = sum(1 for w in self._waiting if w.priority == p)
+                out[name]["running"] = self._running[p]
+            return out
+
+
+_scheduler: RenderScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_render_scheduler() -> RenderScheduler:
+    """Process-wide scheduler in front of get_render_service()."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RenderScheduler()
+        return _scheduler
@@ -0,0 +1,203 @@
+"""Deep-zoom (DZI-style) tile rendering for large boards and print-resolution exports."""
+
+from __future__ import annotations
+
+import io
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+from .compose import _check_layout, _hex_to_rgb, _iter_slot_layers, _layout_dimensions
+from .decks import Deck
+from .spreads import Spread
+
+_TILE_CACHE_MAX_ENTRIES = 1024
+_TILE_FORMATS = {"png": "PNG", "jpg": "JPEG", "jpeg": "JPEG"}
+
+
+@dataclass(frozen=True)
+class DeepZoomSpec:
+    """
+    Tile pyramid of one board.
+
+    Level `max_level` is the full-resolution image (board size × zoom); every level
+    below halves both sides, down to level 0 (1×1), as in the DZI format.
+    """
+
+    width: int
+    height: int
+    tile_size: int = 256
+    overlap: int = 1
+    format: str = "png"
+    zoom: float = 1.0
+
+    @property
+    def max_level(self) -> int:
+        return int(math.ceil(math.log2(max(self.width, self.height, 1))))
+
+    def level_scale(self, level: int) -> float:
+        return 1.0 / (2 ** (self.max_level - level))
+
+    def level_size(self, level: int) -> tuple[int, int]:
+        if not 0 <= level <= self.max_level:
+            raise ValueError(f"Invalid level: {level}")
+        f = self.level_scale(level)
+        return max(1, int(math.ceil(self.width * f))), max(1, int(math.ceil(self.height * f)))
+
+    def tile_grid(self, level: int) -> tuple[int, int]:
+        w, h = self.level_size(level)
+        return int(math.ceil(w / self.tile_size)), int(math.ceil(h / self.tile_size))
+
+    def tile_bounds(self, level: int, col: int, row: int) -> tuple[int, int, int, int]:
+        """Return (left, top, right, bottom) of the tile in level pixels, overlap included."""
+        cols, rows = self.tile_grid(level)
+        if not (0 <= col < cols and 0 <= row < rows):
+            raise ValueError(f"Invalid tile: level={level} col={col} row={row}")
+        w, h = self.level_size(level)
+        left = col * self.tile_size - (self.overlap if col > 0 else 0)
+        top = row * self.tile_size - (self.overlap if row > 0 else 0)
+        right = min(w, (col + 1) * self.tile_size + self.overlap)
+        bottom = min(h, (row + 1) * self.tile_size + self.overlap)
+        return left, top, right, bottom
+
+    def to_xml(self) -> str:
+        """DZI descriptor (OpenSeadragon / Deep Zoom compatible)."""
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+            f'Format="{self.format}" Overlap="{self.overlap}" TileSize="{self.tile_size}">'
+            f'<Size Width="{self.width}" Height="{self.height}"/>'
+            "</Image>"
+        )
+
+
+def deep_zoom_spec(
+    spread: Spread,
+    *,
+    tile_size: int = 256,
+    overlap: int = 1,
+    format: str = "png",
+    zoom: float = 1.0,
+) -> DeepZoomSpec:
+    """Build the tile pyramid spec for a spread; zoom > 1 gives print-resolution levels."""
+    if tile_size <= 0:
+        raise ValueError("tile_size must be > 0")
+    if overlap < 0:
+        raise ValueError("overlap must be >= 0")
+    if format not in _TILE_FORMATS:
+        raise ValueError(f"Unsupported tile format: {format}")
+    if zoom <= 0:
+        raise ValueError("zoom must be > 0")
+    layout = _check_layout(spread)
+    canvas_w, canvas_h, _, _ = _layout_dimensions(layout)
+    return DeepZoomSpec(
+        width=max(1, int(round(canvas_w * zoom))),
+        height=max(1, int(round(canvas_h * zoom))),
+        tile_size=tile_size,
+        overlap=overlap,
+        format=format,
+        zoom=zoom,
+    )
+
+
+_tile_cache: OrderedDict[tuple, bytes] = OrderedDict()
+_tile_cache_lock = threading.Lock()
+
+
+def _tile_cache_get(key: tuple) -> bytes | None:
+    with _tile_cache_lock:
+        data = _tile_cache.get(key)
+        if data is not None:
+            _tile_cache.move_to_end(key)
+        return data
+
+
+def _tile_cache_put(key: tuple, data: bytes) -> None:
+    with _tile_cache_lock:
+        _tile_cache[key] = data
+        _tile_cache.move_to_end(key)
+        while len(_tile_cache) > _TILE_CACHE_MAX_ENTRIES:
+            _tile_cache.popitem(last=False)
+
+
+def clear_tile_cache() -> None:
+    with _tile_cache_lock:
+        _tile_cache.clear()
+
+
+def render_tile(
+    *,
+    repo_root: Path,
+    deck: Deck,
+    spread: Spread,
+    codes_by_slot: dict[str, str],
+    angles_by_slot: dict[str, int],
+    spec: DeepZoomSpec,
+    level: int,
+    col: int,
+    row: int,
+    render_back_for_missing: bool = True,
+) -> bytes:
+    """
+    Render one tile of the pyramid and return its encoded bytes.
+
+    Only slots overlapping the tile are loaded and composited, so memory follows the
+    tile size rather than the full canvas. Tiles are cached individually.
+    """
+    layout = _check_layout(spread)
+    left, top, right, bottom = spec.tile_bounds(level, col, row)
+    key = (
+        str(repo_root),
+        deck.id,
+        spread.id,
+        tuple(sorted(codes_by_slot.items())),
+        tuple(sorted((k, int(v)) for k, v in angles_by_slot.items())),
+        render_back_for_missing,
+        spec,
+        level,
+        col,
+        row,
+    )
+    cached = _tile_cache_get(key)
+    if cached is not None:
+        return cached
+
+    # Board pixels -> level pixels; the canvas may be slightly larger than spec.width after rounding
+    canvas_w, canvas_h, _, _ = _layout_dimensions(layout)
+    level_w, level_h = spec.level_size(level)
+    zoom = min(level_w / canvas_w, level_h / canvas_h) if canvas_w and canvas_h else spec.zoom
+
+    bg = _hex_to_rgb(layout.canvas.background)
+    tile = Image.new("RGBA", (right - left, bottom - top), (*bg, 255))
+    for img, px, py in _iter_slot_layers(
+        repo_root=repo_root,
+        deck=deck,
+        layout=layout,
+        codes_by_slot=codes_by_slot,
+        angles_by_slot=angles_by_slot,
+        render_back_for_missing=render_back_for_missing,
+        zoom=zoom,
+        clip=(left, top, right, bottom),
+    ):
+        # Intersect layer with tile; alpha_composite needs non-negative offsets
+        sx0 = max(0, left - px)
+        sy0 = max(0, top - py)
+        sx1 = min(img.size[0], right - px)
+        sy1 = min(img.size[1], bottom - py)
+        if sx0 >= sx1 or sy0 >= sy1:
+            continue
+        tile.alpha_composite(img, dest=(px + sx0 - left, py + sy0 - top), source=(sx0, sy0, sx1, sy1))
+
+    out = io.BytesIO()
+    pil_format = _TILE_FORMATS[spec.format]
+    if pil_format == "JPEG":
+        tile.convert("RGB").save(out, format="JPEG", quality=90, optimize=True)
+    else:
+        tile.save(out, format="PNG", compress_level=6)
+    data = out.getvalue()
+    _tile_cache_put(key, data)
+    return data
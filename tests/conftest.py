@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import pytest
+
+from tarozon_core.postgrest_stub import PostgrestStub
+
+
+@pytest.fixture
+def stub(tmp_path):
+    server = PostgrestStub(tmp_path / "stub.db").start()
+    yield server
+    server.close()
@@ -0,0 +1,64 @@
+"""LocalBoardStore under concurrent writers, and board publishing through RoomManager."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from tarozon_core.backends import SQLiteRoomBackend
+from tarozon_core.board_store import LocalBoardStore, board_digest
+from tarozon_core.events import RoomEventHub
+from tarozon_core.rate_limit import RateLimiter
+from tarozon_core.rooms import RoomManager
+
+
+def test_concurrent_puts_of_same_board(tmp_path):
+    data = b"\x89PNG" + bytes(range(256)) * 8192
+    digest = board_digest(data)
+    errors = []
+
+    def put(store, start):
+        start.wait()
+        try:
+            assert store.put(data) == digest
+        except Exception as e:
+            errors.append(e)
+
+    for round_no in range(20):
+        # Fresh root each round so every writer misses the exists() check and writes the file
+        store = LocalBoardStore(tmp_path / str(round_no))
+        start = threading.Barrier(8)
+        threads = [threading.Thread(target=put, args=(store, start)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert store.get(digest) == data
+    assert not errors
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+@pytest.mark.parametrize("event_log", [False, True])
+def test_update_without_image_clears_published_board(tmp_path, event_log):
+    rooms = RoomManager(
+        backend=SQLiteRoomBackend(tmp_path / "rooms.db"),
+        events=RoomEventHub(mode="off"),
+        board_store=LocalBoardStore(tmp_path / "boards"),
+        event_log=event_log,
+        rate_limiter=RateLimiter({}),
+    )
+    state = {"d": "classic", "s": "three", "c": ["01"], "a": [0]}
+    code = rooms.create_room(state)
+    assert rooms.update_room(code, state, board_png=b"board-01")
+    seen = rooms.get_room(code)
+    assert rooms.get_board_png(seen["board_hash"]) == b"board-01"
+
+    # Host render failed: the new state goes out without an image
+    assert rooms.update_room(code, {**state, "c": ["02"]}, board_png=None)
+    room = rooms.get_room(code)
+    assert room["state_json"]["c"] == ["02"]
+    assert room["board_hash"] is None
+    caught_up = rooms.get_room_since(code, seen)
+    assert caught_up["state_json"]["c"] == ["02"]
+    assert caught_up["board_hash"] is None
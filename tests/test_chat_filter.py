@@ -0,0 +1,33 @@
+"""Banned-word matching (Aho-Corasick over normalized text)."""
+
+from __future__ import annotations
+
+from tarozon_core.chat_filter import ChatFilter
+
+
+def test_matches_through_separators_case_and_width():
+    f = ChatFilter(["spam"])
+    assert f.scan("buy S.P a-m now").blocked
+    assert f.scan("ＳＰＡＭ").blocked
+    assert not f.scan("sparm and spa-ghetti").blocked
+
+
+def test_hangul_jamo_spellings_match():
+    f = ChatFilter(["시발"])
+    assert f.scan("ㅅㅣㅂㅏㄹ").blocked
+    assert f.scan("시바ㄹ").blocked
+    # The word's jamo running into the next syllable is not a match
+    assert not f.scan("시바라").blocked
+
+
+def test_masks_original_spans():
+    f = ChatFilter(["spam", "am"])
+    assert f.scan("no s p a m here").masked() == "no * * * * here"
+    assert f.scan("clean").masked() == "clean"
+
+
+def test_reload_swaps_word_list():
+    f = ChatFilter(["spam"])
+    assert f.reload(["eggs", "eggs"]) == 1
+    assert not f.scan("spam").blocked
+    assert f.scan("eggs").blocked
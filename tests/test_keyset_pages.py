@@ -0,0 +1,88 @@
+"""Keyset (cursor) pagination of messages and room lists."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from tarozon_core.backends import SQLiteRoomBackend
+from tarozon_core.chat_cache import MessageCache, MessageCursor
+from tarozon_core.events import RoomEventHub
+from tarozon_core.rate_limit import RateLimiter
+from tarozon_core.rooms import ChatManager, RoomManager
+
+_STATE = {"d": "classic", "s": "three", "c": [None, None, None], "a": [0, 0, 0]}
+
+
+@pytest.fixture(params=["sqlite", "postgrest"])
+def managers(request, tmp_path):
+    kwargs = {"events": RoomEventHub(mode="off"), "rate_limiter": RateLimiter({})}
+    if request.param == "sqlite":
+        backend = SQLiteRoomBackend(tmp_path / "rooms.db")
+        yield RoomManager(backend=backend, **kwargs), ChatManager(
+            backend=backend, message_cache=MessageCache(), **kwargs
+        )
+    else:
+        stub = request.getfixturevalue("stub")
+        yield RoomManager(stub.url, stub.key, **kwargs), ChatManager(
+            stub.url, stub.key, message_cache=MessageCache(), **kwargs
+        )
+
+
+def test_message_pages_walk_back_and_forward_without_gaps(managers):
+    rooms, chat = managers
+    code = rooms.create_room(_STATE)
+    sent = [chat.send_message(code, "u", f"m{i}")["content"] for i in range(7)]
+
+    newest = chat.get_messages(code, limit=3)
+    assert [m["content"] for m in newest] == sent[-3:]
+    seen = list(newest)
+    while True:
+        page = chat.get_messages_before(code, MessageCursor.of(seen[0]), limit=3)
+        if not page:
+            break
+        seen = page + seen
+    assert [m["content"] for m in seen] == sent
+
+    after = chat.get_messages_after(code, MessageCursor.of(seen[2]), limit=10)
+    assert [m["content"] for m in after] == sent[3:]
+
+
+def test_room_list_pages_do_not_repeat_or_skip(managers):
+    rooms, _ = managers
+    codes = {rooms.create_room(_STATE) for _ in range(5)}
+
+    listed: list[str] = []
+    page = rooms.list_active_rooms(limit=2)
+    while True:
+        listed += [r["room_code"] for r in page.rooms]
+        if page.next_cursor is None:
+            break
+        page = rooms.list_active_rooms(limit=2, before=page.next_cursor)
+    assert len(listed) == len(set(listed))
+    assert set(listed) == codes
+
+
+def test_sync_picks_up_message_committed_behind_the_cursor(tmp_path):
+    backend = SQLiteRoomBackend(tmp_path / "rooms.db")
+    chat = ChatManager(
+        backend=backend, events=RoomEventHub(mode="off"), message_cache=MessageCache(), rate_limiter=RateLimiter({})
+    )
+    first = chat.send_message("ROOM01", "u", "first")
+    assert [m["content"] for m in chat.sync_messages("ROOM01")] == ["first"]
+    # A writer that stamped before "first" but committed after the reader's sync
+    late = (datetime.fromisoformat(first["created_at"]) - timedelta(milliseconds=500)).isoformat(timespec="microseconds")
+    backend._conn().execute(
+        "insert into messages (room_code, user_name, content, created_at) values (?, ?, ?, ?)",
+        ("ROOM01", "v", "late", late),
+    )
+    assert sorted(m["content"] for m in chat.sync_messages("ROOM01")) == ["first", "late"]
+
+
+def test_cache_orders_same_timestamp_ids_numerically():
+    cache = MessageCache()
+    at = "2026-01-01T00:00:00.000000+00:00"
+    cache.merge("ROOM01", [{"id": i, "created_at": at, "content": str(i)} for i in (10, 9, 11)])
+    assert [m["id"] for m in cache.latest("ROOM01", 3)] == [9, 10, 11]
+    assert cache.sync_cursor("ROOM01") == MessageCursor(created_at=at, id=11)
@@ -0,0 +1,35 @@
+"""In-process token buckets."""
+
+from __future__ import annotations
+
+import time
+
+from tarozon_core.rate_limit import BucketSpec, RateLimiter, parse_limits
+
+
+def test_acquire_is_all_or_nothing():
+    limiter = RateLimiter({"user": BucketSpec(rate=0.001, burst=5), "room": BucketSpec(rate=0.001, burst=1)})
+    assert limiter.acquire([("user", "a"), ("room", "R")])
+    # The room bucket is empty, so the user bucket must not be charged either
+    for _ in range(4):
+        assert not limiter.acquire([("user", "a"), ("room", "R")])
+    assert limiter.acquire([("user", "a"), ("room", "S")])
+    assert limiter.acquire([("user", "a")])
+    assert limiter.acquire([("user", "a")])
+    assert limiter.acquire([("user", "a")])
+    assert not limiter.acquire([("user", "a")])
+
+
+def test_buckets_refill_and_unknown_limits_pass():
+    limiter = RateLimiter({"write": BucketSpec(rate=50, burst=1)})
+    assert limiter.allow("write", "R")
+    assert not limiter.allow("write", "R")
+    time.sleep(0.05)
+    assert limiter.allow("write", "R")
+    assert limiter.allow("other", "R")
+
+
+def test_parse_limits():
+    limits = parse_limits("message_user=1:5, room_create=0.2:3")
+    assert limits["message_user"] == BucketSpec(rate=1.0, burst=5.0)
+    assert limits["room_create"] == BucketSpec(rate=0.2, burst=3.0)
@@ -0,0 +1,52 @@
+"""Render pool recycling when a worker hangs."""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tarozon_core.render_service import DownloadRenderRequest, RenderResponse, RenderService, RenderTimeoutError
+
+
+def _sleepy_handler(request: DownloadRenderRequest) -> RenderResponse:
+    # watermark_text "hang" wedges the worker; padding is the work time in tenths of a second
+    if request.watermark_text == "hang":
+        time.sleep(60)
+    time.sleep(request.padding / 10)
+    return RenderResponse(png_bytes=request.png_bytes, width=request.padding, height=0)
+
+
+def _request(text: str, padding: int) -> DownloadRenderRequest:
+    return DownloadRenderRequest(png_bytes=text.encode(), watermark_text=text, padding=padding)
+
+
+@pytest.fixture
+def service():
+    svc = RenderService(max_workers=2, timeout=30, handler=_sleepy_handler)
+    yield svc
+    svc.shutdown()
+
+
+def test_timeout_recycles_pool_without_failing_other_callers(service):
+    # Warm the pool so spawn start-up does not count against the short timeout
+    assert service.submit(_request("warm", 0)).width == 0
+    pool = service._get_executor()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as callers:
+        hung = callers.submit(service.submit, _request("hang", 0), 1.5)
+        time.sleep(0.2)
+        workers = list(pool._processes.values())
+        others = [callers.submit(service.submit, _request(f"ok{i}", 3 + i)) for i in range(3)]
+        with pytest.raises(RenderTimeoutError):
+            hung.result()
+        results = [f.result() for f in others]
+    assert [r.width for r in results] == [3, 4, 5]
+    # Nobody waited out the hung worker's 60 s, and the wedged process is gone
+    assert time.monotonic() - started < 15
+    assert service.restarts == 1
+    for process in workers:
+        process.join(timeout=5)
+        assert not process.is_alive()
+
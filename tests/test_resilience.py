@@ -0,0 +1,53 @@
+"""Timeout and breaker behaviour of ResilientRoomBackend."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from tarozon_core.backends import SQLiteRoomBackend
+from tarozon_core.resilience import BackendTimeoutError, CircuitBreaker, CircuitOpenError, ResilientRoomBackend
+
+
+class _SlowBackend(SQLiteRoomBackend):
+    delay = 0.3
+
+    def fetch_room(self, room_code, **kwargs):
+        time.sleep(self.delay)
+        return super().fetch_room(room_code, **kwargs)
+
+    def insert_message(self, row):
+        time.sleep(self.delay)
+        return super().insert_message(row)
+
+
+@pytest.fixture
+def inner(tmp_path):
+    return _SlowBackend(tmp_path / "rooms.db")
+
+
+def test_slow_read_is_abandoned(inner):
+    backend = ResilientRoomBackend(inner, timeout=0.05)
+    code = inner.create_room({"d": "rws"})
+    with pytest.raises(BackendTimeoutError):
+        backend.fetch_room(code)
+    assert backend.stats()["timeouts"] == 1
+
+
+def test_slow_insert_waits_for_its_outcome(inner):
+    backend = ResilientRoomBackend(inner, timeout=0.05)
+    code = inner.create_room({"d": "rws"})
+    stored = backend.insert_message({"room_code": code, "user_name": "a", "content": "hi"})
+    assert stored is not None and stored["content"] == "hi"
+    assert len(inner.fetch_messages(code, limit=10)) == 1
+    assert backend.stats()["timeouts"] == 0
+
+
+def test_breaker_opens_after_consecutive_failures(inner):
+    backend = ResilientRoomBackend(inner, timeout=0.05, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60))
+    for _ in range(2):
+        with pytest.raises(BackendTimeoutError):
+            backend.fetch_room("ABCDEF")
+    with pytest.raises(CircuitOpenError):
+        backend.insert_message({"room_code": "ABCDEF", "user_name": "a", "content": "hi"})
@@ -0,0 +1,108 @@
+"""Event-log room writes across managers sharing one SQLite database."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from tarozon_core.backends import SQLiteRoomBackend
+from tarozon_core.events import RoomEventHub
+from tarozon_core.rate_limit import RateLimiter
+from tarozon_core.room_log import apply_events, changed_slots, diff_states
+from tarozon_core.rooms import ROOM_NOT_FOUND, ROOM_NOT_MODIFIED, RoomManager
+
+
+def _state(cards, angles):
+    return {"d": "classic", "s": "three", "c": list(cards), "a": list(angles)}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteRoomBackend(tmp_path / "rooms.db")
+
+
+def _manager(backend):
+    return RoomManager(backend=backend, events=RoomEventHub(mode="off"), event_log=True, rate_limiter=RateLimiter({}))
+
+
+def test_interleaved_writers_keep_last_write(backend):
+    m1, m2 = _manager(backend), _manager(backend)
+    code = m1.create_room(_state(["01", None, None], [0, 0, 0]))
+    assert m1.update_room(code, _state(["01", "02", None], [0, 0, 0]))
+    assert m2.update_room(code, _state(["05", "02", "07"], [0, 180, 0]))
+    # m1's head is stale now; its delta must not be applied on top of m2's state
+    a2 = _state(["01", "02", None], [0, 0, 0])
+    assert m1.update_room(code, a2)
+    assert m1.get_room(code)["state_json"] == a2
+    assert m2.get_room(code)["state_json"] == a2
+
+
+def test_unchanged_state_after_foreign_write_is_rewritten(backend):
+    m1, m2 = _manager(backend), _manager(backend)
+    a = _state(["01", None, None], [0, 0, 0])
+    code = m1.create_room(a)
+    assert m1.update_room(code, a)
+    assert m2.update_room(code, _state(["09", None, None], [0, 0, 0]))
+    assert m1.update_room(code, a)
+    assert m2.get_room(code)["state_json"] == a
+
+
+def test_compare_and_set_conflict_returns_current_room(backend):
+    m1, m2 = _manager(backend), _manager(backend)
+    code = m1.create_room(_state(["01", None, None], [0, 0, 0]))
+    base = m1.get_room(code)["version"]
+    b = _state(["01", "03", None], [0, 0, 0])
+    assert m2.update_room_if_version(code, b, base).ok
+    result = m1.update_room_if_version(code, _state(["01", "04", None], [0, 0, 0]), base)
+    assert not result.ok
+    assert result.room["state_json"] == b
+    assert m1.update_room_if_version(code, _state(["01", "04", None], [0, 0, 0]), result.version).ok
+
+
+def test_reader_catches_up_from_seq(backend):
+    writer, reader = _manager(backend), _manager(backend)
+    code = writer.create_room(_state(["01", None, None], [0, 0, 0]))
+    # The first update after create is a snapshot; later ones are slot deltas
+    assert writer.update_room(code, _state(["01", None, None], [0, 0, 0]))
+    room = reader.get_room(code)
+    assert writer.update_room(code, _state(["01", "02", None], [0, 0, 0]))
+    assert writer.update_room(code, _state(["01", "02", "03"], [0, 0, 90]))
+    room = reader.get_room_since(code, room)
+    assert room["state_json"] == _state(["01", "02", "03"], [0, 0, 90])
+    assert room["changed_slots"] == {1, 2}
+    assert reader.get_room_since(code, room) is ROOM_NOT_MODIFIED
+
+
+@pytest.mark.parametrize("event_log", [True, False])
+def test_deleted_room_is_reported_not_found(backend, event_log):
+    m = RoomManager(backend=backend, events=RoomEventHub(mode="off"), event_log=event_log, rate_limiter=RateLimiter({}))
+    code = m.create_room(_state(["01", None, None], [0, 0, 0]))
+    room = m.get_room(code)
+    assert m.get_room_if_changed(code, room["version"]) is ROOM_NOT_MODIFIED
+    assert m.get_room_since(code, room) is ROOM_NOT_MODIFIED
+    backend.delete_rooms([code])
+    assert m.get_room_if_changed(code, room["version"]) is ROOM_NOT_FOUND
+    assert m.get_room_since(code, room) is ROOM_NOT_FOUND
+
+
+def test_diff_and_apply_round_trip():
+    old = _state(["01", None, None], [0, 0, 0])
+    new = _state(["01", "02", None], [0, 180, 0])
+    events = diff_states(old, new)
+    assert apply_events(old, events) == new
+    assert changed_slots(events) == {1}
+    assert changed_slots(diff_states(old, {**new, "s": "celtic"})) is None
+
+
+def test_memory_backend_is_shared_across_threads():
+    backend = SQLiteRoomBackend(":memory:")
+    manager = _manager(backend)
+    code = manager.create_room(_state(["01"], [0]))
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(manager.get_room(code)))
+    thread.start()
+    thread.join()
+    assert seen[0] is not None and seen[0]["state_json"] == _state(["01"], [0])
+    # Each backend is its own database
+    assert _manager(SQLiteRoomBackend(":memory:")).get_room(code) is None
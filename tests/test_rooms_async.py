@@ -0,0 +1,114 @@
+"""Async managers against the local PostgREST stand-in."""
+
+from __future__ import annotations
+
+import asyncio
+
+from tarozon_core.backends import SQLiteRoomBackend
+from tarozon_core.chat_filter import ChatFilter
+from tarozon_core.events import RoomEventHub
+from tarozon_core.rate_limit import BucketSpec, RateLimiter
+from tarozon_core.rooms import ROOM_NOT_FOUND, ROOM_NOT_MODIFIED, RoomManager
+from tarozon_core.rooms_async import AsyncChatManager, AsyncPostgrestSession, AsyncRoomManager
+
+
+def _state(cards):
+    return {"d": "classic", "s": "three", "c": list(cards), "a": [0] * len(cards)}
+
+
+def _run(stub, fn):
+    async def main():
+        session = AsyncPostgrestSession(stub.url, stub.key)
+        try:
+            return await fn(session)
+        finally:
+            await session.aclose()
+
+    return asyncio.run(main())
+
+
+def test_async_update_is_seen_by_event_log_readers(stub):
+    writer = RoomManager(
+        stub.url, stub.key, events=RoomEventHub(mode="off"), event_log=True, rate_limiter=RateLimiter({})
+    )
+    code = writer.create_room(_state(["01", None]))
+    assert writer.update_room(code, _state(["01", None]))
+    assert writer.update_room(code, _state(["01", "02"]))
+    room = writer.get_room(code)
+
+    assert _run(stub, lambda s: AsyncRoomManager(s).update_room(code, _state(["07", "08"])))
+
+    room = writer.get_room_since(code, room)
+    assert room["state_json"] == _state(["07", "08"])
+    assert writer.get_room(code)["state_json"] == _state(["07", "08"])
+
+
+def test_async_reads_replay_event_log_writes(stub):
+    writer = RoomManager(
+        stub.url, stub.key, events=RoomEventHub(mode="off"), event_log=True, rate_limiter=RateLimiter({})
+    )
+    code = writer.create_room(_state(["01", None]))
+    assert writer.update_room(code, _state(["01", None]))
+    version = writer.get_room(code)["version"]
+    # Written as a delta: the rooms row still holds the older snapshot
+    assert writer.update_room(code, _state(["01", "02"]))
+
+    async def read(session):
+        rooms = AsyncRoomManager(session, event_log=True)
+        return await rooms.get_room(code), await rooms.get_room_if_changed(code, version)
+
+    room, changed = _run(stub, read)
+    assert room["state_json"] == _state(["01", "02"])
+    assert changed["state_json"] == _state(["01", "02"])
+    assert room["version"] == writer.get_room(code)["version"]
+
+
+def test_deleted_room_is_not_reported_unchanged(stub):
+    rooms = RoomManager(stub.url, stub.key, events=RoomEventHub(mode="off"), rate_limiter=RateLimiter({}))
+    code = rooms.create_room(_state(["01", None]))
+    version = rooms.get_room(code)["version"]
+
+    async def changed(session):
+        return await AsyncRoomManager(session).get_room_if_changed(code, version)
+
+    assert rooms.get_room_if_changed(code, version) is ROOM_NOT_MODIFIED
+    assert _run(stub, changed) is ROOM_NOT_MODIFIED
+    SQLiteRoomBackend(stub.db_path).delete_rooms([code])
+    assert rooms.get_room_if_changed(code, version) is ROOM_NOT_FOUND
+    assert _run(stub, changed) is ROOM_NOT_FOUND
+
+
+def test_async_send_applies_content_filter(stub):
+    words = ChatFilter(["spam"])
+
+    async def send(session):
+        masked = await AsyncChatManager(session, content_filter=words).send_message("ROOM01", "eve", "buy s.p.a.m")
+        blocked = await AsyncChatManager(session, content_filter=words, filter_action="block").send_message(
+            "ROOM01", "eve", "spam again"
+        )
+        return masked, blocked, await AsyncChatManager(session).get_messages("ROOM01")
+
+    masked, blocked, stored = _run(stub, send)
+    assert masked["content"] == "buy *******"
+    assert blocked is None
+    assert [m["content"] for m in stored] == ["buy *******"]
+
+
+def test_async_writes_are_rate_limited(stub):
+    limiter = RateLimiter({"message_user": BucketSpec(rate=0.001, burst=2), "room_write": BucketSpec(rate=0.001, burst=1)})
+    code = RoomManager(stub.url, stub.key, events=RoomEventHub(mode="off"), rate_limiter=RateLimiter({})).create_room(
+        _state(["01"])
+    )
+
+    async def burst(session):
+        chat = AsyncChatManager(session, rate_limiter=limiter)
+        rooms = AsyncRoomManager(session, rate_limiter=limiter)
+        sent = [await chat.send_message(code, "eve", f"hi {i}") is not None for i in range(3)]
+        other = await chat.send_message(code, "bob", "hello") is not None
+        written = [await rooms.update_room(code, _state([f"0{i}"])) for i in range(2)]
+        return sent, other, written
+
+    sent, other, written = _run(stub, burst)
+    assert sent == [True, True, False]
+    assert other
+    assert written == [True, False]
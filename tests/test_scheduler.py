@@ -0,0 +1,95 @@
+"""Admission, coalescing and supersede tracking in RenderScheduler."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tarozon_core import scheduler as scheduler_module
+from tarozon_core.render_service import DownloadRenderRequest, RenderResponse, RenderService
+from tarozon_core.scheduler import RenderDroppedError, RenderPriority, RenderScheduler
+from tarozon_core.singleflight import SingleFlight
+
+
+def _slow_inline(request: DownloadRenderRequest) -> RenderResponse:
+    time.sleep(0.2)
+    return RenderResponse(png_bytes=request.png_bytes, width=1, height=1)
+
+
+def _request(text: str) -> DownloadRenderRequest:
+    return DownloadRenderRequest(png_bytes=text.encode(), watermark_text=text)
+
+
+@pytest.fixture
+def sched():
+    return RenderScheduler(RenderService(max_workers=0, handler=_slow_inline), slots=2)
+
+
+def test_identical_viewer_renders_take_one_slot(sched):
+    with ThreadPoolExecutor(max_workers=6) as callers:
+        same = [
+            callers.submit(sched.submit, _request("board"), priority=RenderPriority.VIEWER, supersede_key="R", version=3)
+            for _ in range(5)
+        ]
+        time.sleep(0.05)
+        # The viewer limit is slots - 1; a host click still starts while the viewers render
+        host = callers.submit(sched.submit, _request("host"))
+        assert {f.result().png_bytes for f in same} == {b"board"}
+        assert host.result().png_bytes == b"host"
+    viewer = sched.stats()["viewer"]
+    assert viewer["submitted"] == 5
+    assert viewer["completed"] + viewer["coalesced"] == 5
+    assert viewer["completed"] < 5
+
+
+def test_older_version_is_dropped_when_superseded(sched):
+    with ThreadPoolExecutor(max_workers=4) as callers:
+        busy = [callers.submit(sched.submit, _request(f"busy{i}")) for i in range(2)]
+        time.sleep(0.05)
+        old = callers.submit(sched.submit, _request("v1"), priority=RenderPriority.VIEWER, supersede_key="R", version=1)
+        time.sleep(0.05)
+        new = callers.submit(sched.submit, _request("v2"), priority=RenderPriority.VIEWER, supersede_key="R", version=2)
+        with pytest.raises(RenderDroppedError):
+            old.result()
+        assert new.result().png_bytes == b"v2"
+        for f in busy:
+            f.result()
+
+
+def test_supersede_keys_are_bounded_and_forgettable(sched, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "_MAX_SUPERSEDE_KEYS", 3)
+    for i in range(5):
+        sched.submit(_request(f"k{i}"), supersede_key=f"room{i}", version=1)
+    assert list(sched._latest) == ["room2", "room3", "room4"]
+    sched.forget("room3")
+    assert list(sched._latest) == ["room2", "room4"]
+
+
+def test_singleflight_shares_result_and_error():
+    flights: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow() -> int:
+        started.set()
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(flights.do, "k", slow)
+        started.wait(5)
+        followers = [pool.submit(flights.do, "k", lambda: 0) for _ in range(2)]
+        time.sleep(0.05)
+        release.set()
+        assert [leader.result(), *(f.result() for f in followers)] == [42, 42, 42]
+    assert (flights.executed, flights.shared) == (1, 2)
+
+    def boom() -> int:
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        flights.do("k", boom)
+    assert flights.in_flight() == 0
@@ -0,0 +1,88 @@
+"""Deep-zoom tiles match the composed board."""
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageChops
+
+from tarozon_core import compose
+from tarozon_core.compose import _render_layer_cached, _render_layer_region, compose_spread_image
+from tarozon_core.decks import load_decks
+from tarozon_core.spreads import load_spreads
+from tarozon_core.tiles import clear_tile_cache, deep_zoom_spec, render_tile
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _max_diff(a: Image.Image, b: Image.Image) -> int:
+    assert a.size == b.size
+    return max(hi for _, hi in ImageChops.difference(a.convert("RGBA"), b.convert("RGBA")).getextrema())
+
+
+@pytest.mark.parametrize("angle", [0, 90, 180, 270])
+def test_layer_region_matches_full_layer_crop(angle):
+    path = str(REPO_ROOT / "cards" / "00.jpg")
+    full = _render_layer_cached(path, 220, 380, angle)
+    w, h = full.size
+    region = (w // 5, h // 3, w - w // 7, h - h // 4)
+    part = _render_layer_region(path, 220, 380, angle, region)
+    assert _max_diff(part, full.crop(region)) <= 8
+
+
+def test_stitched_tiles_match_composed_board():
+    decks, spreads = load_decks(REPO_ROOT), load_spreads(REPO_ROOT)
+    deck, spread = decks["rws"], spreads["celtic_cross"]
+    codes = {slot.key: f"{i:02d}" for i, slot in enumerate(spread.slots)}
+    angles = {slot.key: (90 if i == 1 else 180 if i == 3 else 0) for i, slot in enumerate(spread.slots)}
+    board = compose_spread_image(
+        repo_root=REPO_ROOT, deck=deck, spread=spread, codes_by_slot=codes, angles_by_slot=angles
+    )
+    spec = deep_zoom_spec(spread, tile_size=256, overlap=0)
+    level = spec.max_level
+    cols, rows = spec.tile_grid(level)
+    clear_tile_cache()
+    stitched = Image.new("RGBA", spec.level_size(level))
+    for col in range(cols):
+        for row in range(rows):
+            tile = render_tile(
+                repo_root=REPO_ROOT,
+                deck=deck,
+                spread=spread,
+                codes_by_slot=codes,
+                angles_by_slot=angles,
+                spec=spec,
+                level=level,
+                col=col,
+                row=row,
+            )
+            left, top, _, _ = spec.tile_bounds(level, col, row)
+            stitched.paste(Image.open(io.BytesIO(tile)), (left, top))
+    expected = Image.open(io.BytesIO(board.png_bytes)).crop((0, 0, *stitched.size))
+    assert _max_diff(stitched, expected) <= 8
+
+
+def test_print_zoom_tiles_do_not_cache_full_layers():
+    decks, spreads = load_decks(REPO_ROOT), load_spreads(REPO_ROOT)
+    deck, spread = decks["rws"], spreads["celtic_cross"]
+    codes = {slot.key: f"{i:02d}" for i, slot in enumerate(spread.slots)}
+    spec = deep_zoom_spec(spread, tile_size=256, zoom=8.0)
+    level = spec.max_level
+    cols, rows = spec.tile_grid(level)
+    before = compose._layer_cache_bytes
+    clear_tile_cache()
+    tile = render_tile(
+        repo_root=REPO_ROOT,
+        deck=deck,
+        spread=spread,
+        codes_by_slot=codes,
+        angles_by_slot={},
+        spec=spec,
+        level=level,
+        col=cols // 2,
+        row=rows // 2,
+    )
+    assert Image.open(io.BytesIO(tile)).size[0] <= 256 + 2
+    assert compose._layer_cache_bytes == before